@@ -0,0 +1,111 @@
+import threading
+import time
+import numpy as np
+
+class AnalysisWorker:
+    # Drains raw frames from an AudioRingBuffer on its own thread and computes dB levels and
+    # spectra for several frames at once, keeping that work off the PortAudio callback.
+    # Multi-channel rings are analysed in the same pass: every channel's frames go through
+    # one calculate_db_batch / FFT call.
+    def __init__(self, ring_buffer, db_calculator, on_results, frame_size=1024, max_batch=16, poll_interval=0.01,
+                 spectrogram=None, batch_latency=None):
+        self.ring_buffer = ring_buffer
+        self.db_calculator = db_calculator
+        self.spectrogram = spectrogram  # Optional STFTSpectrogram fed with the contiguous sample stream
+        self.batch_latency = batch_latency  # Optional metrics.LatencyHistogram for per-batch analysis time
+        self.taps = []  # Objects with feed(samples) and reset(), given the raw samples of every batch
+        self.channels = ring_buffer.channels
+        # Called as on_results(db_levels, spectra) with db_levels (frames x channels) and
+        # spectra (columns x channels x bins); spectra may be empty
+        self.on_results = on_results
+        self.frame_size = frame_size
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+
+        self.block = np.empty(self.channels * max_batch * frame_size, dtype=np.float32)  # Reused for every batch
+        self.read_index = 0
+        self.processed_frames = 0
+        self.dropped_frames = 0
+        self.batches = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_tap(self, tap):
+        self.taps.append(tap)
+
+    def queue_depth(self):
+        # Whole frames written by the callback but not yet analysed
+        return max(0, self.ring_buffer.total_written - self.read_index) // self.frame_size
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.read_index = self.ring_buffer.total_written
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="analysis-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.process_pending():
+                self._stop_event.wait(self.poll_interval)
+
+    def process_pending(self):
+        # Analyse one batch of pending frames; returns the number of frames processed
+        backlog = self.ring_buffer.total_written - self.read_index
+        if backlog > self.ring_buffer.capacity:
+            # The writer lapped us: skip to the oldest whole frame still in the ring
+            skipped = -(-(backlog - self.ring_buffer.capacity) // self.frame_size)
+            self.dropped_frames += skipped
+            self.read_index += skipped * self.frame_size
+            if self.spectrogram is not None:
+                self.spectrogram.reset()  # Frames must not straddle the gap
+            for tap in self.taps:
+                tap.reset()
+            backlog = self.ring_buffer.total_written - self.read_index
+
+        n_frames = min(backlog // self.frame_size, self.max_batch)
+        if n_frames <= 0:
+            return 0
+
+        started = time.perf_counter()
+        n_samples = n_frames * self.frame_size
+        # A contiguous (channels x n_samples) view of the block, so the frame reshape below is free
+        out = self.block[:self.channels * n_samples].reshape(self.ring_buffer.buffer.shape[:-1] + (n_samples,))
+        samples = self.ring_buffer.read(self.read_index, n_samples, out=out)
+        if samples is None:  # Overwritten while copying; the next pass will count the drop
+            return 0
+        self.read_index += n_samples
+
+        frames = samples.reshape(self.channels * n_frames, self.frame_size)
+        db_levels = self.db_calculator.calculate_db_batch(frames).reshape(self.channels, n_frames).T
+        if self.spectrogram is not None:
+            spectra = self.spectrogram.process(samples)
+        else:
+            spectra = np.abs(np.fft.rfft(frames, axis=1)[:, :self.frame_size // 2])
+            spectra = spectra.reshape(self.channels, n_frames, -1).transpose(1, 0, 2)
+
+        for tap in self.taps:
+            tap.feed(samples)
+
+        self.processed_frames += n_frames
+        self.batches += 1
+        self.on_results(db_levels, spectra)
+        if self.batch_latency is not None:
+            self.batch_latency.record(time.perf_counter() - started)
+        return n_frames
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "dropped_frames": self.dropped_frames,
+            "processed_frames": self.processed_frames,
+            "batches": self.batches,
+        }
@@ -0,0 +1,159 @@
+// Applies the server-sent events of /live (see main.live_endpoint) to the dashboard in the browser.
+// Dash renders the figures once (initialize_graphs); after that every update is a delta applied
+// here with Plotly.extendTraces / Plotly.restyle, so the server sends nothing while nothing changes.
+(function () {
+    var source = null;
+    var transcript = [];
+    var retry = null;
+    // What the page already shows; advanced by every event so a reconnect resumes from here
+    var live = null;
+    var liveFrom = null;
+    var segments = null;
+    var segmentsFrom = null;
+
+    // The plotly.js div inside a dcc.Graph
+    function plot(id) {
+        var graph = document.getElementById(id);
+        return graph ? graph.querySelector(".js-plotly-plot") : null;
+    }
+
+    // main.encode_array output -> Float32Array / Float64Array, reshaped to rows when it has a shape
+    function decode(encoded) {
+        var bytes = Uint8Array.from(atob(encoded.bdata), function (c) { return c.charCodeAt(0); });
+        var values = encoded.dtype === "f8" ? new Float64Array(bytes.buffer) : new Float32Array(bytes.buffer);
+        if (!encoded.shape) {
+            return values;
+        }
+        var width = parseInt(encoded.shape.split(",")[1], 10);
+        var rows = [];
+        for (var i = 0; i < values.length; i += width) {
+            rows.push(values.subarray(i, i + width));
+        }
+        return rows;
+    }
+
+    function div(text, style) {
+        return {type: "Div", namespace: "dash_html_components", props: style ? {children: text, style: style} : {children: text}};
+    }
+
+    function handlers(maxLines) {
+        return {
+            levels: function (data) {
+                live.db_count = data.x0 + data.y.length;
+                var graph = plot("db-level-graph");
+                if (!graph) { return; }
+                var x = data.y.map(function (_, i) { return data.x0 + i; });
+                Plotly.extendTraces(graph, {x: [x], y: [data.y]}, [0], live.window);
+            },
+            spectrogram: function (data) {
+                live.column = data.end;
+                var graph = plot("spectrogram-graph");
+                if (!graph) { return; }
+                Plotly.extendTraces(graph, {x: [data.x], z: [decode(data.z)]}, [0], live.columns);
+            },
+            waveform: function (data) {
+                var graph = plot("waveform-graph");
+                if (!graph) { return; }
+                Plotly.restyle(graph, {y: [decode(data.y)]}, [0]);
+                var range = graph.layout.yaxis.range;
+                if (!range || range[0] !== data.range[0] || range[1] !== data.range[1]) {
+                    Plotly.relayout(graph, {"yaxis.range": data.range});
+                }
+            },
+            stats: function (data) {
+                var set = window.dash_clientside.set_props;
+                set("current-db-display", {children: data.text,
+                                           style: {fontSize: "48px", color: data.color, textAlign: "center"}});
+                var lines = data.lines.map(function (line) { return div(line); });
+                if (data.note) {
+                    lines.push(div(data.note, {fontSize: "14px", color: "gray"}));
+                }
+                set("statistics-display", {children: lines});
+            },
+            history: function (data) {
+                var graph = plot("history-graph");
+                // Leave a zoomed-in graph alone; double-click to zoom out resumes the updates
+                if (!graph || graph.layout.xaxis.autorange === false) { return; }
+                var x = decode(data.x);
+                Plotly.restyle(graph, {x: [x, x, x], y: [decode(data.min), decode(data.max), decode(data.leq)]},
+                               [0, 1, 2]);
+            },
+            transcript: function (data) {
+                segments.last_id = data.last_id;
+                transcript = transcript.concat(data.lines);
+                if (transcript.length > maxLines) {
+                    // The display is full: keep the newest half so appends can resume
+                    transcript = transcript.slice(-Math.floor(maxLines / 2));
+                }
+                window.dash_clientside.set_props("transcription-display",
+                                                 {children: transcript.map(function (line) { return div(line); })});
+            }
+        };
+    }
+
+    function open(historyRange, maxLines) {
+        var params = new URLSearchParams();
+        if (live) {
+            params.set("channel", live.channel);
+            params.set("stream", live.stream);
+            params.set("db_count", live.db_count);
+            params.set("column", live.column);
+        }
+        if (segments) {
+            params.set("segment", segments.last_id);
+        }
+        if (historyRange !== null && historyRange !== undefined) {
+            params.set("history", historyRange);
+        }
+        var url = "/live?" + params.toString();
+        source = new EventSource(url);
+        var on = handlers(maxLines);
+        Object.keys(on).forEach(function (name) {
+            source.addEventListener(name, function (event) { on[name](JSON.parse(event.data)); });
+        });
+        // The stream was stopped or restarted (possibly from another page): stop here and have
+        // Dash refresh the channels and redraw the figures, which sets a new cursor and connects again
+        source.addEventListener("reset", function () {
+            source.close();
+            source = null;
+            window.dash_clientside.set_props("live-reset", {data: Date.now()});
+        });
+        // The browser would reconnect with the original cursors; reconnect from the current ones instead
+        source.onerror = function () {
+            source.close();
+            source = null;
+            retry = setTimeout(function () { retry = null; open(historyRange, maxLines); }, 1000);
+        };
+        return url;
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.live = {
+        // Clientside callback: (re)connect to /live. A cursor the server just rendered replaces
+        // the one advanced here; otherwise (e.g. a new history range) the page resumes where it is.
+        connect: function (cursor, transcriptCursor, historyRange) {
+            if (source) {
+                source.close();
+                source = null;
+            }
+            if (retry) {
+                clearTimeout(retry);
+                retry = null;
+            }
+            if (JSON.stringify(cursor) !== liveFrom) {
+                liveFrom = JSON.stringify(cursor);
+                live = cursor ? Object.assign({}, cursor) : null;
+            }
+            var maxLines = 200;
+            if (transcriptCursor) {
+                maxLines = transcriptCursor.max_lines;
+                if (JSON.stringify(transcriptCursor) !== segmentsFrom) {
+                    segmentsFrom = JSON.stringify(transcriptCursor);
+                    segments = {last_id: transcriptCursor.last_id};
+                    transcript = transcriptCursor.lines.slice();
+                }
+            }
+            return open(historyRange, maxLines);
+        }
+    };
+})();
@@ -1,23 +1,39 @@
-import pyaudio
-import numpy as np
+from audio_sources import SourceStream
+from device_manager import audio_context
+
+PA_FLOAT32 = 1  # pyaudio.paFloat32, without importing pyaudio before a device is opened
 
 class AudioInput:
-    def __init__(self, device_index=None):
-        self.p = pyaudio.PyAudio()
-        self.device_index = device_index if device_index is not None else self.select_device()
+    def __init__(self, device_index=None, source=None, rate=44100, channels=1, frames_per_buffer=1024, realtime=True,
+                 context=None, ready=None):
+        # With `source` (an audio_sources.AudioSource) no sound device or PortAudio context is needed;
+        # realtime=False runs it as fast as `ready()` allows (see audio_sources.SourceStream).
+        # Devices share `context` (default: device_manager.audio_context) instead of opening their own;
+        # it is only held from start_stream() to stop_stream().
+        self.source = source
+        self.rate = source.sample_rate if source is not None else rate
+        self.channels = source.channels if source is not None else channels
+        self.frames_per_buffer = frames_per_buffer
+        self.realtime = realtime
+        self.ready = ready
+        self.context = context or audio_context
+        self.p = None
+        if source is None:
+            self.device_index = device_index if device_index is not None else self.select_device()
+        else:
+            self.device_index = None
         self.stream = None
 
     def select_device(self):
+        devices = self.context.devices()
         print("Available input devices:")
-        for i in range(self.p.get_device_count()):
-            dev_info = self.p.get_device_info_by_index(i)
-            if dev_info['maxInputChannels'] > 0:
-                print(f"{i}: {dev_info['name']}")
-        
+        for device in devices:
+            print(f"{device['index']}: {device['name']}")
+
         while True:
             try:
                 selection = int(input("Select input device by number: "))
-                if 0 <= selection < self.p.get_device_count():
+                if any(device["index"] == selection for device in devices):
                     return selection
                 else:
                     print("Invalid selection. Please try again.")
@@ -25,17 +41,32 @@ class AudioInput:
                 print("Please enter a valid number.")
 
     def start_stream(self, callback):
-        self.stream = self.p.open(format=pyaudio.paFloat32,
-                                  channels=1,
-                                  rate=44100,
-                                  input=True,
-                                  input_device_index=self.device_index,
-                                  frames_per_buffer=1024,
-                                  stream_callback=callback)
+        if self.source is not None:
+            self.stream = SourceStream(self.source, callback, frames_per_buffer=self.frames_per_buffer,
+                                       realtime=self.realtime, ready=self.ready)
+        else:
+            self.p = self.context.acquire()
+            try:
+                self.stream = self.p.open(format=PA_FLOAT32,
+                                          channels=self.channels,
+                                          rate=self.rate,
+                                          input=True,
+                                          input_device_index=self.device_index,
+                                          frames_per_buffer=self.frames_per_buffer,
+                                          stream_callback=callback)
+            except Exception:
+                self.context.release()
+                self.p = None
+                raise
         self.stream.start_stream()
 
     def stop_stream(self):
+        # Stops the callback (it has returned once stop_stream() does) and closes the stream;
+        # safe to call more than once
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
-        self.p.terminate()
+            self.stream = None
+        if self.p is not None:
+            self.context.release()
+            self.p = None
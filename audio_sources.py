@@ -0,0 +1,270 @@
+import threading
+import time
+import wave
+import numpy as np
+
+# Non-device audio sources that drive the same stream callback as a live PyAudio stream.
+# Every source yields float32 samples shaped (frames, channels); SourceStream turns them into
+# interleaved float32 bytes and calls callback(in_data, frame_count, time_info, status).
+
+# Same values as pyaudio.paContinue / paComplete / paAbort
+CONTINUE = 0
+COMPLETE = 1
+ABORT = 2
+
+class AudioSource:
+    def __init__(self, sample_rate=44100, channels=1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.position = 0  # Frames produced so far
+
+    def read(self, frames):
+        # Returns up to `frames` frames as float32 (frames, channels), or an empty array at the end
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class WavFileSource(AudioSource):
+    def __init__(self, path, loop=False):
+        self._wave = wave.open(path, "rb")
+        super().__init__(self._wave.getframerate(), self._wave.getnchannels())
+        self.sample_width = self._wave.getsampwidth()
+        self.loop = loop
+
+    def read(self, frames):
+        raw = self._wave.readframes(frames)
+        if not raw and self.loop:
+            self._wave.rewind()
+            raw = self._wave.readframes(frames)
+        samples = pcm_to_float32(raw, self.sample_width).reshape(-1, self.channels)
+        self.position += len(samples)
+        return samples
+
+    def close(self):
+        self._wave.close()
+
+class RawFileSource(AudioSource):
+    # Headerless interleaved samples, memory-mapped so large archives are not loaded up front
+    def __init__(self, path, sample_rate=44100, channels=1, dtype="<f4", loop=False):
+        super().__init__(sample_rate, channels)
+        data = np.memmap(path, dtype=np.dtype(dtype), mode="r")
+        self._data = data[:len(data) - len(data) % channels].reshape(-1, channels)
+        self.loop = loop
+
+    def read(self, frames):
+        if self.position >= len(self._data):
+            if not self.loop or len(self._data) == 0:
+                return np.empty((0, self.channels), dtype=np.float32)
+            self.position = 0
+        chunk = self._data[self.position:self.position + frames]
+        self.position += len(chunk)
+        if chunk.dtype.kind in "iu":
+            return pcm_to_float32(np.ascontiguousarray(chunk).tobytes(), chunk.dtype.itemsize).reshape(-1, self.channels)
+        return chunk.astype(np.float32)
+
+class SyntheticSource(AudioSource):
+    # Deterministic generators: the output depends only on the parameters, the seed and the position
+    def __init__(self, sample_rate=44100, channels=1, duration=None, amplitude=0.5):
+        super().__init__(sample_rate, channels)
+        self.total_frames = None if duration is None else int(duration * sample_rate)
+        self.amplitude = amplitude
+
+    def read(self, frames):
+        if self.total_frames is not None:
+            frames = max(0, min(frames, self.total_frames - self.position))
+        t = (self.position + np.arange(frames)) / self.sample_rate
+        mono = (self.amplitude * self.generate(t)).astype(np.float32)
+        self.position += frames
+        return np.repeat(mono[:, None], self.channels, axis=1)
+
+    def generate(self, t):
+        raise NotImplementedError
+
+class ToneSource(SyntheticSource):
+    def __init__(self, frequencies=(440.0,), **kwargs):
+        super().__init__(**kwargs)
+        self.frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+
+    def generate(self, t):
+        return np.sin(2 * np.pi * np.outer(t, self.frequencies)).mean(axis=1)
+
+class NoiseSource(SyntheticSource):
+    def __init__(self, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.seed = seed
+
+    def generate(self, t):
+        # Seed from the block position so the stream is reproducible regardless of read sizes
+        if len(t) == 0:
+            return t
+        start = int(round(t[0] * self.sample_rate))
+        out = np.empty(len(t))
+        block = 4096
+        for offset in range(start - start % block, start + len(t), block):
+            rng = np.random.default_rng((self.seed, offset // block))
+            values = rng.uniform(-1, 1, block)
+            lo = max(offset, start)
+            hi = min(offset + block, start + len(t))
+            out[lo - start:hi - start] = values[lo - offset:hi - offset]
+        return out
+
+class ChirpSource(SyntheticSource):
+    # Linear sweep from f0 to f1 over `sweep_seconds`, repeating
+    def __init__(self, f0=100.0, f1=8000.0, sweep_seconds=2.0, **kwargs):
+        super().__init__(**kwargs)
+        self.f0 = f0
+        self.f1 = f1
+        self.sweep_seconds = sweep_seconds
+
+    def generate(self, t):
+        tau = np.mod(t, self.sweep_seconds)
+        rate = (self.f1 - self.f0) / self.sweep_seconds
+        return np.sin(2 * np.pi * (self.f0 * tau + 0.5 * rate * tau ** 2))
+
+class SpeechLikeSource(SyntheticSource):
+    # Voiced "syllables" (a glottal harmonic series shaped by two formants) separated by pauses.
+    # Not intelligible speech, but it exercises levels, spectra and voice-activity detection.
+    def __init__(self, pitch=120.0, syllable_seconds=0.25, pause_seconds=0.6, **kwargs):
+        super().__init__(**kwargs)
+        self.pitch = pitch
+        self.syllable_seconds = syllable_seconds
+        self.pause_seconds = pause_seconds
+        self.formants = ((700.0, 1200.0), (300.0, 2300.0), (500.0, 900.0))  # /a/, /i/, /o/
+
+    def generate(self, t):
+        period = 4 * self.syllable_seconds + self.pause_seconds  # Four syllables, then a pause
+        phase = np.mod(t, period)
+        syllable = np.minimum((phase // self.syllable_seconds).astype(int), 4)
+        within = np.mod(phase, self.syllable_seconds) / self.syllable_seconds
+        envelope = np.where(syllable < 4, np.sin(np.pi * within) ** 2, 0.0)
+
+        harmonics = np.arange(1, 30)
+        f1 = np.choose(syllable % 3, [f[0] for f in self.formants])
+        f2 = np.choose(syllable % 3, [f[1] for f in self.formants])
+        freqs = self.pitch * harmonics
+        # Harmonic weights from two resonance peaks around the vowel's formants
+        weights = (1 / (1 + ((freqs[None, :] - f1[:, None]) / 150) ** 2)
+                   + 0.5 / (1 + ((freqs[None, :] - f2[:, None]) / 200) ** 2))
+        voiced = (weights * np.sin(2 * np.pi * np.outer(t, freqs))).sum(axis=1) / weights.sum(axis=1)
+        return 2 * envelope * voiced
+
+def pcm_to_float32(raw, sample_width):
+    # Integer PCM bytes to float32 in [-1, 1)
+    if sample_width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    if sample_width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        as_int = (data[:, 0].astype(np.int32) | (data[:, 1].astype(np.int32) << 8)
+                  | (data[:, 2].astype(np.int32) << 16))
+        as_int = np.where(as_int >= 1 << 23, as_int - (1 << 24), as_int)
+        return as_int.astype(np.float32) / (1 << 23)
+    if sample_width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    raise ValueError(f"Unsupported sample width: {sample_width}")
+
+def create_source(spec, sample_rate=44100, duration=None):
+    # Build a source from a short spec such as "tone:440", "noise", "chirp", "speech",
+    # "wav:/path/file.wav" or "raw:/path/file.f32". Synthetic sources end after `duration`
+    # seconds (endless without it); file sources end with the file.
+    kind, _, argument = spec.partition(":")
+    if kind == "tone":
+        freqs = [float(f) for f in argument.split(",")] if argument else [440.0]
+        return ToneSource(freqs, sample_rate=sample_rate, duration=duration)
+    if kind == "noise":
+        return NoiseSource(seed=int(argument or 0), sample_rate=sample_rate, amplitude=0.1, duration=duration)
+    if kind == "chirp":
+        return ChirpSource(sample_rate=sample_rate, duration=duration)
+    if kind == "speech":
+        return SpeechLikeSource(sample_rate=sample_rate, duration=duration)
+    if kind == "wav":
+        return WavFileSource(argument)
+    if kind == "raw":
+        return RawFileSource(argument, sample_rate=sample_rate)
+    raise ValueError(f"Unknown audio source: {spec}")
+
+class SourceStream:
+    # Stand-in for a PyAudio callback stream that pulls from an AudioSource on its own thread,
+    # either paced at real time or as fast as the consumer allows (offline processing).
+    # Offline, `ready()` is asked before every block and the stream waits while it returns False,
+    # so a consumer draining a ring buffer on another thread is never lapped.
+    def __init__(self, source, callback, frames_per_buffer=1024, realtime=True, ready=None, max_frames=None):
+        self.source = source
+        self.callback = callback
+        self.frames_per_buffer = frames_per_buffer
+        self.realtime = realtime
+        self.ready = ready
+        self.max_frames = max_frames  # Stop after this many frames (e.g. for endless synthetic sources)
+        self.frames_delivered = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start_stream(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="source-stream", daemon=True)
+        self._thread.start()
+
+    def stop_stream(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop_stream()
+        self.source.close()
+
+    def is_active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        # Block until the source is exhausted (useful for offline runs)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        started = time.perf_counter()
+        while not self._stop_event.is_set():
+            if self.max_frames is not None and self.frames_delivered >= self.max_frames:
+                break
+            block = self.source.read(self.frames_per_buffer)
+            if len(block) == 0:
+                break
+            if len(block) < self.frames_per_buffer:  # Pad the last block like a device would
+                padded = np.zeros((self.frames_per_buffer, self.source.channels), dtype=np.float32)
+                padded[:len(block)] = block
+                block = padded
+
+            if self.realtime:
+                due = started + self.frames_delivered / self.source.sample_rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+            elif self.ready is not None:
+                while not self.ready() and not self._stop_event.wait(0.001):
+                    pass
+                if self._stop_event.is_set():
+                    break
+
+            now = time.perf_counter() - started
+            time_info = {"input_buffer_adc_time": now, "current_time": now, "output_buffer_dac_time": 0.0}
+            _, flag = self.callback(block.tobytes(), self.frames_per_buffer, time_info, 0)
+            self.frames_delivered += self.frames_per_buffer
+            if flag != CONTINUE:
+                break
+
+def run_offline(source, callback, frames_per_buffer=1024, ready=None, max_frames=None):
+    # Push a whole source through `callback` as fast as `ready` allows; returns (frames, seconds).
+    # Endless sources (synthetic ones without a duration) need `max_frames`.
+    if max_frames is None and getattr(source, "total_frames", 0) is None:
+        raise ValueError("an endless source needs a duration or max_frames for an offline run")
+    stream = SourceStream(source, callback, frames_per_buffer=frames_per_buffer, realtime=False, ready=ready,
+                          max_frames=max_frames)
+    started = time.perf_counter()
+    stream.start_stream()
+    stream.wait()
+    return stream.frames_delivered, time.perf_counter() - started
@@ -0,0 +1,152 @@
+"""Start-up time and stream lifecycle benchmark for the dashboard.
+
+Measures the cold-start time of `import main` in fresh interpreters, then switches the capture
+devices over and over (synthetic sources, alternating latency profiles) and reports resident
+memory, live threads, cached dashboard entries and PortAudio context users after each round,
+so leaked streams, threads or buffers show up as growth:
+
+    python benchmarks/bench_lifecycle.py
+    python benchmarks/bench_lifecycle.py --switches 200 --dwell 0.05
+
+Without Dash, plotly or the other dashboard dependencies the switches go through
+capture.CaptureStream directly and the start-up measurement is reported as skipped.
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_pipeline import RESULTS_DIR, git_revision  # noqa: E402
+
+COLD_START = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+def resident_bytes():
+    # Current RSS from /proc (Linux); 0 where it is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def cold_start(runs):
+    # Seconds to import main (build the app, no devices opened) in a fresh interpreter, per run
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", COLD_START], cwd=ROOT, capture_output=True, text=True)
+        total = time.perf_counter() - started
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append({"import_s": float(result.stdout.strip().splitlines()[-1]), "process_s": total})
+    return timings, None
+
+def dashboard_switcher():
+    # Switch through main.start_audio_stream, exactly as the device dropdown does
+    import main
+
+    def switch(devices, profile):
+        options, channel = main.start_audio_stream(devices, profile, None)
+        if channel is not None:
+            main.initialize_graphs(channel, options)  # What a client does after each switch
+
+    def state():
+        return {"streams": len(main.capture_streams), "cache_entries": len(main.snapshot_cache._entries)}
+
+    return switch, state
+
+def capture_switcher():
+    # The same switching with capture.CaptureStream alone
+    from audio_sources import create_source
+    from capture import CaptureStream
+    from db_calculator import DBCalculator
+    from stream_config import StreamConfig
+    streams = {}
+
+    def switch(devices, profile):
+        for key in [key for key in streams if key not in devices or streams[key].config.profile != profile]:
+            streams.pop(key).stop()
+        for value in devices:
+            if value not in streams:
+                source = create_source(value)
+                config = StreamConfig(source.sample_rate, source.channels, profile)
+                stream = CaptureStream(value, value, config, DBCalculator(sample_rate=config.sample_rate),
+                                       source=source)
+                stream.start()
+                streams[value] = stream
+
+    def state():
+        return {"streams": len(streams)}
+
+    return switch, state
+
+def switching(switches, dwell, report_every):
+    from device_manager import audio_context
+    try:
+        switch, state = dashboard_switcher()
+        mode = "dashboard"
+    except Exception as exc:  # Dash, plotly, pyaudio or speech_recognition not available
+        switch, state = capture_switcher()
+        mode = f"capture only ({exc})"
+
+    selections = [["tone:440"], ["noise"], ["noise", "chirp"], ["speech"], ["tone:440", "speech"]]
+    profiles = ["balanced", "low-latency", "high-throughput"]
+    rows = []
+    for i in range(switches + 1):
+        if i:
+            switch(selections[i % len(selections)], profiles[(i // len(selections)) % len(profiles)])
+            time.sleep(dwell)
+        if i % report_every == 0:
+            gc.collect()
+            rows.append({"switches": i, "rss_mb": resident_bytes() / 2 ** 20, "threads": threading.active_count(),
+                         "context_users": audio_context.users(), **state()})
+    switch([], "balanced")
+    gc.collect()
+    rows.append({"switches": "closed", "rss_mb": resident_bytes() / 2 ** 20, "threads": threading.active_count(),
+                 "context_users": audio_context.users(), **state()})
+    return mode, rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cold-starts", type=int, default=3)
+    parser.add_argument("--switches", type=int, default=100)
+    parser.add_argument("--dwell", type=float, default=0.1, help="Seconds each selection runs")
+    parser.add_argument("--report-every", type=int, default=10)
+    parser.add_argument("--output", help="Where to save the JSON results (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    timings, note = cold_start(args.cold_starts)
+    if timings:
+        imports = [t["import_s"] for t in timings]
+        processes = [t["process_s"] for t in timings]
+        print(f"cold start: import main {1000 * np.median(imports):.0f} ms (median of {len(imports)}), "
+              f"whole interpreter {1000 * np.median(processes):.0f} ms")
+    else:
+        print(f"cold start skipped: {note}")
+
+    mode, rows = switching(args.switches, args.dwell, args.report_every)
+    print(f"device switching via {mode}")
+    print(f"{'switches':>9} {'rss MB':>8} {'threads':>8} {'streams':>8} {'ctx users':>10} {'cache':>6}")
+    for row in rows:
+        print(f"{row['switches']:>9} {row['rss_mb']:>8.1f} {row['threads']:>8} {row['streams']:>8} "
+              f"{row['context_users']:>10} {row.get('cache_entries', '-'):>6}")
+
+    revision = git_revision()
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}-lifecycle.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"revision": revision, "created": time.time(), "python": sys.version.split()[0],
+                   "cold_start": timings, "cold_start_note": note, "switching_mode": mode,
+                   "switching": rows}, f, indent=1)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
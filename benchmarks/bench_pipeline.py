@@ -0,0 +1,332 @@
+"""Benchmarks for the capture -> analysis -> render -> serialize path.
+
+Drives each stage with synthetic buffers for every buffer size / sample rate combination and
+reports latency percentiles, throughput (audio buffers per second) and retained allocations.
+Results are saved as JSON so a later run can be compared against an earlier commit:
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --buffer-sizes 256,1024 --sample-rates 48000
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<earlier>.json
+
+Stages whose dependencies are missing (Dash/plotly for the dashboard, pygame for the
+visualizer) are reported as skipped.
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_sources import NoiseSource  # noqa: E402
+from analysis_worker import AnalysisWorker  # noqa: E402
+from capture import open_capture_stream  # noqa: E402
+from db_calculator import DBCalculator, LevelStatistics  # noqa: E402
+from level_history import LevelHistory  # noqa: E402
+from recorder import SessionRecorder  # noqa: E402
+from ring_buffer import AudioRingBuffer  # noqa: E402
+from shared_stream import SharedStreamPublisher, SharedStreamReader  # noqa: E402
+from spectrogram import STFTSpectrogram  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def measure(func, iterations, frames_per_call, warmup=5):
+    # Times `func` per call, then counts allocations in a separate traced pass
+    for _ in range(warmup):
+        func()
+    gc.collect()
+    gc.disable()
+    try:
+        timings = np.empty(iterations)
+        for i in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings[i] = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    traced = max(1, min(iterations, 20))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(traced):
+        func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+
+    microseconds = timings * 1e6
+    return {
+        "iterations": iterations,
+        "p50_us": float(np.percentile(microseconds, 50)),
+        "p90_us": float(np.percentile(microseconds, 90)),
+        "p99_us": float(np.percentile(microseconds, 99)),
+        "max_us": float(microseconds.max()),
+        "frames_per_sec": frames_per_call / float(np.mean(timings)) if timings.mean() > 0 else float("inf"),
+        "retained_bytes_per_call": allocated / traced,
+        "retained_blocks_per_call": blocks / traced,
+    }
+
+def pipeline_stages(sample_rate, buffer_size, batch):
+    source = NoiseSource(seed=1, sample_rate=sample_rate)
+    buffers = [source.read(buffer_size)[:, 0].copy() for _ in range(batch)]
+    raw = [b.tobytes() for b in buffers]
+    block = np.stack(buffers)
+
+    ring = AudioRingBuffer(capacity=sample_rate * 4)
+    calculator = DBCalculator(sample_rate=sample_rate)
+    a_weighted = DBCalculator(sample_rate=sample_rate, weighting="A")
+    stats = LevelStatistics(window=50)
+    stft = STFTSpectrogram(sample_rate=sample_rate, fft_size=1024, hop_size=512)
+
+    counter = [0]
+    def callback():
+        # What the PortAudio callback does per buffer
+        ring.write(np.frombuffer(raw[counter[0] % batch], dtype=np.float32))
+        counter[0] += 1
+
+    def legacy_fft():
+        # The original per-buffer complex FFT, kept for comparison
+        np.abs(np.fft.fft(buffers[0])[:buffer_size // 2])
+
+    worker_ring = AudioRingBuffer(capacity=buffer_size * batch * 4)
+    worker = AnalysisWorker(worker_ring, calculator, lambda levels, spectra: stats.update_batch(levels[:, 0]),
+                            frame_size=buffer_size, max_batch=batch,
+                            spectrogram=STFTSpectrogram(sample_rate=sample_rate, fft_size=1024, hop_size=512))
+    def analysis_batch():
+        worker_ring.write(block.reshape(-1))
+        worker.process_pending()
+
+    # Eight channels through the same worker: one strided (channels x frames) write per buffer
+    channels = 8
+    interleaved = np.repeat(block.reshape(-1), channels).reshape(-1, channels)
+    multi_ring = AudioRingBuffer(capacity=buffer_size * batch * 4, channels=channels)
+    multi_worker = AnalysisWorker(multi_ring, calculator, lambda levels, spectra: None,
+                                  frame_size=buffer_size, max_batch=batch,
+                                  spectrogram=STFTSpectrogram(sample_rate=sample_rate, fft_size=1024, hop_size=512,
+                                                              channels=channels))
+    def analysis_batch_multichannel():
+        multi_ring.write(interleaved.T)
+        multi_worker.process_pending()
+
+    # A level history already holding an 8 hour shift of frame levels
+    history = LevelHistory(buffer_size / sample_rate)
+    history.append(np.random.default_rng(4).uniform(30, 90, int(8 * 3600 * sample_rate / buffer_size)))
+    levels = np.full(batch, 60.0)
+
+    return {
+        "callback_ring_write": (callback, 1),
+        "calculate_db": (lambda: calculator.calculate_db(buffers[0]), 1),
+        "calculate_db_batch": (lambda: calculator.calculate_db_batch(block), batch),
+        "calculate_db_batch_a_weighted": (lambda: a_weighted.calculate_db_batch(block), batch),
+        "level_statistics_update": (lambda: stats.update_batch(np.full(batch, 60.0)), batch),
+        "level_history_append": (lambda: history.append(levels), batch),
+        "level_history_query_1min": (lambda: history.query(-60, None, 1000), 1),
+        "level_history_query_8h": (lambda: history.query(None, None, 1000), 1),
+        "fft_legacy_complex": (legacy_fft, 1),
+        "stft_process": (lambda: stft.process(buffers[0]), 1),
+        "analysis_worker_batch": (analysis_batch, batch),
+        "analysis_worker_batch_8ch": (analysis_batch_multichannel, batch * channels),
+    }
+
+def recorder_stages(buffer_size, directory):
+    recorder = SessionRecorder(directory, {
+        "timestamp": ("<f8", ()),
+        "db_level": ("<f4", ()),
+        "waveform": ("<f4", (1024,)),
+        "spectrogram": ("<f4", (513,)),
+    })
+    waveform = np.zeros(1024, dtype=np.float32)
+    spectrum = np.zeros(513, dtype=np.float32)
+
+    def record_and_flush():
+        recorder.record(timestamp=time.time(), db_level=60.0, waveform=waveform, spectrogram=spectrum)
+        recorder.flush()
+
+    return {
+        "recorder_record": (lambda: recorder.record(timestamp=0.0, db_level=60.0, waveform=waveform,
+                                                    spectrogram=spectrum), 1),
+        "recorder_record_and_flush": (record_and_flush, 1),
+    }, recorder
+
+def shared_stream_stages(batch):
+    # Multi-process mode: an analysis batch that is also published to shared memory, and what a
+    # dashboard process reads for one channel snapshot (levels, waveform, spectrogram, statistics)
+    source = NoiseSource(seed=5, sample_rate=44100)
+    stream = open_capture_stream("noise", "balanced")  # Never started; fed directly below
+    publisher = SharedStreamPublisher(stream)
+    reader = SharedStreamReader(publisher.name)
+    block = source.read(stream.frame_size * batch)[:, 0]
+    for _ in range(8):
+        stream.ring_buffer.write(block)
+        stream.worker.process_pending()
+
+    def publish_batch():
+        stream.ring_buffer.write(block)
+        stream.worker.process_pending()
+
+    waveform_samples = stream.config.waveform_samples()
+    def read_channel():
+        reader.level_stats[0].levels_since(0)
+        reader.level_stats[0].snapshot()
+        reader.ring_buffer.read_latest(waveform_samples, channel=0)
+        reader.spectrogram.columns_since(reader.spectrogram.oldest_column(), 0)
+
+    return {
+        "shared_publish_batch": (publish_batch, batch),
+        "shared_read_channel": (read_channel, 1),
+    }, (reader, publisher)
+
+def dashboard_stages():
+    # initialize_graphs as Dash runs it (build the outputs, then JSON-encode them), and one /live push
+    try:
+        import plotly.io.json as plotly_json
+        import main
+    except Exception as exc:  # Dash, plotly, pyaudio or speech_recognition not available
+        return {}, f"dashboard skipped: {exc}"
+
+    source = NoiseSource(seed=2, sample_rate=44100)
+    stream = main.open_capture_stream("noise", "balanced")  # Registered but never started; fed directly below
+    main.capture_streams["noise"] = stream
+    channel = "noise#0"
+    stream.ring_buffer.write(source.read(44100 * 4)[:, 0])
+    stream.level_stats[0].update_batch(np.linspace(40, 80, 100))
+    stream.spectrogram.process(source.read(44100 * 4)[:, 0])
+
+    def encode(outputs):
+        return plotly_json.to_json_plotly(list(outputs))
+
+    def cold():
+        # A tick nobody has asked for yet: the shared snapshots are rebuilt
+        main.snapshot_cache.clear()
+        encode(main.initialize_graphs(channel, None))
+
+    cursor = dict(main.initialize_graphs(channel, None)[-1], segment=None, history=None)
+    def live_push():
+        # One PortAudio buffer of new audio, then the events a connected client is pushed for it
+        block = source.read(1024)[:, 0]
+        stream.ring_buffer.write(block)
+        stream.level_stats[0].update(60.0)
+        stream.spectrogram.process(block)
+        main.live_chunks(cursor)
+
+    return {
+        "initialize_graphs": (cold, 1),
+        "initialize_graphs_shared": (lambda: encode(main.initialize_graphs(channel, None)), 1),
+        "live_push": (live_push, 1),
+    }, None
+
+def visualizer_stages(buffer_size):
+    try:
+        from visualizer import Visualizer
+        visualizers = {width: Visualizer(width=width, height=width * 9 // 16, max_fps=0, headless=True)
+                       for width in (800, 1920)}
+    except Exception as exc:
+        return {}, f"visualizer skipped: {exc}"
+    samples = NoiseSource(seed=3).read(buffer_size)[:, 0]
+    return {f"visualizer_update_{width}px": (lambda v=visualizer: v.update(samples, 60.0), 1)
+            for width, visualizer in visualizers.items()}, None
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(buffer_sizes, sample_rates, iterations, batch):
+    results = []
+    notes = []
+    for sample_rate in sample_rates:
+        for buffer_size in buffer_sizes:
+            for name, (func, frames) in pipeline_stages(sample_rate, buffer_size, batch).items():
+                results.append({"stage": name, "sample_rate": sample_rate, "buffer_size": buffer_size,
+                                **measure(func, iterations, frames)})
+    for buffer_size in buffer_sizes:
+        with tempfile.TemporaryDirectory(prefix="bench-recorder-") as directory:
+            stages, recorder = recorder_stages(buffer_size, directory)
+            for name, (func, frames) in stages.items():
+                results.append({"stage": name, "sample_rate": None, "buffer_size": buffer_size,
+                                **measure(func, iterations, frames)})
+            recorder.stop()
+
+        stages, note = visualizer_stages(buffer_size)
+        if note and note not in notes:
+            notes.append(note)
+        for name, (func, frames) in stages.items():
+            results.append({"stage": name, "sample_rate": None, "buffer_size": buffer_size,
+                            **measure(func, iterations, frames)})
+
+    stages, (reader, publisher) = shared_stream_stages(batch)
+    for name, (func, frames) in stages.items():
+        results.append({"stage": name, "sample_rate": 44100, "buffer_size": 1024,
+                        **measure(func, iterations, frames)})
+    reader.stop()
+    publisher.close()
+
+    stages, note = dashboard_stages()
+    if note:
+        notes.append(note)
+    for name, (func, frames) in stages.items():
+        results.append({"stage": name, "sample_rate": 44100, "buffer_size": 1024,
+                        **measure(func, max(10, iterations // 10), frames)})
+    return results, notes
+
+def result_key(row):
+    return (row["stage"], row["sample_rate"], row["buffer_size"])
+
+def print_table(results, baseline=None):
+    baseline_rows = {result_key(row): row for row in (baseline or [])}
+    header = f"{'stage':34} {'rate':>6} {'buffer':>6} {'p50 us':>10} {'p99 us':>10} {'frames/s':>12} {'bytes/call':>11}"
+    if baseline_rows:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    for row in results:
+        line = (f"{row['stage']:34} {row['sample_rate'] or '-':>6} {row['buffer_size']:>6} "
+                f"{row['p50_us']:>10.1f} {row['p99_us']:>10.1f} {row['frames_per_sec']:>12.0f} "
+                f"{row['retained_bytes_per_call']:>11.0f}")
+        base = baseline_rows.get(result_key(row))
+        if base and base["p50_us"] > 0:
+            line += f" {100 * (row['p50_us'] / base['p50_us'] - 1):>+11.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buffer-sizes", default="256,1024,4096")
+    parser.add_argument("--sample-rates", default="16000,44100,48000")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=16, help="Frames per analysis batch")
+    parser.add_argument("--output", help="Where to save the JSON results (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    buffer_sizes = [int(x) for x in args.buffer_sizes.split(",")]
+    sample_rates = [int(x) for x in args.sample_rates.split(",")]
+    results, notes = run(buffer_sizes, sample_rates, args.iterations, args.batch)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+    for note in notes:
+        print(note)
+
+    revision = git_revision()
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"revision": revision, "created": time.time(), "python": sys.version.split()[0],
+                   "numpy": np.__version__, "results": results, "notes": notes}, f, indent=1)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
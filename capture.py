@@ -0,0 +1,261 @@
+import argparse
+import itertools
+import os
+import re
+import threading
+import time
+import numpy as np
+from analysis_worker import AnalysisWorker
+from audio_input import AudioInput
+from audio_sources import CONTINUE, create_source
+from db_calculator import DBCalculator, LevelStatistics
+from device_manager import audio_context
+from level_history import LevelHistory
+from metrics import label_value
+from recorder import SessionRecorder
+from ring_buffer import AudioRingBuffer
+from spectrogram import STFTSpectrogram
+from stream_config import DEFAULT_PROFILE, LATENCY_PROFILES, StreamConfig
+
+# Stream ids start from the microseconds since the epoch, so a restarted capture process never hands
+# out an id that open pages still hold for one of its previous streams (and they stay exact in JavaScript)
+_stream_ids = itertools.count(time.time_ns() // 1000)
+HISTORY_FLUSH_INTERVAL = 30.0  # Seconds between flushes of a memory-mapped level history
+
+def stream_directory_name(key):
+    # Device keys are indices or source specs ("tone:440", "wav:/path/x.wav"); make them path-safe
+    return re.sub(r"[^\w.-]+", "_", str(key)).strip("_") or "stream"
+
+class CaptureStream:
+    # One capture device (or test source) with all of its channels.
+    # The stream callback views each interleaved block as (channels x frames) without copying
+    # and writes it into a multi-channel ring; one analysis worker then computes levels and
+    # spectra for every channel in the same vectorized pass. Several CaptureStreams run side by
+    # side in one process, one per device.
+    # Buffer sizes, rates and durations all come from `config` (a stream_config.StreamConfig);
+    # a different config means a new CaptureStream, with every array and axis rebuilt for it.
+    # realtime=False runs a `source` as fast as the analysis keeps up with (see analyze_offline).
+    def __init__(self, key, label, config, db_calculator, device_index=None, source=None, metrics=None,
+                 recording_directory=None, history_directory=None, realtime=True):
+        self.key = key
+        self.label = label
+        self.config = config
+        self.stream_id = next(_stream_ids)  # Distinguishes a restarted stream for the same device
+        self.audio = AudioInput(device_index, source=source, rate=config.sample_rate, channels=config.channels,
+                                frames_per_buffer=config.frames_per_buffer, realtime=realtime,
+                                ready=self._has_room)
+        self.rate = config.sample_rate
+        self.channels = config.channels
+        self.metrics = metrics
+        self.frame_size = config.frame_size
+
+        self.ring_buffer = AudioRingBuffer(capacity=config.ring_capacity(), channels=self.channels)
+        self.spectrogram = STFTSpectrogram(sample_rate=self.rate, fft_size=config.fft_size, hop_size=config.hop_size,
+                                           history_seconds=config.history_seconds, channels=self.channels)
+        self.level_stats = [LevelStatistics(window=config.level_window(), min_db=db_calculator.min_db,
+                                            max_db=db_calculator.max_db) for _ in range(self.channels)]
+        self.spectrum_frame = None  # Latest STFT column per channel (channels x bins, dB)
+        # Every frame level for the whole session, in fixed memory. Under history_directory it is
+        # memory-mapped to one file per device and frame length, which a restarted stream (e.g.
+        # after re-selecting the device, or switching back to a profile) carries on from.
+        history_path = None
+        if history_directory is not None:
+            os.makedirs(history_directory, exist_ok=True)
+            history_path = os.path.join(history_directory,
+                                        f"{stream_directory_name(key)}-{self.rate}-{self.frame_size}.levels")
+        self.level_history = LevelHistory(self.frame_size / self.rate, channels=self.channels, path=history_path)
+        self._history_flusher = None
+        self._stopping = threading.Event()
+        self.updated = threading.Condition()  # Notified after every analysis batch
+        self.listeners = []  # Called as listener(db_levels, spectra) after every analysis batch
+        self.worker = AnalysisWorker(self.ring_buffer, db_calculator, self._publish, frame_size=self.frame_size,
+                                     max_batch=config.max_batch, poll_interval=config.poll_interval,
+                                     spectrogram=self.spectrogram,
+                                     batch_latency=metrics.histogram("analysis_batch") if metrics else None)
+
+        self.recorder = None
+        if recording_directory is not None:
+            channels, bins = self.channels, self.spectrogram.n_bins
+            self.recorder = SessionRecorder(os.path.join(recording_directory, stream_directory_name(key)), {
+                "timestamp": ("<f8", ()),
+                "db_level": ("<f4", (channels,)),
+                "mean_db": ("<f4", (channels,)),
+                "peak_db": ("<f4", (channels,)),
+                "std_dev_db": ("<f4", (channels,)),
+                "waveform": ("<f4", (channels, self.frame_size)),
+                "spectrogram": ("<f4", (channels, bins)),
+            }, max_segment_bytes=64 * 1024 * 1024, max_segment_seconds=3600,
+               write_latency=metrics.histogram("recorder_write") if metrics else None, metadata=config.as_dict())
+        self._recording_lock = threading.Lock()
+        self._stopped = False  # Set by stop(), after which record_snapshot() no longer starts the recorder
+        self._gauges = []
+
+    def channel_label(self, channel):
+        return self.label if self.channels == 1 else f"{self.label} (ch {channel + 1})"
+
+    def _publish(self, db_levels, spectra):
+        # Runs on the analysis thread; db_levels is (frames x channels)
+        for channel, stats in enumerate(self.level_stats):
+            stats.update_batch(db_levels[:, channel])
+        self.level_history.append(db_levels.T)
+        for listener in self.listeners:
+            listener(db_levels, spectra)
+        if len(spectra):
+            self.spectrum_frame = spectra[-1]
+        with self.updated:
+            self.updated.notify_all()
+
+    def _flush_history(self):
+        # Keeps a memory-mapped history resumable (see LevelHistory.flush) whether or not data is saved
+        while not self._stopping.wait(HISTORY_FLUSH_INTERVAL):
+            self.level_history.flush()
+
+    def _has_room(self):
+        # Offline backpressure: room for another source block without lapping the analysis
+        backlog = self.ring_buffer.total_written - self.worker.read_index
+        return backlog + self.config.frames_per_buffer <= self.ring_buffer.capacity
+
+    def wait_for_batch(self, seen, timeout):
+        # Block until the worker has published a batch after the `seen` count; returns the new count
+        with self.updated:
+            self.updated.wait_for(lambda: self.worker.batches != seen, timeout)
+            return self.worker.batches
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        started = time.perf_counter()
+        # Interleaved float32 frames as a (channels x frames) strided view; the ring write is the only copy
+        block = np.frombuffer(in_data, dtype=np.float32).reshape(-1, self.channels).T
+        self.ring_buffer.write(block if self.channels > 1 else block[0])
+        if self.metrics is not None:
+            self.metrics.record_callback(started, time.perf_counter(), frame_count, self.rate, time_info, status,
+                                         stream=self.key)
+        return (in_data, CONTINUE)
+
+    def start(self):
+        if self.metrics is not None:
+            self.metrics.reset_stream(self.key)
+            self._add_gauge("analysis_queue_depth", self.worker.queue_depth)
+            self._add_gauge("analysis_dropped_frames", lambda: self.worker.dropped_frames)
+            if self.recorder is not None:
+                self._add_gauge("recorder_dropped_rows", lambda: self.recorder.dropped_rows)
+        self.worker.start()
+        if self.level_history.path is not None:
+            self._history_flusher = threading.Thread(target=self._flush_history, daemon=True)
+            self._history_flusher.start()
+        try:
+            self.audio.start_stream(self._callback)
+        except Exception:
+            self.stop()  # A device that failed to open leaves no worker thread, gauges or context behind
+            raise
+
+    def stop(self):
+        # Stop the callback first, then analyse whatever it wrote before closing everything else
+        with self._recording_lock:
+            self._stopped = True
+        self.audio.stop_stream()
+        self.worker.stop()
+        while self.worker.process_pending():
+            pass
+        self.stop_recording()
+        self._stopping.set()
+        if self._history_flusher is not None:
+            self._history_flusher.join()
+            self._history_flusher = None
+        self.level_history.flush()
+        for name in self._gauges:
+            self.metrics.remove_gauge(name)
+        self._gauges = []
+
+    def acquire(self):
+        # Same as shared_stream.SharedStreamReader; a stream in this process stays readable after stop()
+        return True
+
+    def release(self):
+        pass
+
+    def _add_gauge(self, name, func):
+        # Prometheus-style label, so per-device gauges share one metric name
+        name = f'{name}{{stream="{label_value(self.key)}"}}'
+        self.metrics.add_gauge(name, func)
+        self._gauges.append(name)
+
+    def record_snapshot(self, timestamp):
+        # Queue one row holding every channel; starts the recorder on first use, unless the stream
+        # has been stopped (the data-saving thread may still hold a stream a callback just closed)
+        if self.recorder is None:
+            return
+        with self._recording_lock:
+            if self._stopped:
+                return
+            if not self.recorder.is_running():
+                self.recorder.start()
+            snapshots = [stats.snapshot() for stats in self.level_stats]
+            _, waveform = self.ring_buffer.read_latest(self.frame_size)
+            self.recorder.record(
+                timestamp=timestamp,
+                db_level=[s["current"] if s else np.nan for s in snapshots],
+                mean_db=[s["mean"] if s else np.nan for s in snapshots],
+                peak_db=[s["peak"] if s else np.nan for s in snapshots],
+                std_dev_db=[s["std"] if s else np.nan for s in snapshots],
+                waveform=waveform if waveform.shape[-1] == self.frame_size else None,
+                spectrogram=self.spectrum_frame,
+            )
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.stop()  # Flushes and closes the current segment
+
+def open_capture_stream(value, profile, label=None, source_sample_rate=44100, max_channels=8, source_duration=None,
+                        **kwargs):
+    # A CaptureStream for a device index, at the device's native rate and up to `max_channels`
+    # channels, or for an audio_sources spec; keyword arguments go to CaptureStream
+    if isinstance(value, str):
+        source = create_source(value, sample_rate=source_sample_rate, duration=source_duration)
+        config = StreamConfig(source.sample_rate, source.channels, profile)
+        device_index = None
+    else:
+        info = audio_context.device(value) or {}
+        config = StreamConfig(info.get("sample_rate", 44100), min(info.get("channels", 1), max_channels), profile)
+        source, device_index = None, value
+        label = label or info.get("name")
+    calculator = DBCalculator(reference_level=-100, min_db=0, max_db=120, sample_rate=config.sample_rate)
+    return CaptureStream(value, label or str(value), config, calculator, device_index=device_index, source=source,
+                         **kwargs)
+
+def analyze_offline(spec, profile, seconds=None, source_sample_rate=44100, **kwargs):
+    # Run a whole source (e.g. "wav:archive.wav", or "noise" with `seconds`) through the same
+    # analysis as a live stream, as fast as it keeps up, without dropping frames; returns the stream
+    stream = open_capture_stream(spec, profile, source_sample_rate=source_sample_rate, source_duration=seconds,
+                                 realtime=False, **kwargs)
+    if getattr(stream.audio.source, "total_frames", 0) is None:
+        stream.stop()
+        raise ValueError(f"{spec} is endless; give it a duration")
+    stream.start()
+    stream.audio.stream.wait()
+    stream.stop()
+    return stream
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse an audio file or synthetic source offline.")
+    parser.add_argument("source", help="audio_sources spec, e.g. wav:take.wav, raw:take.f32, noise")
+    parser.add_argument("--seconds", type=float, help="length of a synthetic source")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(LATENCY_PROFILES))
+    parser.add_argument("--sample-rate", type=int, default=44100, help="rate of synthetic sources and raw files")
+    parser.add_argument("--history-dir", help="keep the level history in a memory-mapped file here")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stream = analyze_offline(args.source, args.profile, args.seconds, source_sample_rate=args.sample_rate,
+                             history_directory=args.history_dir)
+    elapsed = time.perf_counter() - started
+    audio_seconds = stream.worker.processed_frames * stream.frame_size / stream.rate
+    print(f"{audio_seconds:.1f} s of audio in {elapsed:.2f} s ({audio_seconds / elapsed:.0f}x real time), "
+          f"{stream.worker.processed_frames} frames, {stream.worker.dropped_frames} dropped")
+    for channel, stats in enumerate(stream.level_stats):
+        snapshot = stats.snapshot()
+        if snapshot is not None:
+            print(f"{stream.channel_label(channel)}: mean {snapshot['session_mean']:.1f} dB, "
+                  f"max {snapshot['lmax']:.1f} dB, std {snapshot['session_std']:.1f} dB")
+
+if __name__ == "__main__":
+    main()
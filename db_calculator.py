@@ -1,19 +1,198 @@
+import threading
+from collections import deque
 import numpy as np
 
+def a_weighting_db(freqs):
+    # IEC 61672 A-weighting curve in dB
+    f2 = np.square(np.asarray(freqs, dtype=np.float64))
+    ra = (12194.0 ** 2 * f2 ** 2) / (
+        (f2 + 20.6 ** 2) * np.sqrt((f2 + 107.7 ** 2) * (f2 + 737.9 ** 2)) * (f2 + 12194.0 ** 2))
+    with np.errstate(divide='ignore'):
+        return 20 * np.log10(ra) + 2.00
+
+def c_weighting_db(freqs):
+    # IEC 61672 C-weighting curve in dB
+    f2 = np.square(np.asarray(freqs, dtype=np.float64))
+    rc = (12194.0 ** 2 * f2) / ((f2 + 20.6 ** 2) * (f2 + 12194.0 ** 2))
+    with np.errstate(divide='ignore'):
+        return 20 * np.log10(rc) + 0.06
+
+WEIGHTING_CURVES = {"A": a_weighting_db, "C": c_weighting_db}
+
+class WeightingFilter:
+    # Applies a frequency weighting to whole frames in the frequency domain.
+    # The per-bin power gains (including the one-sided rfft and 1/N^2 normalisation) are cached
+    # per frame size, so each call is one rfft and one matrix-vector product.
+    def __init__(self, curve="A", sample_rate=44100):
+        if curve not in WEIGHTING_CURVES:
+            raise ValueError(f"Unknown weighting curve: {curve}")
+        self.curve = curve
+        self.sample_rate = sample_rate
+        self._gains = {}
+
+    def power_gains(self, frame_size):
+        if frame_size not in self._gains:
+            freqs = np.fft.rfftfreq(frame_size, d=1 / self.sample_rate)
+            gains = 10 ** (WEIGHTING_CURVES[self.curve](freqs) / 10)
+            gains[freqs == 0] = 0.0
+            gains[1:] *= 2  # One-sided spectrum: count the mirrored negative frequencies
+            if frame_size % 2 == 0:
+                gains[-1] /= 2  # The Nyquist bin has no mirror
+            self._gains[frame_size] = gains / frame_size ** 2
+        return self._gains[frame_size]
+
+    def mean_square(self, frames):
+        spectrum = np.fft.rfft(frames, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return power @ self.power_gains(frames.shape[1])
+
 class DBCalculator:
-    def __init__(self, reference_level=-100, min_db=0, max_db=120):
+    def __init__(self, reference_level=-100, min_db=0, max_db=120, weighting=None, sample_rate=44100):
         self.reference_level = reference_level
         self.min_db = min_db
         self.max_db = max_db
+        self.sample_rate = sample_rate
+        self.weighting = weighting
+        self.weighting_filter = WeightingFilter(weighting, sample_rate) if weighting else None
+        # Filters for per-call overrides, one per curve, each caching its gains per frame size
+        self._weighting_filters = {weighting: self.weighting_filter} if weighting else {}
 
     def calculate_db(self, data):
         if len(data) == 0:
             return self.min_db
 
-        rms = np.sqrt(np.mean(np.square(data)))
-        if rms == 0:
+        data = np.asarray(data)
+        mean_square = float(np.dot(data, data)) / len(data)  # No squared temporary
+        if mean_square == 0:
             return self.min_db
 
-        db = 20 * np.log10(rms) - self.reference_level
-        db = max(self.min_db, min(db, self.max_db))  # Clamp values to min_db and max_db
-        return db
\ No newline at end of file
+        db = 10 * np.log10(mean_square) - self.reference_level  # 10*log10(ms) == 20*log10(rms)
+        return float(np.clip(db, self.min_db, self.max_db))
+
+    def calculate_db_batch(self, frames, weighting=None):
+        # Levels for a 2-D (frames x samples) block in one vectorized pass.
+        # `weighting` ("A"/"C") overrides the calculator's default weighting for this call.
+        frames = np.atleast_2d(frames)
+        if frames.shape[1] == 0:
+            return np.full(frames.shape[0], self.min_db, dtype=np.float64)
+
+        weighting_filter = self.weighting_filter
+        if weighting is not None and weighting != self.weighting:
+            weighting_filter = self._weighting_filters.get(weighting)
+            if weighting_filter is None:
+                weighting_filter = self._weighting_filters.setdefault(
+                    weighting, WeightingFilter(weighting, self.sample_rate))
+
+        if weighting_filter is not None:
+            mean_square = weighting_filter.mean_square(frames)
+        else:
+            mean_square = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frames.shape[1]
+        with np.errstate(divide='ignore'):
+            db = 10 * np.log10(mean_square) - self.reference_level
+        db[mean_square <= 0] = self.min_db
+        return np.clip(db, self.min_db, self.max_db)
+
+class LevelStatistics:
+    # Incrementally maintained statistics over the last `window` frame levels, plus session totals.
+    # Every update is O(1) (amortised); queries never rescan the stored levels, except the
+    # percentile levels which walk a fixed-size histogram.
+    def __init__(self, window=50, min_db=0, max_db=120, resolution=0.1):
+        self.window = window
+        self.min_db = min_db
+        self.resolution = resolution
+        self.levels = deque(maxlen=window)
+        self._max_candidates = deque()  # (index, level) with decreasing levels for the sliding max
+        self._index = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._energy_sum = 0.0
+        self._histogram = np.zeros(int(round((max_db - min_db) / resolution)) + 1, dtype=np.int64)
+
+        # Session-wide running values (Welford)
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.lmax = None
+
+        self._lock = threading.Lock()
+
+    def _bin(self, level):
+        return min(len(self._histogram) - 1, max(0, int((level - self.min_db) / self.resolution)))
+
+    def update(self, level):
+        with self._lock:
+            self._push(float(level))
+
+    def update_batch(self, levels):
+        with self._lock:
+            for level in np.asarray(levels, dtype=np.float64).tolist():
+                self._push(level)
+
+    def _push(self, level):
+        if len(self.levels) == self.window:
+            old = self.levels[0]
+            self._sum -= old
+            self._sum_sq -= old * old
+            self._energy_sum -= 10 ** (old / 10)
+            self._histogram[self._bin(old)] -= 1
+            if self._max_candidates and self._max_candidates[0][0] <= self._index - self.window:
+                self._max_candidates.popleft()
+        self.levels.append(level)
+        self._sum += level
+        self._sum_sq += level * level
+        self._energy_sum += 10 ** (level / 10)
+        self._histogram[self._bin(level)] += 1
+        while self._max_candidates and self._max_candidates[-1][1] <= level:
+            self._max_candidates.pop()
+        self._max_candidates.append((self._index, level))
+        self._index += 1
+
+        self.count += 1
+        delta = level - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (level - self._mean)
+        self.lmax = level if self.lmax is None else max(self.lmax, level)
+
+        # Windowed sums drift slowly with floating point error; resync every 100 windows
+        if self._index % (self.window * 100) == 0:
+            self._sum = sum(self.levels)
+            self._sum_sq = sum(x * x for x in self.levels)
+            self._energy_sum = sum(10 ** (x / 10) for x in self.levels)
+
+    def levels_since(self, count):
+        # Returns (session_count, levels) for the window levels added after `count` frames
+        with self._lock:
+            n_new = min(self.count - count, len(self.levels))
+            if n_new <= 0:
+                return self.count, []
+            return self.count, list(self.levels)[-n_new:]
+
+    def _percentile_level(self, exceeded_fraction):
+        # Level exceeded `exceeded_fraction` of the time over the window (e.g. 0.1 -> L10)
+        n = len(self.levels)
+        target = (1 - exceeded_fraction) * n
+        cumulative = np.cumsum(self._histogram)
+        index = int(np.searchsorted(cumulative, target, side='left'))
+        return self.min_db + index * self.resolution
+
+    def snapshot(self):
+        with self._lock:
+            n = len(self.levels)
+            if n == 0:
+                return None
+            mean = self._sum / n
+            variance = max(0.0, self._sum_sq / n - mean * mean)
+            return {
+                "current": self.levels[-1],
+                "mean": mean,
+                "peak": self._max_candidates[0][1],
+                "std": variance ** 0.5,
+                "count": n,
+                "leq": 10 * np.log10(self._energy_sum / n) if self._energy_sum > 0 else self.min_db,
+                "l10": self._percentile_level(0.1),
+                "l90": self._percentile_level(0.9),
+                "lmax": self.lmax,
+                "session_mean": self._mean,
+                "session_std": (self._m2 / self.count) ** 0.5,
+                "session_count": self.count,
+            }
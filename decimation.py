@@ -0,0 +1,45 @@
+import numpy as np
+
+# Peak-preserving reduction of long signals to a display budget.
+# Shared by the Dash figures and the pygame visualizer so neither has to draw every sample.
+
+def bucket_starts(n, n_buckets):
+    # Start index of each of `n_buckets` near-equal buckets covering range(n)
+    n_buckets = max(1, min(n, n_buckets))
+    return (np.arange(n_buckets) * n) // n_buckets
+
+def min_max_envelope(signal, n_buckets):
+    # Per-bucket (min, max) of a 1-D signal, or of each row of a 2-D block along the last axis
+    signal = np.asarray(signal)
+    starts = bucket_starts(signal.shape[-1], n_buckets)
+    return np.minimum.reduceat(signal, starts, axis=-1), np.maximum.reduceat(signal, starts, axis=-1)
+
+def envelope_trace(signal, max_points):
+    # (sample_index, value) pairs for a line trace of at most `max_points` points.
+    # Each bucket contributes its min and max, so transients survive any decimation factor.
+    signal = np.asarray(signal)
+    n = len(signal)
+    if n <= max_points:
+        return np.arange(n), signal
+    n_buckets = max(1, max_points // 2)
+    starts = bucket_starts(n, n_buckets)
+    mins, maxs = min_max_envelope(signal, n_buckets)
+    x = np.repeat(starts, 2)
+    y = np.empty(2 * len(starts), dtype=signal.dtype)
+    y[0::2] = mins
+    y[1::2] = maxs
+    return x, y
+
+def max_pool(values, n_out, axis=-1):
+    # Reduce `axis` to at most `n_out` bins keeping the maximum of each group (e.g. spectrum peaks)
+    values = np.asarray(values)
+    if values.shape[axis] <= n_out:
+        return values
+    return np.maximum.reduceat(values, bucket_starts(values.shape[axis], n_out), axis=axis)
+
+def pooled_axis(axis_values, n_out):
+    # Axis coordinates matching max_pool: the first coordinate of each group
+    axis_values = np.asarray(axis_values)
+    if len(axis_values) <= n_out:
+        return axis_values
+    return axis_values[bucket_starts(len(axis_values), n_out)]
@@ -1,13 +1,58 @@
-import pyaudio
+import threading
 
-class DeviceManager:
+class AudioContext:
+    # The process-wide PortAudio context. PyAudio is imported and initialised on first use (not at
+    # import, so the dashboard starts without probing the sound system, and synthetic sources work
+    # without PortAudio at all) and shared by every stream instead of one PyAudio() per stream.
+    # Device enumeration is cached until refresh(); PortAudio only rescans devices when it is
+    # re-initialised, which refresh() does once no stream is using the context.
     def __init__(self):
-        self.p = pyaudio.PyAudio()
+        self._pyaudio = None
+        self._users = 0
+        self._devices = None
+        self._lock = threading.Lock()
+        self.error = None  # Why PortAudio could not be opened, if it could not
 
-    def list_devices(self):
+    def _open(self):
+        # Caller holds the lock
+        if self._pyaudio is None:
+            import pyaudio
+            self._pyaudio = pyaudio.PyAudio()
+        return self._pyaudio
+
+    def acquire(self):
+        # The shared PyAudio instance, for a stream that will release() it when closed
+        with self._lock:
+            pa = self._open()
+            self._users += 1
+            return pa
+
+    def release(self):
+        with self._lock:
+            self._users = max(0, self._users - 1)
+
+    def users(self):
+        return self._users
+
+    def devices(self):
+        # Input devices as {"index", "name", "channels", "sample_rate"}; [] without PortAudio
+        with self._lock:
+            if self._devices is None:
+                try:
+                    self._devices = self._enumerate(self._open())
+                    self.error = None
+                except (ImportError, OSError) as e:
+                    self._devices = []
+                    self.error = str(e)
+            return self._devices
+
+    def device(self, index):
+        return next((device for device in self.devices() if device["index"] == index), None)
+
+    def _enumerate(self, pa):
         devices = []
-        for i in range(self.p.get_device_count()):
-            device_info = self.p.get_device_info_by_index(i)
+        for i in range(pa.get_device_count()):
+            device_info = pa.get_device_info_by_index(i)
             if device_info['maxInputChannels'] > 0:  # Only input devices
                 devices.append({
                     'index': i,
@@ -17,12 +62,42 @@ class DeviceManager:
                 })
         return devices
 
+    def refresh(self):
+        # Forget the cached devices; re-initialise PortAudio too if no stream has it open.
+        # Returns False if streams are still open (the next enumeration then may miss new devices).
+        with self._lock:
+            self._devices = None
+            if self._users:
+                return False
+            if self._pyaudio is not None:
+                self._pyaudio.terminate()
+                self._pyaudio = None
+            return True
+
+    def terminate(self):
+        with self._lock:
+            if self._pyaudio is not None:
+                self._pyaudio.terminate()
+                self._pyaudio = None
+            self._devices = None
+            self._users = 0
+
+# Shared by every AudioInput and DeviceManager in the process
+audio_context = AudioContext()
+
+class DeviceManager:
+    def __init__(self, context=None):
+        self.context = context or audio_context
+
+    def list_devices(self):
+        return self.context.devices()
+
     def select_device(self):
         devices = self.list_devices()
         print("Available input devices:")
         for i, device in enumerate(devices):
             print(f"{i}: {device['name']} (Channels: {device['channels']}, Sample Rate: {device['sample_rate']})")
-        
+
         while True:
             try:
                 selection = int(input("Select a device by number: "))
@@ -32,6 +107,3 @@ class DeviceManager:
                     print("Invalid selection. Please try again.")
             except ValueError:
                 print("Please enter a valid number.")
-
-    def __del__(self):
-        self.p.terminate()
\ No newline at end of file
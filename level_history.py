@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Long-term level history in fixed memory: a pyramid of ring buffers.
+# Tier 0 holds one entry per analysis frame; each entry of tier k+1 summarises `factor`
+# consecutive entries of tier k as (min, max, mean, Leq). Every tier keeps its newest
+# `capacity` entries, so with the defaults (4096 entries, factor 16, 5 tiers) and 23 ms frames
+# the history covers ~95 s at full resolution, ~25 min at 0.4 s, ~7 h at 6 s and days beyond.
+#
+# With `path` the tiers live in a memory-mapped file (<path>) instead of RAM; flush() writes the
+# layout and totals to <path>.json, and a history opened on a flushed file with the same layout
+# carries on from it, the time it was closed filled with empty (NaN) entries. With `buffer` they
+# live in an existing (tiers x 4 x channels x capacity) float32 array, e.g. shared memory (see
+# shared_stream.py).
+
+FIELDS = ("min", "max", "mean", "leq")
+
+class LevelHistory:
+    def __init__(self, frame_seconds, channels=1, capacity=4096, factor=16, tiers=5, path=None, buffer=None):
+        if capacity < factor:
+            raise ValueError("capacity must be at least factor")
+        self.frame_seconds = frame_seconds
+        self.channels = channels
+        self.capacity = capacity
+        self.factor = factor
+        self.tiers = tiers
+        self.path = path
+        self.start_time = None  # Wall-clock time of frame 0
+        self.totals = [0] * tiers  # Entries ever written per tier
+        self._lock = threading.Lock()
+
+        shape = (tiers, len(FIELDS), channels, capacity)
+        if buffer is not None:
+            self._data = buffer
+        elif path is None:
+            self._data = np.zeros(shape, dtype=np.float32)
+        else:
+            self._data = self._open(path, shape)
+
+    def _open(self, path, shape):
+        # The manifest is consumed on open and rewritten by flush(), so a file that was not flushed
+        # (e.g. after a crash) starts over rather than trusting totals older than its contents
+        try:
+            with open(path + ".json") as f:
+                state = json.load(f)
+            os.remove(path + ".json")
+        except (OSError, ValueError):
+            state = None
+        layout = {"fields": list(FIELDS), "shape": list(shape), "frame_seconds": self.frame_seconds,
+                  "factor": self.factor}
+        if (state is None or any(state.get(name) != value for name, value in layout.items())
+                or state["start_time"] is None or not os.path.exists(path)
+                or os.path.getsize(path) != np.prod(shape) * 4):
+            return np.memmap(path, dtype="<f4", mode="w+", shape=shape)
+        self._data = np.memmap(path, dtype="<f4", mode="r+", shape=shape)
+        self.totals = list(state["totals"])
+        self.start_time = state["start_time"]
+        self._skip(int((time.time() - self.start_time) / self.frame_seconds) - self.totals[0])
+        return self._data
+
+    def bucket_seconds(self, tier):
+        return self.frame_seconds * self.factor ** tier
+
+    def append(self, levels):
+        # `levels` is (channels x frames), or (frames,) for mono; the coarser tiers are updated
+        # whenever a group of `factor` entries below them completes
+        levels = np.asarray(levels, dtype=np.float32).reshape(self.channels, -1)
+        if levels.shape[1] == 0:
+            return
+        with self._lock:
+            if self.start_time is None:
+                self.start_time = time.time() - levels.shape[1] * self.frame_seconds
+            self._append(levels)
+
+    def _append(self, levels):
+        # Leq of a single frame is its level; the energy mean only matters once frames are combined.
+        # Chunks are small enough that no entry is overwritten before it is promoted.
+        step = self.capacity - self.factor + 1
+        for offset in range(0, levels.shape[1], step):
+            chunk = levels[:, offset:offset + step]
+            self._write(0, np.stack([chunk, chunk, chunk, chunk]))
+            for tier in range(1, self.tiers):
+                if not self._promote(tier):
+                    break
+
+    def _skip(self, frames):
+        # Advance by `frames` empty (NaN) frames without writing each one: frames up to the next
+        # boundary of the coarsest tier go through _append, whole coarsest buckets only write the
+        # newest `capacity` entries of every tier, and the rest goes through _append again
+        if frames <= 0:
+            return
+        align = self.factor ** (self.tiers - 1)
+        head = min(frames, -self.totals[0] % align)
+        self._append(np.full((self.channels, head), np.nan, dtype=np.float32))
+        whole = (frames - head) // align * align
+        for tier in range(self.tiers):
+            count = whole // self.factor ** tier
+            kept = min(count, self.capacity)
+            self.totals[tier] += count - kept
+            self._write(tier, np.full((len(FIELDS), self.channels, kept), np.nan, dtype=np.float32))
+        self._append(np.full((self.channels, frames - head - whole), np.nan, dtype=np.float32))
+
+    def _write(self, tier, values):
+        # values: (fields x channels x n) appended to the tier's ring
+        n = values.shape[-1]
+        index = np.arange(self.totals[tier], self.totals[tier] + n) % self.capacity
+        self._data[tier][:, :, index] = values
+        self.totals[tier] += n
+
+    def _read(self, tier, start, stop):
+        # (fields x channels x n) entries [start, stop) of a tier; the caller keeps them in range
+        return self._data[tier][:, :, np.arange(start, stop) % self.capacity]
+
+    def _promote(self, tier):
+        # Summarise the newly completed groups of tier-1 entries into `tier`; False if none completed
+        first, stop = self.totals[tier], self.totals[tier - 1] // self.factor
+        if stop <= first:
+            return False
+        values = self._read(tier - 1, first * self.factor, stop * self.factor)
+        self._write(tier, reduce_buckets(values, np.arange(0, (stop - first) * self.factor, self.factor)))
+        return True
+
+    def shape(self):
+        return self._data.shape
+
+    def copy_into(self, out, totals):
+        # Copy the entries written since `totals` (what the previous copy returned) into `out`,
+        # an array shaped like this history; returns (totals, start_time) as of this copy
+        with self._lock:
+            for tier in range(self.tiers):
+                index = np.arange(max(totals[tier], self.totals[tier] - self.capacity), self.totals[tier])
+                out[tier][:, :, index % self.capacity] = self._data[tier][:, :, index % self.capacity]
+            return list(self.totals), self.start_time
+
+    def range(self, tier=0):
+        # (first, end) seconds since start_time that `tier` still holds
+        end = self.totals[tier] * self.bucket_seconds(tier)
+        return max(0.0, end - self.capacity * self.bucket_seconds(tier)), end
+
+    def duration(self):
+        return self.totals[0] * self.frame_seconds
+
+    def query(self, start=None, end=None, points=1000, channel=0):
+        # Levels between `start` and `end` (seconds since start_time; negative counts back from
+        # now, None means the whole history / now) reduced to at most `points` buckets.
+        # Reads from the finest tier that still covers `start`, at most `points * factor`
+        # entries, so the cost does not depend on how long the range is.
+        with self._lock:
+            now = self.duration()
+            start = 0.0 if start is None else max(0.0, start + now if start < 0 else start)
+            end = now if end is None else end + now if end < 0 else min(end, now)
+            for tier in range(self.tiers):
+                seconds = self.bucket_seconds(tier)
+                first = max(int(start // seconds), self.totals[tier] - self.capacity)
+                stop = min(int(np.ceil(end / seconds)), self.totals[tier])
+                if first * seconds <= start and stop - first <= points * self.factor:
+                    break
+            if stop <= first:
+                empty = np.empty(0, dtype=np.float32)
+                return {"time": np.empty(0), "resolution": seconds, **{field: empty for field in FIELDS}}
+            values = self._read(tier, first, stop)[:, channel]
+        n = stop - first
+        starts = (np.arange(min(n, points)) * n) // min(n, points)
+        reduced = reduce_buckets(values[:, np.newaxis], starts)[:, 0]
+        result = {"time": (first + starts) * seconds, "resolution": seconds * n / len(starts)}
+        result.update(zip(FIELDS, reduced))
+        return result
+
+    def flush(self):
+        # Make a memory-mapped history durable, with the totals needed to resume it
+        if self.path is None:
+            return
+        with self._lock:
+            self._data.flush()
+            state = {"fields": FIELDS, "shape": list(self._data.shape), "frame_seconds": self.frame_seconds,
+                     "factor": self.factor, "totals": self.totals, "start_time": self.start_time}
+        with open(self.path + ".json", "w") as f:
+            json.dump(state, f)
+
+def reduce_buckets(values, starts):
+    # (fields x channels x n) entries -> one entry per bucket starting at each of `starts`.
+    # Means are averaged per entry (the buckets being combined hold equal frame counts) and
+    # Leq is averaged in the energy domain. Empty (NaN) entries are left out; a bucket with
+    # nothing else stays empty.
+    present = ~np.isnan(values[2])
+    counts = np.add.reduceat(present, starts, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        energy = np.add.reduceat(np.where(present, np.power(10.0, values[3] / 10.0), 0.0), starts, axis=-1) / counts
+        leq = 10 * np.log10(energy)
+        mean = np.add.reduceat(np.where(present, values[2], 0.0), starts, axis=-1) / counts
+    return np.stack([
+        np.fmin.reduceat(values[0], starts, axis=-1),
+        np.fmax.reduceat(values[1], starts, axis=-1),
+        mean,
+        leq,
+    ]).astype(np.float32)
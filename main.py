@@ -1,88 +1,206 @@
-from dash import Dash, dcc, html
-from dash.dependencies import Input, Output, State
-import plotly.graph_objs as go
+from dash import Dash, dcc, html, no_update, callback_context
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import numpy as np
-from collections import deque
-import csv
+import atexit
+import base64
 import os
-from datetime import datetime
-from audio_input import AudioInput
+from datetime import datetime, timezone
 from db_calculator import DBCalculator
-from device_manager import DeviceManager
-import pyaudio
+from device_manager import audio_context
+from capture import open_capture_stream as create_capture_stream
+from stream_config import LATENCY_PROFILES, profile_from_environment
+from decimation import envelope_trace, max_pool, pooled_axis
+from recorder import SessionRecorder
+from speech_tap import SpeechTap
+from vad import VoiceActivityDetector
+from recognition import RecognitionPool, create_backend
+from transcript_store import TranscriptStore
+from metrics import PipelineMetrics
+from snapshot_cache import SnapshotCache
+from shared_stream import SharedRegistry, SharedStreamReader
+from flask import Response, request
+import json
+import time
 import threading
-import speech_recognition as sr
+from contextlib import contextmanager
 
 # Initialize the Dash app
 app = Dash(__name__, suppress_callback_exceptions=True)
-
-# Initialize device manager and list input devices
-device_manager = DeviceManager()
-devices = device_manager.list_devices()
-device_options = [{"label": device["name"], "value": device["index"]} for device in devices]
-selected_device_index = None  # To persist the selected device index
-
-# Initialize data structures and threading lock
-db_values = deque(maxlen=50)
-waveform_data = deque(maxlen=1024)  # For waveform visualization
-spectrogram_frame = None  # Single frame of FFT magnitudes
-transcription_log = []  # To store transcription history
-data_lock = threading.Lock()
+server = app.server  # For WSGI servers, e.g. gunicorn main:server
+
+# Multi-process mode: with CAPTURE_REGISTRY set, the streams are captured and analysed by
+# `python shared_stream.py --registry <name>` and every dashboard process only reads them from
+# shared memory, so the dashboard can run under several worker processes
+capture_registry_name = os.environ.get("CAPTURE_REGISTRY")
+capture_registry = None
+registry_checked = 0.0  # When the attached streams were last compared with the registry
+
+MAX_CHANNELS = 8  # Most channels opened per device
+SOURCE_SAMPLE_RATE = int(os.environ.get("AUDIO_SAMPLE_RATE", 44100))  # Rate of the synthetic sources
+# Test sources that need no sound card; string values are audio_sources.create_source specs
+SYNTHETIC_SOURCES = [
+    {"label": "Synthetic: 440 Hz tone", "value": "tone:440"},
+    {"label": "Synthetic: white noise", "value": "noise"},
+    {"label": "Synthetic: chirp sweep", "value": "chirp"},
+    {"label": "Synthetic: speech-like", "value": "speech"},
+]
+
+# Input devices are enumerated when the project tab is first shown, not at import, and cached by
+# the shared audio context (device_manager.audio_context) from then on
+def device_options():
+    if capture_registry_name:
+        return [{"label": entry["label"], "value": entry["key"]} for entry in published_streams()]
+    return [{"label": device["name"], "value": device["index"]} for device in audio_context.devices()] \
+        + SYNTHETIC_SOURCES
+
+# The capture process's registry, attached on first use and again once the capture process
+# exits or is restarted; None while it is not running
+def shared_registry():
+    global capture_registry
+    if capture_registry is None or capture_registry.stale:
+        capture_registry = None
+        try:
+            capture_registry = SharedRegistry(capture_registry_name)
+        except FileNotFoundError:
+            return None
+    return capture_registry
+
+# The registry's stream entries; none while the capture process is not running, or if it stopped
+# in the middle of updating them
+def published_streams():
+    registry = shared_registry()
+    try:
+        return registry.streams() if registry else []
+    except TimeoutError:
+        return []
+
+selected_devices = []  # To persist the selected devices (several can capture at once)
+
+# Pipeline instrumentation, exposed at /metrics
+pipeline_metrics = PipelineMetrics()
+
+# Dashboard data derived once per tick and shared by every open client
+DASHBOARD_TICK = 0.1
+snapshot_cache = SnapshotCache(min_interval=DASHBOARD_TICK)
+pipeline_metrics.add_gauge("dashboard_cache_hits", lambda: snapshot_cache.hits)
+pipeline_metrics.add_gauge("dashboard_cache_builds", lambda: snapshot_cache.builds)
+
+# Initialize data structures
+capture_streams = {}  # Device value -> capture.CaptureStream (ring, analysis and recorder per device)
+streams_lock = threading.Lock()
+latency_profile = profile_from_environment()  # Buffer sizes for new streams (stream_config.LATENCY_PROFILES)
+WAVEFORM_POINTS = 1600  # Point budget for the waveform trace (min/max per bucket)
+SPECTROGRAM_BINS = 256  # Frequency rows sent for the spectrogram heatmap
+LIVE_MIN_INTERVAL = 1 / 60  # Shortest gap between two pushes to one client
+LIVE_IDLE_WAIT = 0.25  # Longest wait for new analysis results before checking the transcript
+LIVE_KEEPALIVE = 15.0  # Comment line sent after this many idle seconds
+LIVE_WAVEFORM_INTERVAL = 1 / 30  # The waveform envelope is re-encoded at most this often per channel
+LIVE_HISTORY_INTERVAL = 5.0  # Seconds between level history pushes to one client
+HISTORY_POINTS = 1000  # Buckets per level history query, about one per screen pixel
+HISTORY_RANGES = [("Last minute", 60), ("Last 10 minutes", 600), ("Last hour", 3600),
+                  ("Last 8 hours", 8 * 3600), ("Whole session", 0)]
+# Set LEVEL_HISTORY_DIR to keep the level histories in memory-mapped files instead of RAM
+history_directory = os.environ.get("LEVEL_HISTORY_DIR")
+transcript_store = None  # Bounded transcript history, older segments on disk; built by start_transcription
+TRANSCRIPT_DISPLAY_LINES = 200  # Most lines kept in the transcription display
 transcription_active = False  # Control start/stop of speech recognition
 data_saving_active = False  # Control start/stop of data saving
 
 # Initialize dB calculator
 db_calculator = DBCalculator(reference_level=-100, min_db=0, max_db=120)
-audio = None  # Will be initialized upon device selection
-
-# Initialize speech recognizer
-recognizer = sr.Recognizer()
-
-# CSV file path
-csv_file_path = r"D:/university/Semester 4/RT/Project/audio visualizer/audio_data.csv"
-
-# Ensure the directory exists
-def ensure_directory_exists():
-    directory = os.path.dirname(csv_file_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-# Initialize CSV file with headers
-def initialize_csv():
-    ensure_directory_exists()
-    if not os.path.isfile(csv_file_path):
-        with open(csv_file_path, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                "Timestamp", "dB Level", "Mean dB", "Peak dB",
-                "Std Dev dB", "Waveform Data", "Spectrogram Data", "Transcription"
-            ])
-
-# Save data to CSV
-def save_data_to_csv():
-    with data_lock:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        db_level = db_values[-1] if db_values else "N/A"
-        mean_db = np.mean(db_values) if db_values else "N/A"
-        peak_db = np.max(db_values) if db_values else "N/A"
-        std_dev_db = np.std(db_values) if db_values else "N/A"
-        waveform = list(waveform_data) if waveform_data else []
-        spectrogram = list(spectrogram_frame) if spectrogram_frame is not None else []
-        transcription = " ".join(transcription_log)
-
-        with open(csv_file_path, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([timestamp, db_level, mean_db, peak_db, std_dev_db, waveform, spectrogram, transcription])
-
-# Initialize CSV at the start
-initialize_csv()
+# Recognition results arrive in capture order from the worker pool
+def handle_recognition_result(result):
+    utterance = result.utterance
+    if result.text:
+        transcript_store.add(result.text, utterance.start_time, utterance.end_time, result.confidence)
+    elif result.error == "unavailable":
+        transcript_store.add("Speech recognition unavailable.", utterance.start_time, utterance.end_time)
+    elif result.error not in (None, "no_speech", "dropped", "timeout"):
+        print(f"Unexpected error: {result.error}")
+
+recognition_pool = None  # Built by start_transcription
+
+# The transcript store (with its spill file) and the recognition backend (e.g. the mock server)
+# are only built the first time transcription is started.
+# Recognition backend: "google" (default), "sphinx" (offline), "stub", "mock" or an HTTP endpoint
+def start_transcription():
+    global transcript_store, recognition_pool
+    if recognition_pool is None:
+        transcript_store = TranscriptStore(max_in_memory=500)
+        recognition_pool = RecognitionPool(create_backend(os.environ.get("RECOGNITION_BACKEND", "google")),
+                                           handle_recognition_result, workers=2, max_pending=8,
+                                           policy="drop_oldest", timeout=15.0)
+    recognition_pool.start()
+
+# Release what the process owns beyond its threads (e.g. the mock recognition server) on exit
+def shutdown():
+    if recognition_pool is not None:
+        recognition_pool.stop()
+        recognition_pool.backend.close()
+        transcript_store.close()  # Deletes its temporary spill file
+
+atexit.register(shutdown)
+
+# Only voiced segments found by the VAD are sent to the recognizer, and only while transcribing
+def queue_utterance(utterance):
+    if transcription_active:
+        recognition_pool.submit(utterance)
+
+# Speech recognition listens to one capture stream (the first selected device), resampled to
+# 16 kHz and averaged over its channels; it is re-attached when that device is deselected or
+# its stream is restarted (e.g. for a new latency profile)
+speech_tap = None
+voice_detector = None
+speech_stream_key = None
+speech_stream_id = None  # The stream instance the tap was added to
+
+def attach_speech(stream):
+    global speech_tap, voice_detector, speech_stream_key, speech_stream_id
+    speech_tap = SpeechTap(in_rate=stream.rate, out_rate=16000, seconds=30)
+    voice_detector = VoiceActivityDetector(db_calculator, speech_tap.ring_buffer, queue_utterance, sample_rate=16000)
+    speech_tap.set_detector(voice_detector)
+    stream.worker.add_tap(speech_tap)
+    speech_stream_key = stream.key
+    speech_stream_id = stream.stream_id
+
+pipeline_metrics.add_gauge("recognition_queue_depth", lambda: recognition_pool.queue_depth() if recognition_pool else 0)
+pipeline_metrics.add_gauge("recognition_dropped", lambda: recognition_pool.dropped if recognition_pool else 0)
+pipeline_metrics.add_gauge("recognition_timeouts", lambda: recognition_pool.timeouts if recognition_pool else 0)
+pipeline_metrics.add_gauge("utterances_detected", lambda: voice_detector.utterances if voice_detector else 0)
+
+# Session recordings are written next to this script: one directory per device, plus the transcript
+recording_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+transcript_recorder = SessionRecorder(os.path.join(recording_directory, "transcript"), {},
+                                      write_latency=pipeline_metrics.histogram("recorder_write"))
+recorded_segment_id = -1  # Last transcript segment handed to the recorder
+
+# Queue one row per device for the recorders; the writes themselves happen on their threads
+def record_snapshot():
+    global recorded_segment_id
+    timestamp = datetime.now().timestamp()
+    with streams_lock:
+        streams = list(capture_streams.values())
+    for stream in streams:
+        stream.record_snapshot(timestamp)
+    # Only new transcript segments are recorded, once each
+    for segment in transcript_store.since(recorded_segment_id) if transcript_store else []:
+        transcript_recorder.record_text(segment["start_time"], segment["text"], id=segment["id"],
+                                        end_time=segment["end_time"], confidence=segment["confidence"])
+        recorded_segment_id = segment["id"]
 
 # Periodic data saving thread
 def data_saving_thread():
     global data_saving_active
+    transcript_recorder.start()
     while data_saving_active:
-        save_data_to_csv()
+        record_snapshot()
         threading.Event().wait(1)  # Save every 1 second
+    # Flush and close here so the Dash callback never waits on disk
+    with streams_lock:
+        streams = list(capture_streams.values())
+    for stream in streams:
+        stream.stop_recording()
+    transcript_recorder.stop()
 
 # Main layout with tabs
 app.layout = html.Div([
@@ -100,9 +218,16 @@ app.layout = html.Div([
 def project_layout():
     return html.Div([
         html.Div([
-            html.Label("Select Input Device:", style={'fontSize': '18px'}),
-            dcc.Dropdown(id="device-dropdown", options=device_options, value=selected_device_index,
+            html.Label("Select Input Devices:", style={'fontSize': '18px'}),
+            dcc.Dropdown(id="device-dropdown", options=device_options(), value=selected_devices, multi=True,
+                         style={'width': '50%', 'margin': 'auto'}),
+            html.Button("Rescan Devices", id="rescan-devices", n_clicks=0, style={'margin': '10px'}),
+            html.Label("Display Channel:", style={'fontSize': '18px'}),
+            dcc.Dropdown(id="channel-dropdown", options=[], value=None, clearable=False,
                          style={'width': '50%', 'margin': 'auto'}),
+            html.Label("Latency Profile:", style={'fontSize': '18px'}),
+            dcc.Dropdown(id="latency-profile", options=[{"label": name, "value": name} for name in LATENCY_PROFILES],
+                         value=latency_profile, clearable=False, style={'width': '50%', 'margin': 'auto'}),
         ], style={'textAlign': 'center', 'marginBottom': '20px'}),
 
         html.Div([
@@ -119,12 +244,18 @@ def project_layout():
         html.Div([
             dcc.Graph(id="waveform-graph", animate=False, style={'height': '30vh'}),
             dcc.Graph(id="spectrogram-graph", animate=False, style={'height': '30vh', 'marginTop': '20px'}),
+            html.Label("Level History:", style={'fontSize': '18px'}),
+            dcc.Dropdown(id="history-range", options=[{"label": label, "value": seconds}
+                                                      for label, seconds in HISTORY_RANGES],
+                         value=600, clearable=False, style={'width': '50%'}),
+            dcc.Graph(id="history-graph", animate=False, style={'height': '30vh'}),
         ], style={'width': '40%', 'display': 'inline-block', 'verticalAlign': 'top',
                   'padding': '20px'}),
 
         html.Div([
             html.H2("Real-Time Speech-to-Text", style={'textAlign': 'center'}),
-            html.Div(id="transcription-display", style={
+            dcc.Store(id="transcript-cursor", data=None),  # Last segment id and lines shown
+            html.Div(id="transcription-display", children=[], style={
                 'fontSize': '20px', 'textAlign': 'left', 'whiteSpace': 'pre-wrap', 'padding': '10px',
                 'border': '1px solid #ccc', 'height': '50vh', 'overflowY': 'scroll'
             }),
@@ -133,19 +264,25 @@ def project_layout():
             html.Button("Stop Transcription", id="stop-button", n_clicks=0, style={'margin': '10px'}),
             html.Button("Start Data Saving", id="start-data-saving", n_clicks=0, style={'margin': '10px'}),
             html.Button("Stop Data Saving", id="stop-data-saving", n_clicks=0, style={'margin': '10px'}),
+
+            html.Details([
+                html.Summary("Pipeline Metrics"),
+                html.Div(id="metrics-display", style={'fontSize': '14px', 'fontFamily': 'monospace',
+                                                      'whiteSpace': 'pre'}),
+            ], id="metrics-panel", open=False, style={'marginTop': '10px'}),
         ], style={'width': '20%', 'display': 'inline-block', 'verticalAlign': 'top',
                   'padding': '10px'}),
 
+        # Graphs, statistics and transcript are pushed over /live (see live_endpoint); these stores
+        # hold where the browser's copy starts, and the connected URL
+        dcc.Store(id="live-cursor", data=None),
+        dcc.Store(id="live-connection", data=None),
+        dcc.Store(id="live-reset", data=None),  # Set by the browser when /live reports a restarted stream
         dcc.Interval(
-            id="graph-update",
-            interval=200,  # Update every 200ms
+            id="metrics-update",
+            interval=1000,  # Refresh the metrics panel every second (only while it is open)
             n_intervals=0,
-            disabled=True  # Disabled until a device is selected
-        ),
-        dcc.Interval(
-            id="transcription-update",
-            interval=2000,  # Update transcription display every 2 seconds
-            n_intervals=0
+            disabled=True
         )
     ])
 
@@ -176,12 +313,12 @@ def documentation_layout():
                 html.Li("📝 Speech-to-Text Transcription: The dashboard leverages Google's Speech Recognition API to convert live audio into text. "
                         "This is a great way to capture conversations or live audio content in text form.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
-                html.Li("💾 Data Logging: Data, including audio statistics (e.g., dB levels, waveform, spectrogram) and transcriptions, are saved to a CSV file. "
+                html.Li("💾 Data Logging: Data, including audio statistics (e.g., dB levels, waveform, spectrogram) and transcriptions, are saved to compact binary session files. "
                         "This allows to track and analyze the data later on.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
                 html.Li("🎛 Interactive Controls: The interface offers easy-to-use buttons for starting/stopping transcription, starting/stopping data saving, and selecting the input device.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
-                html.Li("📈 Dynamic Graphing: The graphs automatically update every few milliseconds, reflecting the changes in the real-time audio input.",
+                html.Li("📈 Dynamic Graphing: New audio data is pushed to the browser as soon as it is analysed, so the graphs follow the real-time audio input within milliseconds.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
             ], style={'paddingLeft': '20px', 'fontSize': '18px'}),
         ], style={'padding': '20px', 'border': '1px solid #ddd', 'borderRadius': '8px', 'boxShadow': '0px 4px 6px rgba(0, 0, 0, 0.1)', 'backgroundColor': '#f9f9f9', 'marginBottom': '20px'}),
@@ -198,7 +335,7 @@ def documentation_layout():
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
                 html.Li("📝 Speech-to-Text Conversion: The captured audio is passed to Google’s Speech Recognition API, which converts it into text. This text is stored in the system for later use or analysis.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
-                html.Li("💾 Data Logging: Every second, the system writes the latest audio data and transcription logs to a CSV file. This makes the data accessible for future analysis.",
+                html.Li("💾 Data Logging: Every second, the system records the latest audio data and new transcription lines; a background writer appends them to binary session files. This makes the data accessible for future analysis.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
             ], style={'paddingLeft': '20px', 'fontSize': '18px'}),
         ], style={'padding': '20px', 'border': '1px solid #ddd', 'borderRadius': '8px', 'boxShadow': '0px 4px 6px rgba(0, 0, 0, 0.1)', 'backgroundColor': '#f9f9f9', 'marginBottom': '20px'}),
@@ -208,10 +345,10 @@ def documentation_layout():
             html.H3("👨‍💻 User Guide", style={'color': '#FFC107', 'marginTop': '20px', 'fontSize': '28px'}),
             html.Ol([
                 html.Li("🔌 Step 1: Connect microphone or audio input device to your computer.", style={'lineHeight': '1.8', 'fontSize': '18px'}),
-                html.Li("💻 Step 2: Open the dashboard and select your desired input device from the dropdown menu.", style={'lineHeight': '1.8', 'fontSize': '18px'}),
+                html.Li("💻 Step 2: Open the dashboard and select one or more input devices from the dropdown menu, then the channel to display.", style={'lineHeight': '1.8', 'fontSize': '18px'}),
                 html.Li("📊 Step 3: View real-time audio data as dB levels, waveform, and spectrogram graphs.", style={'lineHeight': '1.8', 'fontSize': '18px'}),
                 html.Li("📝 Step 4: Press 'Start Transcription' to convert live audio into text. Press 'Stop Transcription' when you want to stop the conversion.", style={'lineHeight': '1.8', 'fontSize': '18px'}),
-                html.Li("💾 Step 5: Press 'Start Data Saving' to begin logging the audio statistics and transcriptions into a CSV file. You can stop data saving at any time.",
+                html.Li("💾 Step 5: Press 'Start Data Saving' to begin logging the audio statistics and transcriptions into session files. You can stop data saving at any time.",
                         style={'lineHeight': '1.8', 'fontSize': '18px'}),
             ], style={'paddingLeft': '20px', 'fontSize': '18px'}),
         ], style={'padding': '20px', 'border': '1px solid #ddd', 'borderRadius': '8px', 'boxShadow': '0px 4px 6px rgba(0, 0, 0, 0.1)', 'backgroundColor': '#f9f9f9', 'marginBottom': '20px'}),
@@ -227,7 +364,7 @@ def documentation_layout():
                 html.Tr([html.Td("📱 Device Initialization", style={'padding': '8px', 'textAlign': 'center'}),
                          html.Td("🔄 Implement a dynamic dropdown menu to select the device and initialize it.", style={'padding': '8px', 'textAlign': 'center'})]),
                 html.Tr([html.Td("💾 Data Logging", style={'padding': '8px', 'textAlign': 'center'}),
-                         html.Td("🔐 Use synchronized writes to prevent data loss or corruption while saving to the CSV.", style={'padding': '8px', 'textAlign': 'center'})]),
+                         html.Td("🔐 Use synchronized writes to prevent data loss or corruption while saving session files.", style={'padding': '8px', 'textAlign': 'center'})]),
                 html.Tr([html.Td("📝 Transcription Accuracy", style={'padding': '8px', 'textAlign': 'center'}),
                          html.Td("🔧 Calibrate microphone settings and optimize noise filtering for better recognition.", style={'padding': '8px', 'textAlign': 'center'})]),
             ], style={'width': '100%', 'borderCollapse': 'collapse', 'marginBottom': '20px', 'textAlign': 'center'}),
@@ -258,31 +395,26 @@ def render_tab_content(tab):
     elif tab == 'documentation':
         return documentation_layout()
 
-# Function to run speech recognition
-def run_speech_recognition():
-    global transcription_active, transcription_log
-    while transcription_active:
-        try:
-            with sr.Microphone() as source:
-                audio_data = recognizer.listen(source, timeout=2, phrase_time_limit=20)
-                phrase = recognizer.recognize_google(audio_data)
-                transcription_log.append(phrase)
-        except (sr.WaitTimeoutError, sr.UnknownValueError):
-            pass  # Ignore unrecognized speech
-        except sr.RequestError:
-            transcription_log.append("Speech recognition unavailable.")
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-
 # Callback to persist input device selection
 @app.callback(
     Output("device-dropdown", "value"),
     [Input("device-dropdown", "value")]
 )
-def persist_device_selection(device_index):
-    global selected_device_index
-    selected_device_index = device_index
-    return selected_device_index
+def persist_device_selection(devices):
+    global selected_devices
+    selected_devices = devices or []
+    return selected_devices
+
+# Callback to enumerate the input devices again (e.g. after plugging one in)
+@app.callback(
+    Output("device-dropdown", "options"),
+    [Input("rescan-devices", "n_clicks")],
+    prevent_initial_call=True
+)
+def rescan_devices(n_clicks):
+    if not audio_context.refresh():
+        print("Input devices are in use; PortAudio will see new devices once every stream is closed")
+    return device_options()
 
 # Callback to control transcription buttons
 @app.callback(
@@ -295,11 +427,13 @@ def control_transcription_buttons(start_clicks, stop_clicks):
     global transcription_active
     if start_clicks > stop_clicks:
         if not transcription_active:
+            start_transcription()
             transcription_active = True
-            threading.Thread(target=run_speech_recognition, daemon=True).start()
         return True, False  # Disable Start button, enable Stop button
     else:
         transcription_active = False
+        if recognition_pool is not None:
+            recognition_pool.stop()
         return False, True  # Enable Start button, disable Stop button
 
 # Callback to control data saving
@@ -320,122 +454,567 @@ def control_data_saving(start_clicks, stop_clicks):
         data_saving_active = False
         return False, True  # Enable start button, disable stop button
 
-# Callback to update transcription display
+# Transcript queries: /transcript?since=<id> for new segments, /transcript/search?q=&start=&end=
+@app.server.route("/transcript")
+def transcript_endpoint():
+    since = int(request.args.get("since", -1))
+    segments = transcript_store.since(since, limit=1000) if transcript_store else []
+    return Response(json.dumps(segments), mimetype="application/json")
+
+@app.server.route("/transcript/search")
+def transcript_search_endpoint():
+    start = request.args.get("start")
+    end = request.args.get("end")
+    results = transcript_store.search(request.args.get("q"), float(start) if start else None,
+                                      float(end) if end else None,
+                                      limit=int(request.args.get("limit", 100))) if transcript_store else []
+    return Response(json.dumps(results), mimetype="application/json")
+
+# Open a capture stream for a device index or a synthetic source spec, with all of its channels.
+# Devices run at their native rate; buffer sizes come from the latency profile.
+def open_capture_stream(value, profile):
+    label = next((option["label"] for option in device_options() if option["value"] == value), str(value))
+    return create_capture_stream(value, profile, label, source_sample_rate=SOURCE_SAMPLE_RATE,
+                                 max_channels=MAX_CHANNELS, metrics=pipeline_metrics,
+                                 recording_directory=recording_directory, history_directory=history_directory)
+
+# Look up the stream and channel behind a channel-dropdown value ("<device>#<channel>"). The stream
+# is acquired (see SharedStreamReader.acquire): the caller releases it, or uses open_channel.
+def resolve_channel(channel_value):
+    if not channel_value:
+        return None, None
+    key, _, channel = channel_value.rpartition("#")
+    with streams_lock:
+        # Other worker processes never ran start_audio_stream for this client; attached streams are
+        # compared with the registry (for a republished stream) once per tick, not on every push
+        if capture_registry_name and (time.monotonic() - registry_checked >= DASHBOARD_TICK
+                                      or all(str(stream.key) != key for stream in capture_streams.values())):
+            attach_shared_streams([option["value"] for option in device_options() if str(option["value"]) == key],
+                                  detach=False)
+        for stream in capture_streams.values():
+            if str(stream.key) == key and int(channel) < stream.channels and stream.acquire():
+                return stream, int(channel)
+    return None, None
+
+@contextmanager
+def open_channel(channel_value):
+    stream, channel = resolve_channel(channel_value)
+    try:
+        yield stream, channel
+    finally:
+        if stream is not None:
+            stream.release()
+
+# Multi-process mode: attach the published streams in `devices` (and re-attach any the capture
+# process republished); with `detach`, also let go of the ones no longer selected. Caller holds streams_lock.
+def attach_shared_streams(devices, detach=True):
+    global registry_checked
+    registry_checked = time.monotonic()
+    entries = {entry["key"]: entry for entry in published_streams()}
+    for key in list(capture_streams):
+        entry = entries.get(key)
+        if (detach and key not in devices) or entry is None or entry["segment"] != capture_streams[key].name:
+            stream = capture_streams.pop(key)
+            stream.stop()
+            snapshot_cache.discard(lambda cache_key: cache_key[1] == stream.stream_id)
+    for value in devices:
+        if value not in capture_streams and value in entries:
+            try:
+                capture_streams[value] = SharedStreamReader(entries[value]["segment"])
+            except FileNotFoundError:  # Unpublished since the registry was read
+                continue
+
+# Callback to start and stop capture streams as devices are selected and deselected.
+# A new latency profile restarts every stream, so all buffers and axes are rebuilt for it.
 @app.callback(
-    Output("transcription-display", "children"),
-    [Input("transcription-update", "n_intervals")]
+    [Output("channel-dropdown", "options"),
+     Output("channel-dropdown", "value")],
+    [Input("device-dropdown", "value"),
+     Input("latency-profile", "value")],
+    [State("channel-dropdown", "value")]
 )
-def update_transcription_display(n_intervals):
-    return "\n".join(transcription_log)
-
-# Callback to start the audio stream when a device is selected
+def start_audio_stream(devices, profile, channel_value):
+    global latency_profile
+    devices = devices or []
+    with streams_lock:
+        if capture_registry_name:
+            # Capture runs in the capture process with its own profile; no speech recognition here
+            attach_shared_streams(devices)
+        else:
+            # Old streams are drained and closed before any new one opens, so a device being re-opened
+            # (e.g. for a new profile) is free again
+            for key in [key for key in capture_streams
+                        if key not in devices or capture_streams[key].config.profile != profile]:
+                stream = capture_streams.pop(key)
+                stream.stop()
+                snapshot_cache.discard(lambda cache_key: cache_key[1] == stream.stream_id)
+            latency_profile = profile
+            for value in devices:
+                if value not in capture_streams:
+                    try:
+                        stream = open_capture_stream(value, profile)
+                        stream.start()
+                    except (OSError, ValueError) as e:
+                        print(f"Could not open input {value}: {e}")
+                        continue
+                    capture_streams[value] = stream
+            if capture_streams:
+                # Stay on the same device across restarts; fall back to the first one
+                stream = capture_streams.get(speech_stream_key) or next(iter(capture_streams.values()))
+                if stream.stream_id != speech_stream_id:
+                    attach_speech(stream)
+    return channel_choices(channel_value)
+
+# The channel dropdown for the open streams, keeping `channel_value` if it is still there
+def channel_choices(channel_value):
+    with streams_lock:
+        channel_options = [{"label": stream.channel_label(channel), "value": f"{stream.key}#{channel}"}
+                           for stream in capture_streams.values() for channel in range(stream.channels)]
+    values = [option["value"] for option in channel_options]
+    if channel_value not in values:
+        channel_value = values[0] if values else None
+    return channel_options, channel_value
+
+# Callback for pages whose stream was restarted or closed from another page (a new profile or
+# device selection): /live sent them "reset", so refresh the channels, which redraws the graphs
+# and reconnects with a fresh cursor
 @app.callback(
-    Output("graph-update", "disabled"),
-    [Input("device-dropdown", "value")]
+    [Output("channel-dropdown", "options", allow_duplicate=True),
+     Output("channel-dropdown", "value", allow_duplicate=True)],
+    [Input("live-reset", "data")],
+    [State("device-dropdown", "value"),
+     State("channel-dropdown", "value")],
+    prevent_initial_call=True
 )
-def start_audio_stream(device_index):
-    global audio
-    if device_index is not None:
-        audio = AudioInput(device_index)
-
-        def stream_callback(in_data, frame_count, time_info, status):
-            audio_data = np.frombuffer(in_data, dtype=np.float32)
-            db_level = db_calculator.calculate_db(audio_data)
-
-            with data_lock:
-                db_values.append(db_level)
-                waveform_data.clear()
-                waveform_data.extend(audio_data[:1024])  # Limit to fixed sample size
-
-                global spectrogram_frame
-                spectrogram_frame = np.abs(np.fft.fft(audio_data)[:len(audio_data) // 2])
-
-            return (in_data, pyaudio.paContinue)
-
-        audio.start_stream(stream_callback)
-        return False  # Enable graph updates
-
-    return True  # Keep graph updates disabled until a device is selected
-
-# Callback to update graphs and displays
+def refresh_channels(_, devices, channel_value):
+    if capture_registry_name:
+        with streams_lock:
+            attach_shared_streams(devices or [], detach=False)
+    return channel_choices(channel_value)
+
+# Encode a numeric array as a plotly.js typed array (base64) instead of a JSON list of floats
+def encode_array(values, dtype=np.float32):
+    data = np.ascontiguousarray(values, dtype=dtype)
+    encoded = {"dtype": data.dtype.str.lstrip("<|="), "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+    if data.ndim > 1:
+        encoded["shape"] = ", ".join(str(n) for n in data.shape)
+    return encoded
+
+# The envelope buckets only depend on the window length and rate, so each x axis is encoded once
+waveform_axes = {}
+
+def waveform_axis(config):
+    key = (config.waveform_samples(), config.sample_rate)
+    if key not in waveform_axes:
+        x_idx, _ = envelope_trace(np.zeros(key[0], dtype=np.float32), WAVEFORM_POINTS)
+        waveform_axes[key] = encode_array(x_idx * (1000 / config.sample_rate))  # Indices to milliseconds
+    return waveform_axes[key]
+
+# Everything a new client is sent for one channel, built once per tick and shared by all clients
+def build_channel_snapshot(stream, channel):
+    level_stats = stream.level_stats[channel]
+    stats = level_stats.snapshot()
+    count, levels = level_stats.levels_since(0)
+    analysis_stats = stream.worker.stats()
+    waveform_samples = stream.config.waveform_samples()
+    waveform_seq, samples = stream.ring_buffer.read_latest(waveform_samples, channel=channel)
+    snapshot = {
+        "db_count": count,
+        "db_x": list(range(count - len(levels), count)),
+        "db_y": np.round(levels, 2).tolist(),
+        "window": level_stats.window,
+        "waveform_seq": waveform_seq,
+        "waveform": None,
+        "y_range": None,
+        "stats_key": [stats["session_count"] if stats else 0, analysis_stats["dropped_frames"]],
+    }
+
+    if len(samples) == waveform_samples:
+        _, envelope = envelope_trace(samples, WAVEFORM_POINTS)
+        snapshot["waveform"] = encode_array(envelope)
+        # Round the axis range so small amplitude changes do not resend the layout
+        snapshot["y_range"] = [round(float(envelope.min()) * 1.1, 2), round(float(envelope.max()) * 1.1, 2)]
+
+    if stats:
+        current_db = stats["current"]
+        snapshot["db_color"] = "green" if current_db < 40 else "yellow" if current_db < 70 else "red"
+        snapshot["current_db_text"] = f"{current_db:.2f} dB"
+        snapshot["statistics"] = [
+            f"Mean: {stats['mean']:.2f} dB",
+            f"Peak: {stats['peak']:.2f} dB",
+            f"Std Dev: {stats['std']:.2f} dB",
+            f"Leq: {stats['leq']:.2f} dB  L10: {stats['l10']:.1f} dB  L90: {stats['l90']:.1f} dB",
+            f"Count: {stats['count']}",
+        ]
+        snapshot["statistics_note"] = (f"Analysis queue: {analysis_stats['queue_depth']} frames, "
+                                       f"dropped: {analysis_stats['dropped_frames']}")
+    else:
+        snapshot["db_color"] = "black"
+        snapshot["current_db_text"] = "N/A"
+        snapshot["statistics"] = ["No data"]
+        snapshot["statistics_note"] = None
+    # Serialized once here, so pushing the text to every connected client is a plain write
+    snapshot["stats_event"] = sse_event("stats", {
+        "text": snapshot["current_db_text"], "color": snapshot["db_color"],
+        "lines": snapshot["statistics"], "note": snapshot["statistics_note"]})
+    return snapshot
+
+def channel_snapshot(stream, channel):
+    version = (stream.ring_buffer.sequence, stream.level_stats[channel].count, stream.worker.dropped_frames)
+    return snapshot_cache.get(("graphs", stream.stream_id, channel), version,
+                              lambda: build_channel_snapshot(stream, channel))
+
+def db_style(color):
+    return {"fontSize": "48px", "color": color, "textAlign": "center"}
+
+def statistics_children(snapshot):
+    children = [html.Div(line) for line in snapshot["statistics"]]
+    if snapshot["statistics_note"]:
+        children.append(html.Div(snapshot["statistics_note"], style={'fontSize': '14px', 'color': 'gray'}))
+    return children
+
+# Full figures are only sent to new clients; they are built as plain dicts once per data version
+# so Dash serializes them without re-validating plotly objects for every client.
+# plotly.graph_objs is imported by the first figure rather than at start-up.
+def build_db_figure(snapshot):
+    import plotly.graph_objs as go
+    return {
+        "data": [go.Scatter(x=snapshot["db_x"], y=snapshot["db_y"], mode="lines+markers").to_plotly_json()],
+        "layout": go.Layout(title="dB Levels Over Time", xaxis=dict(title="Frames"),
+                            yaxis=dict(title="dB Level", range=[0, 120]), uirevision="db").to_plotly_json(),
+    }
+
+def build_waveform_figure(x_axis, snapshot):
+    import plotly.graph_objs as go
+    return {
+        # Until the ring holds a full window the trace is empty; the live stream fills it in
+        "data": [go.Scatter(x=x_axis, y=snapshot["waveform"] or [], mode="lines").to_plotly_json()],
+        "layout": go.Layout(
+            title="Waveform",
+            xaxis=dict(title="Time (ms)"),
+            yaxis=dict(title="Amplitude", range=snapshot["y_range"]),
+            uirevision="waveform",
+        ).to_plotly_json(),
+    }
+
+# The pooled, rounded spectrogram history of one channel, built once per tick for new clients
+def spectrogram_snapshot(stream, channel):
+    spectrogram = stream.spectrogram
+
+    def build():
+        start, end, columns = spectrogram.columns_since(0, channel)
+        # One decimal of dB is plenty for the colour scale and keeps the payload small
+        return {"start": start, "end": end,
+                "times": np.round(spectrogram.column_times(start, end), 4),
+                "z": np.round(max_pool(columns, SPECTROGRAM_BINS, axis=1), 1)}
+
+    return snapshot_cache.get(("spectrogram", stream.stream_id, channel), spectrogram.total_columns, build)
+
+# Build the full scrolling spectrogram heatmap for a new client
+def build_spectrogram_figure(spectrogram, snapshot):
+    import plotly.graph_objs as go
+    return {
+        "data": [go.Heatmap(
+            x=encode_array(snapshot["times"], np.float64),
+            y=encode_array(pooled_axis(spectrogram.freq_axis, SPECTROGRAM_BINS), np.float64),
+            z=encode_array(snapshot["z"]),
+            transpose=True,  # Each z row is one time column, so new columns can be appended as rows
+            zmin=-100, zmax=0,
+            colorscale="Viridis",
+            colorbar=dict(title="dB"),
+        ).to_plotly_json()],
+        "layout": go.Layout(
+            title="Spectrogram",
+            xaxis=dict(title="Time (s)"),
+            yaxis=dict(title="Frequency (Hz)"),
+            uirevision="spectrogram",
+        ).to_plotly_json(),
+    }
+
+# Callback to draw the graphs once when a channel is picked (or the page loads).
+# From then on assets/live_stream.js applies the events of /live to them in the browser;
+# "live-cursor" tells it which stream it is showing and what the figures already contain.
 @app.callback(
     [Output("waveform-graph", "figure"),
-     Output("spectrogram-graph", "figure"),
      Output("db-level-graph", "figure"),
+     Output("spectrogram-graph", "figure"),
      Output("current-db-display", "children"),
      Output("current-db-display", "style"),
-     Output("statistics-display", "children")],
-    [Input("graph-update", "n_intervals")]
+     Output("statistics-display", "children"),
+     Output("live-cursor", "data")],
+    [Input("channel-dropdown", "value"),
+     Input("channel-dropdown", "options")]
+)
+def initialize_graphs(channel_value, channel_options):
+    with open_channel(channel_value) as (stream, channel):
+        if stream is None:
+            return (no_update,) * 6 + (None,)
+        try:
+            snapshot = channel_snapshot(stream, channel)
+            spectrogram = spectrogram_snapshot(stream, channel)
+        except TimeoutError:  # The capture process stopped in the middle of an update
+            return (no_update,) * 6 + (None,)
+        figure_key = (stream.stream_id, channel)
+        db_figure = snapshot_cache.get(("db_figure",) + figure_key, snapshot["db_count"],
+                                       lambda: build_db_figure(snapshot), min_interval=0)
+        waveform_figure = snapshot_cache.get(("waveform_figure",) + figure_key, snapshot["waveform_seq"],
+                                             lambda: build_waveform_figure(waveform_axis(stream.config), snapshot),
+                                             min_interval=0)
+        spectrogram_figure = snapshot_cache.get(("spectrogram_figure",) + figure_key, spectrogram["end"],
+                                                lambda: build_spectrogram_figure(stream.spectrogram, spectrogram),
+                                                min_interval=0)
+        cursor = {"channel": channel_value, "stream": stream.stream_id, "db_count": snapshot["db_count"],
+                  "column": spectrogram["end"], "window": snapshot["window"],
+                  "columns": stream.spectrogram.history_columns}
+        return (waveform_figure, db_figure, spectrogram_figure, snapshot["current_db_text"],
+                db_style(snapshot["db_color"]), statistics_children(snapshot), cursor)
+
+# Callback to fill the transcription display on page load; new segments then arrive over /live
+@app.callback(
+    [Output("transcription-display", "children"),
+     Output("transcript-cursor", "data")],
+    [Input("transcription-display", "id")]
+)
+def initialize_transcription_display(_):
+    segments = transcript_store.since(-1, limit=TRANSCRIPT_DISPLAY_LINES // 2) if transcript_store else []
+    lines = [segment["text"] for segment in segments]
+    last_id = segments[-1]["id"] if segments else transcript_store.last_id() if transcript_store else -1
+    return [html.Div(line) for line in lines], {"last_id": last_id, "lines": lines,
+                                                 "max_lines": TRANSCRIPT_DISPLAY_LINES}
+
+# The level history of one channel at screen resolution: the last `seconds` (0 for the whole
+# session), or the zoomed range [start, end] in seconds since the stream started. Shared by all
+# clients and rebuilt at most once per second.
+def history_snapshot(stream, channel, seconds=0, start=None, end=None):
+    history = stream.level_history
+
+    def build():
+        if start is None and seconds:
+            result = history.query(-seconds, None, HISTORY_POINTS, channel)
+        else:
+            result = history.query(start, end, HISTORY_POINTS, channel)
+        origin = 1000 * (history.start_time or time.time())
+        snapshot = {"x": encode_array(origin + 1000 * result["time"], np.float64),  # Epoch ms for a date axis
+                    "min": encode_array(result["min"]), "max": encode_array(result["max"]),
+                    "leq": encode_array(result["leq"])}
+        snapshot["event"] = sse_event("history", snapshot)
+        return snapshot
+
+    return snapshot_cache.get(("history", stream.stream_id, channel, seconds, start, end), history.totals[0],
+                              build, min_interval=1.0)
+
+def build_history_figure(snapshot, seconds):
+    import plotly.graph_objs as go
+    x = snapshot["x"]
+    return {
+        "data": [
+            go.Scatter(x=x, y=snapshot["min"], mode="lines", line=dict(width=0), showlegend=False,
+                       name="Min").to_plotly_json(),
+            go.Scatter(x=x, y=snapshot["max"], mode="lines", line=dict(width=0), fill="tonexty",
+                       name="Min to max").to_plotly_json(),
+            go.Scatter(x=x, y=snapshot["leq"], mode="lines", name="Leq").to_plotly_json(),
+        ],
+        "layout": go.Layout(title="Level History", xaxis=dict(title="Time", type="date"),
+                            yaxis=dict(title="dB Level", range=[0, 120]),
+                            uirevision=f"history-{seconds}").to_plotly_json(),
+    }
+
+# Plotly reports a zoomed date axis as UTC date strings, the epoch ms it was given
+def relayout_seconds(value, origin):
+    moment = datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc)
+    return max(0.0, moment.timestamp() - origin)
+
+# Callback to draw the level history for the chosen range. Zooming re-queries just the visible
+# range, so a whole shift can be narrowed down to single frames; the live stream keeps an
+# unzoomed graph current.
+@app.callback(
+    Output("history-graph", "figure"),
+    [Input("history-range", "value"),
+     Input("history-graph", "relayoutData"),
+     Input("live-cursor", "data")]
+)
+def update_history_graph(seconds, relayout, cursor):
+    with open_channel(cursor["channel"] if cursor else None) as (stream, channel):
+        if stream is None:
+            return no_update
+        start = end = None
+        triggered = [trigger["prop_id"] for trigger in callback_context.triggered]
+        if "history-graph.relayoutData" in triggered and relayout and "xaxis.range[0]" in relayout:
+            origin = stream.level_history.start_time or time.time()
+            start = relayout_seconds(relayout["xaxis.range[0]"], origin)
+            end = relayout_seconds(relayout["xaxis.range[1]"], origin)
+        elif "history-graph.relayoutData" in triggered and not (relayout and "xaxis.autorange" in relayout):
+            return no_update  # Other interactions (legend, resize) leave the data as it is
+        try:
+            return build_history_figure(history_snapshot(stream, channel, seconds, start, end), seconds)
+        except TimeoutError:  # The capture process stopped in the middle of an update
+            return no_update
+
+# Connect (or reconnect) the browser to /live whenever a cursor is reset or the history range changes
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="connect"),
+    Output("live-connection", "data"),
+    [Input("live-cursor", "data"),
+     Input("transcript-cursor", "data"),
+     Input("history-range", "value")]
 )
-def update_graphs(n_intervals):
-    with data_lock:
-        db_values_copy = list(db_values)
-        waveform_data_copy = list(waveform_data)
-        spectrogram_frame_copy = spectrogram_frame
-
-    # Update dB graph
-    if db_values_copy:
-        x_db = np.arange(len(db_values_copy))
-        y_db = db_values_copy
-        db_figure = {
-            "data": [go.Scatter(x=x_db, y=y_db, mode="lines+markers")],
-            "layout": go.Layout(title="dB Levels Over Time", xaxis=dict(title="Frames"),
-                                yaxis=dict(title="dB Level", range=[0, 120]))
-        }
-    else:
-        db_figure = {"data": [], "layout": go.Layout(title="dB Levels Over Time")}
-
-    # Update waveform graph
-    if waveform_data_copy:
-        x_waveform = np.arange(len(waveform_data_copy)) * (1000 / 44100)  # Convert indices to milliseconds
-        y_waveform = waveform_data_copy
-
-        y_min = min(y_waveform) if y_waveform else -1
-        y_max = max(y_waveform) if y_waveform else 1
-
-        waveform_figure = {
-            "data": [go.Scatter(x=x_waveform, y=y_waveform, mode="lines")],
-            "layout": go.Layout(
-                title="Waveform",
-                xaxis=dict(title="Time (ms)"),
-                yaxis=dict(title="Amplitude", range=[y_min * 1.1, y_max * 1.1]),
-            ),
-        }
-    else:
-        waveform_figure = {"data": [], "layout": go.Layout(title="Waveform")}
-
-    # Update spectrogram graph
-    if spectrogram_frame_copy is not None:
-        freq_axis = np.fft.fftfreq(len(spectrogram_frame_copy) * 2, d=1 / 44100)[:len(spectrogram_frame_copy)]
-        spectrogram_figure = {
-            "data": [go.Scatter(x=freq_axis, y=spectrogram_frame_copy, mode="lines")],
-            "layout": go.Layout(
-                title="Spectrogram",
-                xaxis=dict(title="Frequency (Hz)"),
-                yaxis=dict(title="Amplitude"),
-            ),
-        }
-    else:
-        spectrogram_figure = {"data": [], "layout": go.Layout(title="Spectrogram")}
-
-    # Update dB level and statistics
-    if db_values_copy:
-        current_db = db_values_copy[-1]
-        db_color = "green" if current_db < 40 else "yellow" if current_db < 70 else "red"
-        db_style = {"fontSize": "48px", "color": db_color, "textAlign": "center"}
-        statistics = [
-            html.Div(f"Mean: {np.mean(db_values_copy):.2f} dB"),
-            html.Div(f"Peak: {np.max(db_values_copy):.2f} dB"),
-            html.Div(f"Std Dev: {np.std(db_values_copy):.2f} dB"),
-            html.Div(f"Count: {len(db_values_copy)}")
-        ]
-        current_db_text = f"{current_db:.2f} dB"
-    else:
-        current_db_text = "N/A"
-        db_style = {"fontSize": "48px", "color": "black", "textAlign": "center"}
-        statistics = [html.Div("No data")]
 
-    return waveform_figure, spectrogram_figure, db_figure, current_db_text, db_style, statistics
+# Server-sent events for /live. Each event is one line of compact JSON; arrays are base64 typed
+# arrays (see encode_array) and levels, spectrogram columns and transcript lines are deltas
+# after the client's cursor.
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+# The waveform envelope event of one channel, encoded at most LIVE_WAVEFORM_INTERVAL apart and
+# shared by every connected client; None until the ring holds a full window
+def live_waveform(stream, channel):
+    waveform_samples = stream.config.waveform_samples()
+
+    def build():
+        seq, samples = stream.ring_buffer.read_latest(waveform_samples, channel=channel)
+        if len(samples) < waveform_samples:
+            return None
+        _, envelope = envelope_trace(samples, WAVEFORM_POINTS)
+        y_range = [round(float(envelope.min()) * 1.1, 2), round(float(envelope.max()) * 1.1, 2)]
+        return seq, sse_event("waveform", {"y": encode_array(envelope), "range": y_range})
+
+    return snapshot_cache.get(("live_waveform", stream.stream_id, channel), stream.ring_buffer.sequence, build,
+                              min_interval=LIVE_WAVEFORM_INTERVAL)
+
+# The events of one channel whose data changed since `cursor` (updated in place)
+def channel_events(stream, channel, cursor, started):
+    events = []
+    # dB levels after the client's last one
+    count, levels = stream.level_stats[channel].levels_since(cursor["db_count"])
+    if len(levels):
+        events.append(sse_event("levels", {"x0": count - len(levels), "y": np.round(levels, 2).tolist()}))
+        cursor["db_count"] = count
+
+    # New STFT columns, pooled and rounded like the full figure
+    start, end, columns = stream.spectrogram.columns_since(cursor["column"], channel)
+    if end > cursor["column"]:
+        events.append(sse_event("spectrogram", {
+            "end": end, "x": np.round(stream.spectrogram.column_times(start, end), 4).tolist(),
+            "z": encode_array(np.round(max_pool(columns, SPECTROGRAM_BINS, axis=1), 1))}))
+        cursor["column"] = end
+
+    waveform = live_waveform(stream, channel)
+    if waveform is not None and waveform[0] != cursor.get("waveform_seq"):
+        events.append(waveform[1])
+        cursor["waveform_seq"] = waveform[0]
+
+    snapshot = channel_snapshot(stream, channel)
+    if snapshot["stats_key"] != cursor.get("stats_key"):
+        events.append(snapshot["stats_event"])
+        cursor["stats_key"] = snapshot["stats_key"]
+
+    if cursor["history"] is not None and started - cursor.get("history_sent", 0.0) >= LIVE_HISTORY_INTERVAL:
+        events.append(history_snapshot(stream, channel, cursor["history"])["event"])
+        cursor["history_sent"] = started
+    return events
+
+# One push for a client: every event whose data changed since `cursor` (updated in place),
+# concatenated, or "" when nothing did. A stream that was stopped or restarted, or whose capture
+# process stopped in the middle of an update, yields "reset", after which the client fetches full
+# figures again (refresh_channels).
+def live_chunks(cursor):
+    started = time.perf_counter()
+    events = []
+    if cursor["stream"] is not None:
+        with open_channel(cursor["channel"]) as (stream, channel):
+            if stream is None or stream.stream_id != cursor["stream"]:
+                cursor["stream"] = None
+                return sse_event("reset", {})
+            try:
+                events = channel_events(stream, channel, cursor, started)
+            except TimeoutError:  # The capture process stopped in the middle of an update
+                cursor["stream"] = None
+                return sse_event("reset", {})
+
+    if cursor["segment"] is not None and transcript_store is not None and transcript_store.last_id() > cursor["segment"]:
+        segments = transcript_store.since(cursor["segment"], limit=TRANSCRIPT_DISPLAY_LINES)
+        events.append(sse_event("transcript", {"last_id": segments[-1]["id"],
+                                               "lines": [segment["text"] for segment in segments]}))
+        cursor["segment"] = segments[-1]["id"]
+
+    if events:
+        pipeline_metrics.histogram("live_push").record(time.perf_counter() - started)
+    return "".join(events)
+
+def live_events(cursor):
+    # Holds its stream for the connection's lifetime, so a detached reader stays mapped until it ends
+    stream, _ = resolve_channel(cursor["channel"])
+    batches = -1
+    last_sent = time.monotonic()
+    try:
+        while True:
+            chunk = live_chunks(cursor)
+            now = time.monotonic()
+            if chunk:
+                yield chunk
+                last_sent = now
+                if chunk.startswith("event: reset"):
+                    return
+            elif now - last_sent > LIVE_KEEPALIVE:
+                yield ": keep-alive\n\n"  # Lets proxies and the browser see the connection is alive
+                last_sent = now
+            # Coalesce bursts of small analysis batches, then sleep until the next one is published
+            time.sleep(LIVE_MIN_INTERVAL)
+            if stream is not None and cursor["stream"] is not None:
+                batches = stream.wait_for_batch(batches, LIVE_IDLE_WAIT)
+            else:
+                time.sleep(LIVE_IDLE_WAIT)
+    finally:
+        if stream is not None:
+            stream.release()
+
+# Live updates: /live?channel=<device>#<channel>&stream=&db_count=&column=&segment=&history=
+# (the cursors returned by initialize_graphs and initialize_transcription_display, and the
+# history range in seconds)
+@app.server.route("/live")
+def live_endpoint():
+    def optional_int(name):
+        value = request.args.get(name)
+        return int(value) if value not in (None, "") else None
+
+    cursor = {"channel": request.args.get("channel"), "stream": optional_int("stream"),
+              "db_count": optional_int("db_count") or 0, "column": optional_int("column") or 0,
+              "segment": optional_int("segment"), "history": optional_int("history")}
+    return Response(live_events(cursor), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Format the metrics snapshot for the on-dashboard panel
+def format_metrics(snapshot):
+    lines = [f"callbacks: {snapshot['callbacks']}"]
+    lines += [f"{name}: {count}" for name, count in snapshot["status"].items() if count]
+    for name, h in snapshot["histograms"].items():
+        if h["count"]:
+            lines.append(f"{name}: p50 {h['p50_ms']:.2f} ms  p99 {h['p99_ms']:.2f} ms  max {h['max_ms']:.2f} ms")
+    lines += [f"{name}: {value}" for name, value in snapshot["gauges"].items()]
+    return "\n".join(lines)
+
+# The metrics panel only polls while it is open
+@app.callback(Output("metrics-update", "disabled"), [Input("metrics-panel", "open")])
+def toggle_metrics_polling(panel_open):
+    return not panel_open
+
+# Callback to refresh the metrics panel; does nothing while the panel is collapsed
+@app.callback(
+    Output("metrics-display", "children"),
+    [Input("metrics-update", "n_intervals")],
+    [State("metrics-panel", "open")]
+)
+def update_metrics_panel(n_intervals, panel_open):
+    if not panel_open:
+        return no_update
+    return format_metrics(pipeline_metrics.snapshot())
+
+# Lightweight metrics endpoint on the underlying Flask server (JSON, or ?format=prometheus)
+@app.server.route("/metrics")
+def metrics_endpoint():
+    if request.args.get("format") == "prometheus":
+        return Response(pipeline_metrics.prometheus_text(), mimetype="text/plain; version=0.0.4")
+    return Response(json.dumps(pipeline_metrics.snapshot()), mimetype="application/json")
 
 # Run the Dash app
 if __name__ == "__main__":
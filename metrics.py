@@ -0,0 +1,144 @@
+from bisect import bisect_right
+import time
+
+# Low-overhead pipeline instrumentation.
+# Histograms use fixed log-spaced buckets allocated up front, so recording on the audio thread is
+# a bisect and a few integer increments: no allocation, no locks. Readers may see a snapshot that
+# is one sample behind, which is fine for monitoring.
+
+# PortAudio stream callback status flags (same values as pyaudio.paInputUnderflow etc.)
+STATUS_FLAGS = {
+    "input_underflow": 1,
+    "input_overflow": 2,
+    "output_underflow": 4,
+    "output_overflow": 8,
+    "priming_output": 16,
+}
+
+def label_value(value):
+    # A Prometheus label value: backslash, double quote and newline escaped as the text format requires
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class LatencyHistogram:
+    def __init__(self, min_seconds=1e-6, max_seconds=10.0, buckets_per_decade=10):
+        decades = 0
+        while min_seconds * 10 ** decades < max_seconds:
+            decades += 1
+        self.edges = [min_seconds * 10 ** (i / buckets_per_decade) for i in range(decades * buckets_per_decade + 1)]
+        self.counts = [0] * (len(self.edges) + 1)  # counts[i] holds values in [edges[i-1], edges[i])
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_right(self.edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        # Upper edge of the bucket holding the q-th percentile (q in 0..100), capped at the maximum
+        if self.count == 0:
+            return 0.0
+        target = q / 100 * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target and n:
+                return min(self.edges[i], self.max) if i < len(self.edges) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * self.percentile(50),
+            "p90_ms": 1000 * self.percentile(90),
+            "p99_ms": 1000 * self.percentile(99),
+            "max_ms": 1000 * self.max,
+        }
+
+class PipelineMetrics:
+    def __init__(self):
+        self.histograms = {
+            "callback_duration": LatencyHistogram(),
+            "callback_jitter": LatencyHistogram(),  # |actual - expected| interval between callbacks
+            "callback_lateness": LatencyHistogram(),  # Callback start relative to the buffer's ADC time
+            "analysis_batch": LatencyHistogram(),
+            "live_push": LatencyHistogram(),  # Building one /live push for one client
+            "recorder_write": LatencyHistogram(),
+        }
+        self.status_counts = {name: 0 for name in STATUS_FLAGS}
+        self.callbacks = 0
+        self.gauges = {}  # name -> zero-argument callable, evaluated on read
+        self.started = time.time()
+        self._last_callback = {}  # stream key -> perf_counter() of its previous callback
+
+    def histogram(self, name):
+        return self.histograms[name]
+
+    def add_gauge(self, name, func):
+        self.gauges[name] = func
+
+    def remove_gauge(self, name):
+        self.gauges.pop(name, None)
+
+    def reset_stream(self, stream=None):
+        # Forget the previous callback time so a new stream does not register a huge jitter
+        self._last_callback.pop(stream, None)
+
+    def record_callback(self, started, finished, frame_count, sample_rate, time_info=None, status=0, stream=None):
+        # Called at the end of every stream callback with perf_counter() timestamps.
+        # Jitter is measured per `stream`, so concurrent devices do not disturb each other.
+        self.callbacks += 1
+        self.histograms["callback_duration"].record(finished - started)
+        last = self._last_callback.get(stream)
+        if last is not None:
+            expected = frame_count / sample_rate
+            self.histograms["callback_jitter"].record(abs(started - last - expected))
+        self._last_callback[stream] = started
+        if status:
+            for name, flag in STATUS_FLAGS.items():
+                if status & flag:
+                    self.status_counts[name] += 1
+        if time_info:
+            adc_time = time_info.get("input_buffer_adc_time", 0.0)
+            current_time = time_info.get("current_time", 0.0)
+            if adc_time and current_time >= adc_time:
+                self.histograms["callback_lateness"].record(current_time - adc_time)
+
+    def snapshot(self):
+        gauges = {}
+        for name, func in self.gauges.items():
+            try:
+                gauges[name] = func()
+            except Exception:
+                gauges[name] = None
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "callbacks": self.callbacks,
+            "status": dict(self.status_counts),
+            "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            "gauges": gauges,
+        }
+
+    def prometheus_text(self, prefix="audio_pipeline"):
+        # Prometheus text exposition format (histograms as cumulative buckets, in seconds)
+        lines = [f"{prefix}_callbacks_total {self.callbacks}"]
+        for name, count in self.status_counts.items():
+            lines.append(f'{prefix}_stream_status_total{{flag="{name}"}} {count}')
+        for name, h in self.histograms.items():
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for edge, n in zip(h.edges, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{edge:.6g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum {h.total}")
+            lines.append(f"{metric}_count {h.count}")
+        for name, value in self.snapshot()["gauges"].items():
+            if isinstance(value, (int, float)):
+                lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
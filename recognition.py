@@ -0,0 +1,359 @@
+import io
+import json
+import threading
+import time
+import urllib.request
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Pluggable speech recognition backends and a worker pool that runs them concurrently.
+# Backends turn a vad.Utterance into (text, confidence) and raise NoSpeechError or
+# BackendUnavailableError; the pool hands results back strictly in capture order.
+
+class NoSpeechError(Exception):
+    pass
+
+class BackendUnavailableError(Exception):
+    pass
+
+def utterance_wav(utterance):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(utterance.sample_rate)
+        w.writeframes(utterance.pcm16())
+    return buffer.getvalue()
+
+def speech_recognition():
+    # SpeechRecognition is imported on the first utterance, not at start-up; without it the
+    # Google and Sphinx backends report themselves unavailable
+    try:
+        import speech_recognition
+    except ImportError as e:
+        raise BackendUnavailableError(str(e))
+    return speech_recognition
+
+class RecognitionBackend:
+    name = "base"
+
+    def recognize(self, utterance):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class GoogleBackend(RecognitionBackend):
+    name = "google"
+
+    def __init__(self, language="en-US", timeout=10.0):
+        self.language = language
+        self.timeout = timeout  # Seconds before a request is abandoned (so a worker is never stuck)
+
+    def recognize(self, utterance):
+        sr = speech_recognition()
+        audio = sr.AudioData(utterance.pcm16(), utterance.sample_rate, 2)
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.timeout
+        try:
+            result = recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except (sr.RequestError, OSError) as e:  # socket.timeout is an OSError
+            raise BackendUnavailableError(str(e))
+        alternatives = result.get("alternative") if isinstance(result, dict) else None
+        if not alternatives:
+            raise NoSpeechError()
+        best = alternatives[0]
+        return best["transcript"], best.get("confidence")
+
+class SphinxBackend(RecognitionBackend):
+    # Offline recognition through CMU PocketSphinx (pip install pocketsphinx)
+    name = "sphinx"
+
+    def __init__(self, language="en-US"):
+        self.language = language
+
+    def recognize(self, utterance):
+        sr = speech_recognition()
+        audio = sr.AudioData(utterance.pcm16(), utterance.sample_rate, 2)
+        try:
+            text = sr.Recognizer().recognize_sphinx(audio, language=self.language)
+        except sr.UnknownValueError:
+            raise NoSpeechError()
+        except sr.RequestError as e:
+            raise BackendUnavailableError(str(e))
+        if not text:
+            raise NoSpeechError()
+        return text, None
+
+class HttpBackend(RecognitionBackend):
+    # POSTs the utterance as WAV and expects {"text": ..., "confidence": ...} back.
+    # A `server` (e.g. MockRecognitionServer) started for this backend is stopped by close().
+    name = "http"
+
+    def __init__(self, url, timeout=10.0, server=None):
+        self.url = url
+        self.timeout = timeout
+        self.server = server
+
+    def recognize(self, utterance):
+        request = urllib.request.Request(self.url, data=utterance_wav(utterance),
+                                         headers={"Content-Type": "audio/wav"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.loads(response.read())
+        except OSError as e:
+            raise BackendUnavailableError(str(e))
+        if not result.get("text"):
+            raise NoSpeechError()
+        return result["text"], result.get("confidence")
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+
+class StubBackend(RecognitionBackend):
+    # Deterministic in-process backend for tests and load checks; `delay` simulates recognition time
+    name = "stub"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def recognize(self, utterance):
+        if self.delay:
+            time.sleep(self.delay)
+        return f"[utterance {utterance.start_index / utterance.sample_rate:.2f}s, {utterance.duration():.2f}s]", 1.0
+
+class MockRecognitionServer:
+    # Local HTTP server speaking HttpBackend's protocol, for testing without a real service
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        delay_seconds = delay
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with wave.open(io.BytesIO(data), "rb") as w:
+                    duration = w.getnframes() / w.getframerate()
+                if delay_seconds:
+                    time.sleep(delay_seconds)
+                body = json.dumps({"text": f"[mock {duration:.2f}s]", "confidence": 1.0}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-recognition-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def create_backend(spec):
+    # "google", "sphinx", "stub", "stub:<delay>", "mock" (starts a local mock server) or an http(s) URL
+    kind, _, argument = spec.partition(":")
+    if kind == "google":
+        return GoogleBackend()
+    if kind == "sphinx":
+        return SphinxBackend()
+    if kind == "stub":
+        return StubBackend(delay=float(argument or 0))
+    if kind == "mock":
+        server = MockRecognitionServer().start()
+        return HttpBackend(server.url, server=server)
+    if kind in ("http", "https"):
+        return HttpBackend(spec)
+    raise ValueError(f"Unknown recognition backend: {spec}")
+
+def _recognize(backend, utterance):
+    # Runs inside a worker (thread or process); errors are returned, not raised
+    try:
+        text, confidence = backend.recognize(utterance)
+        return text, confidence, None
+    except NoSpeechError:
+        return None, None, "no_speech"
+    except BackendUnavailableError:
+        return None, None, "unavailable"
+    except Exception as e:
+        return None, None, f"error: {e}"
+
+class RecognitionResult:
+    def __init__(self, sequence, utterance, text=None, confidence=None, error=None, latency=0.0):
+        self.sequence = sequence
+        self.utterance = utterance
+        self.text = text
+        self.confidence = confidence
+        self.error = error  # None, "no_speech", "unavailable", "timeout", "dropped" or "error: ..."
+        self.latency = latency  # Seconds from submission to result
+
+class RecognitionPool:
+    # Runs a backend on a pool of workers. Submissions wait in a bounded queue; when it is full,
+    # `policy` decides: "drop_oldest" (favour fresh speech), "drop_newest", or "block" (backpressure
+    # on the caller). Each segment gets `timeout` seconds once dispatched; results are delivered to
+    # on_result strictly in submission order, with dropped/timed-out segments reported in place.
+    # A timed-out worker thread cannot be interrupted, so it still counts as busy until its backend
+    # call returns (backends time out their own requests); if every worker is stuck like that, the
+    # executor is replaced and the stuck threads are left to finish on their own.
+    def __init__(self, backend, on_result, workers=2, mode="thread", max_pending=8, policy="drop_oldest",
+                 timeout=15.0):
+        if policy not in ("drop_oldest", "drop_newest", "block"):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.backend = backend
+        self.on_result = on_result
+        self.workers = workers
+        self.mode = mode
+        self.max_pending = max_pending
+        self.policy = policy
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._pending = deque()  # (sequence, utterance, submitted_at) waiting for a worker
+        self._in_flight = {}  # sequence -> (future, utterance, submitted_at, deadline)
+        self._stuck = set()  # Futures that timed out but are still running
+        self._finished = {}  # sequence -> RecognitionResult, waiting for earlier sequences
+        self._next_sequence = 0
+        self._next_to_emit = 0
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+        self.submitted = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.completed = 0
+        self.executors_replaced = 0
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._executor = self._new_executor()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="recognition-dispatch", daemon=True)
+        self._thread.start()
+
+    def _new_executor(self):
+        executor_class = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+        return executor_class(max_workers=self.workers)
+
+    def stop(self):
+        # Stops dispatching; queued segments are discarded, running ones are not waited for
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._condition:
+            # Forget anything still outstanding so a restart begins with a clean sequence
+            self._in_flight.clear()
+            self._stuck.clear()
+            self._finished.clear()
+            self._next_to_emit = self._next_sequence
+
+    def queue_depth(self):
+        return len(self._pending)
+
+    def submit(self, utterance):
+        # Returns False if the utterance was dropped
+        with self._condition:
+            if not self._running:
+                return False
+            while len(self._pending) >= self.max_pending:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.policy == "drop_oldest":
+                    sequence, old, submitted_at = self._pending.popleft()
+                    self.dropped += 1
+                    self._finished[sequence] = RecognitionResult(sequence, old, error="dropped")
+                    break
+                self._condition.wait()
+                if not self._running:
+                    return False
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            self._pending.append((sequence, utterance, time.monotonic()))
+            self.submitted += 1
+            self._condition.notify_all()
+            return True
+
+    def _dispatch_loop(self):
+        while True:
+            ready = []
+            with self._condition:
+                if not self._running:
+                    return
+                self._stuck = {future for future in self._stuck if not future.done()}
+                if len(self._stuck) >= self.workers:
+                    # Every worker is stuck on a timed-out call: start over with fresh ones
+                    self._executor.shutdown(wait=False)
+                    self._executor = self._new_executor()
+                    self._stuck.clear()
+                    self.executors_replaced += 1
+
+                # Hand queued segments to idle workers
+                while self._pending and len(self._in_flight) + len(self._stuck) < self.workers:
+                    sequence, utterance, submitted_at = self._pending.popleft()
+                    future = self._executor.submit(_recognize, self.backend, utterance)
+                    future.add_done_callback(self._wake)
+                    self._in_flight[sequence] = (future, utterance, submitted_at, time.monotonic() + self.timeout)
+                    self._condition.notify_all()  # Space freed for blocked submitters
+
+                now = time.monotonic()
+                for sequence, (future, utterance, submitted_at, deadline) in list(self._in_flight.items()):
+                    if future.done():
+                        text, confidence, error = future.result()
+                        self._finished[sequence] = RecognitionResult(sequence, utterance, text, confidence, error,
+                                                                     now - submitted_at)
+                        del self._in_flight[sequence]
+                        self.completed += 1
+                    elif now >= deadline:
+                        # A running call cannot be interrupted: its worker stays busy, the late result is ignored
+                        if not future.cancel():
+                            self._stuck.add(future)
+                        self._finished[sequence] = RecognitionResult(sequence, utterance, error="timeout",
+                                                                     latency=now - submitted_at)
+                        del self._in_flight[sequence]
+                        self.timeouts += 1
+
+                while self._next_to_emit in self._finished:
+                    ready.append(self._finished.pop(self._next_to_emit))
+                    self._next_to_emit += 1
+
+                if not ready:
+                    self._condition.wait(0.05)
+
+            for result in ready:  # Outside the lock so a slow consumer does not stall submitters
+                self.on_result(result)
+
+    def _wake(self, future):
+        with self._condition:
+            self._condition.notify_all()
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts,
+            "queue_depth": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "stuck": len(self._stuck),
+            "executors_replaced": self.executors_replaced,
+        }
@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# Session recorder: rows are queued without blocking and written by a background thread in
+# batches, one raw little-endian binary file per column, so a segment can be memory-mapped back
+# into NumPy arrays without parsing. Free text (transcriptions) goes to a separate JSON-lines file.
+#
+# Layout of a session directory:
+#   segment_0000/manifest.json    column names, dtypes and per-row shapes
+#   segment_0000/<column>.bin     rows of that column, back to back
+#   segment_0000/text.jsonl       {"timestamp": ..., "text": ...} per line
+
+MANIFEST_NAME = "manifest.json"
+TEXT_NAME = "text.jsonl"
+
+class SessionRecorder:
+    def __init__(self, directory, columns, max_segment_bytes=64 * 1024 * 1024, max_segment_seconds=3600,
+                 flush_interval=1.0, max_pending=10000, write_latency=None, metadata=None):
+        # `columns` maps a column name to (dtype, row_shape), e.g. {"waveform": ("<f4", (1024,))}.
+        # `metadata` (JSON-serialisable, e.g. the stream config) is stored in every segment manifest.
+        self.directory = directory
+        self.columns = {name: (np.dtype(dtype).newbyteorder('<'), tuple(shape)) for name, (dtype, shape) in columns.items()}
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.flush_interval = flush_interval
+        self.write_latency = write_latency  # Optional metrics.LatencyHistogram for batch write time
+        self.metadata = metadata or {}
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._files = {}
+        self._text_file = None
+        self._segment_index = -1
+        self._segment_bytes = 0
+        self._segment_started = 0.0
+
+        self.rows_written = 0
+        self.dropped_rows = 0
+        self.last_write_seconds = 0.0  # Duration of the most recent batch write
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_index = self._next_segment_index()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Flushes everything queued so far, then closes the current segment
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        elif self._files:  # Written synchronously with flush()
+            self._flush()
+            self._close_segment()
+
+    def flush(self):
+        # Write everything queued so far on the caller's thread. For use without the background
+        # writer (batch jobs, benchmarks); stop() closes the segment afterwards.
+        if self.is_running():
+            raise RuntimeError("the background writer owns the segment files while the recorder runs")
+        if self._segment_index < 0:
+            os.makedirs(self.directory, exist_ok=True)
+            self._segment_index = self._next_segment_index()
+        self._flush()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(self, **values):
+        # Queue one row; never blocks the caller. Rows are dropped (and counted) if the writer is behind.
+        try:
+            self._queue.put_nowait(("row", values))
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def record_text(self, timestamp, text, **fields):
+        # Extra keyword fields (e.g. segment id, confidence) are stored alongside the text
+        try:
+            self._queue.put_nowait(("text", {"timestamp": timestamp, "text": text, **fields}))
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def _next_segment_index(self):
+        existing = [name for name in os.listdir(self.directory) if name.startswith("segment_")]
+        return max((int(name.split("_")[1]) for name in existing), default=-1) + 1
+
+    def _run(self):
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self._flush()
+            self._flush()
+        finally:
+            self._close_segment()
+
+    def _drain(self):
+        rows, texts = [], []
+        while True:
+            try:
+                kind, item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows, texts
+            (rows if kind == "row" else texts).append(item)
+
+    def _flush(self):
+        rows, texts = self._drain()
+        if not rows and not texts:
+            return
+        started = time.perf_counter()
+        if not self._files or self._should_rotate():
+            self._open_segment()
+
+        if rows:
+            for name, (dtype, shape) in self.columns.items():
+                block = np.zeros((len(rows),) + shape, dtype=dtype)
+                for i, row in enumerate(rows):
+                    if row.get(name) is not None:
+                        block[i] = row[name]
+                data = block.tobytes()
+                self._files[name].write(data)
+                self._segment_bytes += len(data)
+            self.rows_written += len(rows)
+
+        for text in texts:
+            line = json.dumps(text) + "\n"
+            self._text_file.write(line)
+            self._segment_bytes += len(line)
+
+        for f in self._files.values():
+            f.flush()
+        self._text_file.flush()
+        self.last_write_seconds = time.perf_counter() - started
+        if self.write_latency is not None:
+            self.write_latency.record(self.last_write_seconds)
+
+    def _should_rotate(self):
+        return (self._segment_bytes >= self.max_segment_bytes
+                or time.monotonic() - self._segment_started >= self.max_segment_seconds)
+
+    def _open_segment(self):
+        if self._files:
+            self._close_segment()
+            self._segment_index += 1
+        path = os.path.join(self.directory, f"segment_{self._segment_index:04d}")
+        os.makedirs(path, exist_ok=True)
+        manifest = {
+            "created": time.time(),
+            "columns": {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in self.columns.items()},
+            "metadata": self.metadata,
+        }
+        with open(os.path.join(path, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "ab") for name in self.columns}
+        self._text_file = open(os.path.join(path, TEXT_NAME), "a")
+        self._segment_bytes = 0
+        self._segment_started = time.monotonic()
+
+    def _close_segment(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        if self._text_file is not None:
+            self._text_file.close()
+            self._text_file = None
+
+class SessionReader:
+    # Read-only access to a recorded session; columns are memory-mapped, not loaded
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                               if name.startswith("segment_"))
+
+    def manifest(self, index):
+        with open(os.path.join(self.segments[index], MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def metadata(self, index):
+        # What the recording was made with, e.g. sample rate and buffer sizes
+        return self.manifest(index).get("metadata", {})
+
+    def read_segment(self, index):
+        path = self.segments[index]
+        manifest = self.manifest(index)
+        arrays = {}
+        for name, spec in manifest["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            file_path = os.path.join(path, f"{name}.bin")
+            row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            n_rows = os.path.getsize(file_path) // row_bytes if os.path.exists(file_path) else 0
+            if n_rows == 0:
+                arrays[name] = np.empty((0,) + shape, dtype=dtype)
+            else:
+                # Only whole rows are mapped, in case the writer is mid-append
+                arrays[name] = np.memmap(file_path, dtype=dtype, mode="r", shape=(n_rows,) + shape)
+        n = min((len(a) for a in arrays.values()), default=0)
+        return {name: a[:n] for name, a in arrays.items()}
+
+    def read_text(self, index):
+        path = os.path.join(self.segments[index], TEXT_NAME)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def column(self, name):
+        # One column across all segments (this concatenation copies)
+        parts = [self.read_segment(i)[name] for i in range(len(self.segments))]
+        return np.concatenate(parts) if parts else np.empty(0)
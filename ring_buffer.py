@@ -0,0 +1,98 @@
+import numpy as np
+
+class AudioRingBuffer:
+    # Preallocated single-writer / many-reader sample ring.
+    # The writer (the PortAudio callback) announces the range it is about to overwrite, copies
+    # into the preallocated array and then bumps two integer counters; readers never take a lock;
+    # instead they validate afterwards that the region they looked at was not overwritten, or
+    # being overwritten, while they were reading it.
+    # With channels > 1 the ring is (channels x capacity) and every write/read is a
+    # (channels x n) block; indices still count frames (one sample per channel).
+    def __init__(self, capacity, dtype=np.float32, channels=1):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.channels = channels
+        shape = (self.capacity,) if channels == 1 else (channels, self.capacity)
+        self.buffer = np.zeros(shape, dtype=self.dtype)
+        self.total_written = 0  # Absolute index of the next sample to be written
+        self.write_end = 0  # End of the write in progress (== total_written between writes)
+        self.sequence = 0  # Number of completed writes
+
+    def write(self, data):
+        # `data` is (n,) for a mono ring or (channels x n); strided views (e.g. a transposed
+        # interleaved buffer) are copied straight into place
+        data = np.asarray(data, dtype=self.dtype)
+        n = data.shape[-1]
+        if n == 0:
+            return
+        end = self.total_written + n
+        # Announce the overwrite before touching the buffer: a reader whose copy overlaps this
+        # one then fails its is_intact() check afterwards instead of returning torn samples
+        self.write_end = end
+        if n > self.capacity:  # Only the newest samples can survive anyway
+            data = data[..., -self.capacity:]
+            n = self.capacity
+
+        start = (end - n) % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[..., start:start + first] = data[..., :first]
+        if first < n:
+            self.buffer[..., :n - first] = data[..., first:]
+
+        # Publish only after the copy is complete
+        self.total_written = end
+        self.sequence += 1
+
+    def available(self):
+        return min(self.total_written, self.capacity)
+
+    def oldest_index(self):
+        return max(0, self.total_written - self.capacity)
+
+    def is_intact(self, start):
+        # True while samples from absolute index `start` onwards have not been overwritten,
+        # counting a write that is still in progress
+        return self.write_end - start <= self.capacity
+
+    def views(self, start, stop, channel=None):
+        # Zero-copy views over absolute range [start, stop); one view, or two when it wraps.
+        # `channel` restricts a multi-channel ring to one row.
+        # Callers must check is_intact(start) after consuming the views.
+        buffer = self.buffer if channel is None or self.channels == 1 else self.buffer[channel]
+        n = stop - start
+        if n <= 0:
+            return (buffer[..., :0],)
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        if first == n:
+            return (buffer[..., offset:offset + n],)
+        return (buffer[..., offset:], buffer[..., :n - first])
+
+    def _shape(self, n, channel):
+        return (n,) if channel is not None or self.channels == 1 else (self.channels, n)
+
+    def read(self, start, n, out=None, channel=None):
+        # Copy absolute range [start, start + n) into `out`; returns None if it was overwritten
+        if out is None:
+            out = np.empty(self._shape(n, channel), dtype=self.dtype)
+        stop = start + n
+        if stop > self.total_written or not self.is_intact(start):
+            return None
+        pos = 0
+        for view in self.views(start, stop, channel):
+            out[..., pos:pos + view.shape[-1]] = view
+            pos += view.shape[-1]
+        if not self.is_intact(start):  # The writer lapped us during the copy
+            return None
+        return out[..., :n]
+
+    def read_latest(self, n, out=None, retries=3, channel=None):
+        # Snapshot of the newest `n` samples; returns (sequence, samples)
+        for _ in range(retries):
+            sequence = self.sequence
+            end = self.total_written
+            count = min(n, end, self.capacity)
+            samples = self.read(end - count, count, out, channel)
+            if samples is not None:
+                return sequence, samples
+        return self.sequence, np.empty(self._shape(0, channel), dtype=self.dtype)
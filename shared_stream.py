@@ -0,0 +1,546 @@
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from capture import open_capture_stream
+from level_history import LevelHistory
+from spectrogram import get_frequency_axis
+from stream_config import DEFAULT_PROFILE, LATENCY_PROFILES, config_from_dict
+
+# Multi-process mode: capture and analysis run in one process (`python shared_stream.py`), which
+# publishes every stream into a shared memory segment after each analysis batch; dashboard
+# processes attach to the segments and read them without locks or copies of whole buffers, so
+# web traffic never competes with the audio callback for the same GIL.
+#
+# A segment holds a JSON metadata block followed by fixed arrays (raw audio ring, recent levels,
+# level statistics, spectrogram history and level history pyramid). The writer bumps a sequence
+# counter to odd before changing anything and back to even afterwards (a seqlock); readers copy
+# what they need and retry if the counter was odd or moved meanwhile.
+# A small registry segment lists the published streams.
+
+DEFAULT_REGISTRY = "audio-dashboard"
+META_BYTES = 8192
+REGISTRY_BYTES = 65536
+ALIGN = 64
+
+# Header slots (int64)
+SEQ = 0
+AUDIO_TOTAL = 1
+AUDIO_SEQUENCE = 2
+SPECTROGRAM_TOTAL = 3
+LEVEL_COUNT = 4
+BATCHES = 5
+DROPPED_FRAMES = 6
+QUEUE_DEPTH = 7
+PROCESSED_FRAMES = 8
+HISTORY_TOTALS = 9  # One slot per history tier from here
+HEADER_SLOTS = 32
+
+# Registry header slots (int64), followed by the JSON
+LENGTH = 1
+CLOSED = 2
+REGISTRY_HEADER = 3
+
+STAT_FIELDS = ("current", "mean", "peak", "std", "count", "leq", "l10", "l90", "lmax",
+               "session_mean", "session_std", "session_count")
+
+created_segments = {}  # Name -> inode of the segments this process created (and will unlink)
+
+def create_segment(size, name=None):
+    segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    created_segments[segment.name] = segment_inode(segment.name)
+    return segment
+
+def attach_segment(name):
+    # Attach without registering the segment for cleanup: only its creator may unlink it.
+    # Before Python 3.13 attaching registers it with this process's resource tracker, which
+    # is undone unless this process created the segment (the tracker keeps one entry per
+    # name, so unregistering it here would make the creator's unlink fail).
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        if name not in created_segments:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+def segment_inode(name):
+    # The file behind a segment name where shared memory is visible as files (Linux), else None
+    try:
+        return os.stat(os.path.join("/dev/shm", name)).st_ino
+    except OSError:
+        return None
+
+def unlink_segment(name):
+    # Remove a segment another process created without going through SharedMemory.unlink(),
+    # which unregisters it from a resource tracker that never registered it
+    try:
+        from _posixshmem import shm_unlink
+    except ImportError:  # Windows frees a segment with its last handle
+        return
+    try:
+        shm_unlink("/" + name)
+    except FileNotFoundError:
+        pass
+
+def segment_layout(meta):
+    # (name, dtype, shape) of each array after the metadata block
+    channels = meta["config"]["channels"]
+    return [
+        ("header", np.int64, (HEADER_SLOTS,)),
+        ("start_time", np.float64, (1,)),
+        ("audio", np.float32, (channels, meta["ring_capacity"])),
+        ("levels", np.float32, (channels, meta["level_window"])),
+        ("stats", np.float64, (channels, len(STAT_FIELDS))),
+        ("spectrogram", np.float32, (meta["history_columns"], channels, meta["n_bins"])),
+        ("history", np.float32, tuple(meta["history_shape"])),
+    ]
+
+def map_arrays(buffer, meta):
+    # Views of every array in a segment buffer (None to only compute the size); returns (arrays, size)
+    arrays = {}
+    offset = META_BYTES
+    for name, dtype, shape in segment_layout(meta):
+        if buffer is not None:
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += -(-np.dtype(dtype).itemsize * int(np.prod(shape)) // ALIGN) * ALIGN
+    return arrays, offset
+
+def seqlock_read(header, read, retries=1000):
+    # Run `read` until it completes without a write in between
+    for attempt in range(retries):
+        sequence = int(header[SEQ])
+        if sequence % 2 == 0:
+            result = read()
+            if int(header[SEQ]) == sequence:
+                return result
+        if attempt > 10:
+            time.sleep(0.0001)
+    raise TimeoutError("shared stream is not being updated consistently")
+
+class SharedStreamPublisher:
+    # Writer side: mirrors one capture.CaptureStream into a new segment after every analysis batch.
+    # Only what changed since the previous batch is copied.
+    def __init__(self, stream, name=None):
+        self.stream = stream
+        spectrogram = stream.spectrogram
+        history = stream.level_history
+        self.meta = {
+            "key": stream.key,
+            "label": stream.label,
+            "stream_id": stream.stream_id,
+            "config": stream.config.as_dict(),
+            "ring_capacity": stream.ring_buffer.capacity,
+            "level_window": stream.level_stats[0].window,
+            "history_columns": spectrogram.history_columns,
+            "n_bins": spectrogram.n_bins,
+            "history_shape": list(history.shape()),
+            "history_factor": history.factor,
+            "frame_seconds": history.frame_seconds,
+        }
+        _, size = map_arrays(None, self.meta)
+        self.segment = create_segment(size, name)
+        self.name = self.segment.name
+        meta = json.dumps(self.meta).encode()
+        if len(meta) > META_BYTES:
+            raise ValueError("stream metadata does not fit the segment header")
+        self.segment.buf[:len(meta)] = meta
+        self.arrays, _ = map_arrays(self.segment.buf, self.meta)
+        self.arrays["stats"][:] = np.nan
+
+        self._audio_total = 0
+        self._level_count = 0
+        self._spectrogram_total = 0
+        self._history_totals = [0] * history.tiers
+        stream.listeners.append(self.publish)
+
+    def publish(self, db_levels, spectra):
+        # Runs on the stream's analysis thread right after it published the batch locally
+        stream = self.stream
+        header = self.arrays["header"]
+        header[SEQ] += 1  # Odd: readers wait for the write to finish
+        try:
+            self._copy_audio()
+            self._copy_levels(db_levels)
+            self._copy_spectra(spectra)
+            for channel, stats in enumerate(stream.level_stats):
+                snapshot = stats.snapshot()
+                if snapshot is not None:
+                    self.arrays["stats"][channel] = [snapshot[field] for field in STAT_FIELDS]
+            self._history_totals, start_time = stream.level_history.copy_into(self.arrays["history"],
+                                                                              self._history_totals)
+            self.arrays["start_time"][0] = start_time or 0.0
+            header[HISTORY_TOTALS:HISTORY_TOTALS + len(self._history_totals)] = self._history_totals
+            header[BATCHES] = stream.worker.batches
+            header[DROPPED_FRAMES] = stream.worker.dropped_frames
+            header[QUEUE_DEPTH] = stream.worker.queue_depth()
+            header[PROCESSED_FRAMES] = stream.worker.processed_frames
+        finally:
+            header[SEQ] += 1
+
+    def _copy_audio(self):
+        ring = self.stream.ring_buffer
+        end = ring.total_written
+        start = max(self._audio_total, end - ring.capacity)
+        data = ring.read(start, end - start)
+        if data is None:  # The callback lapped this copy; the next batch catches up
+            return
+        data = data.reshape(ring.channels, -1)
+        audio = self.arrays["audio"]
+        index = np.arange(start, end) % ring.capacity
+        audio[:, index] = data
+        self._audio_total = end
+        self.arrays["header"][AUDIO_TOTAL] = end
+        self.arrays["header"][AUDIO_SEQUENCE] = ring.sequence
+
+    def _copy_levels(self, db_levels):
+        # db_levels is (frames x channels)
+        levels = self.arrays["levels"]
+        window = levels.shape[1]
+        n = len(db_levels)
+        index = np.arange(self._level_count + max(0, n - window), self._level_count + n) % window
+        levels[:, index] = db_levels[-window:].T
+        self._level_count += n
+        self.arrays["header"][LEVEL_COUNT] = self._level_count
+
+    def _copy_spectra(self, spectra):
+        # spectra is (columns x channels x bins), the columns this batch appended
+        history = self.arrays["spectrogram"]
+        total = self.stream.spectrogram.total_columns
+        n = min(len(spectra), total - self._spectrogram_total, len(history))
+        if n > 0:
+            history[np.arange(total - n, total) % len(history)] = spectra[-n:]
+        self._spectrogram_total = total
+        self.arrays["header"][SPECTROGRAM_TOTAL] = total
+
+    def close(self):
+        if self.publish in self.stream.listeners:
+            self.stream.listeners.remove(self.publish)
+        self.arrays = {}
+        self.segment.close()
+        self.segment.unlink()
+        created_segments.pop(self.name, None)
+
+class SharedRing:
+    # Reader view of the raw audio ring; same read_latest() as ring_buffer.AudioRingBuffer
+    def __init__(self, arrays):
+        self._arrays = arrays
+        self.channels, self.capacity = arrays["audio"].shape
+
+    @property
+    def sequence(self):
+        return int(self._arrays["header"][AUDIO_SEQUENCE])
+
+    @property
+    def total_written(self):
+        return int(self._arrays["header"][AUDIO_TOTAL])
+
+    def read_latest(self, n, out=None, retries=3, channel=None):
+        header, audio = self._arrays["header"], self._arrays["audio"]
+
+        def read():
+            end = int(header[AUDIO_TOTAL])
+            count = min(n, end, self.capacity)
+            rows = audio if channel is None else audio[channel]
+            samples = rows[..., np.arange(end - count, end) % self.capacity]
+            if channel is None and self.channels == 1:
+                samples = samples[0]
+            return int(header[AUDIO_SEQUENCE]), samples
+
+        return seqlock_read(header, read)
+
+class SharedLevels:
+    # Reader view of one channel's recent levels and statistics; the parts of
+    # db_calculator.LevelStatistics the dashboard uses
+    def __init__(self, arrays, channel):
+        self._arrays = arrays
+        self.channel = channel
+        self.window = arrays["levels"].shape[1]
+
+    @property
+    def count(self):
+        return int(self._arrays["header"][LEVEL_COUNT])
+
+    def levels_since(self, count):
+        header, levels = self._arrays["header"], self._arrays["levels"]
+
+        def read():
+            total = int(header[LEVEL_COUNT])
+            n_new = min(total - count, self.window, total)
+            if n_new <= 0:
+                return total, []
+            return total, levels[self.channel, np.arange(total - n_new, total) % self.window].tolist()
+
+        return seqlock_read(header, read)
+
+    def snapshot(self):
+        row = seqlock_read(self._arrays["header"], lambda: self._arrays["stats"][self.channel].copy())
+        if np.isnan(row[0]):
+            return None
+        snapshot = dict(zip(STAT_FIELDS, row.tolist()))
+        for field in ("count", "session_count"):
+            snapshot[field] = int(snapshot[field])
+        return snapshot
+
+class SharedSpectrogram:
+    # Reader view of the spectrogram history; the parts of spectrogram.STFTSpectrogram the dashboard uses
+    def __init__(self, arrays, config):
+        self._arrays = arrays
+        self.sample_rate = config.sample_rate
+        self.fft_size = config.fft_size
+        self.hop_size = config.hop_size
+        self.history_columns, self.channels, self.n_bins = arrays["spectrogram"].shape
+        self.freq_axis = get_frequency_axis(self.fft_size, self.sample_rate)
+
+    @property
+    def total_columns(self):
+        return int(self._arrays["header"][SPECTROGRAM_TOTAL])
+
+    def oldest_column(self):
+        return max(0, self.total_columns - self.history_columns)
+
+    def columns_since(self, start, channel=None):
+        header, history = self._arrays["header"], self._arrays["spectrogram"]
+
+        def read():
+            end = int(header[SPECTROGRAM_TOTAL])
+            first = max(start, end - self.history_columns, 0)
+            rows = history if channel is None else history[:, channel]
+            if end <= first:
+                return end, end, rows[:0].copy()
+            return first, end, rows[np.arange(first, end) % self.history_columns]
+
+        return seqlock_read(header, read)
+
+    def column_times(self, start, end):
+        return (np.arange(start, end) * self.hop_size + self.fft_size / 2) / self.sample_rate
+
+class SharedLevelHistory:
+    # Reader view of the level history pyramid; queries run on the shared tiers directly
+    def __init__(self, arrays, meta):
+        self._arrays = arrays
+        tiers, _, channels, capacity = meta["history_shape"]
+        self._history = LevelHistory(meta["frame_seconds"], channels=channels, capacity=capacity,
+                                     factor=meta["history_factor"], tiers=tiers, buffer=arrays["history"])
+
+    @property
+    def totals(self):
+        return self._arrays["header"][HISTORY_TOTALS:HISTORY_TOTALS + self._history.tiers].tolist()
+
+    @property
+    def start_time(self):
+        return float(self._arrays["start_time"][0]) or None
+
+    def query(self, start=None, end=None, points=1000, channel=0):
+        def read():
+            self._history.totals = self.totals
+            self._history.start_time = self.start_time
+            return self._history.query(start, end, points, channel)
+
+        return seqlock_read(self._arrays["header"], read)
+
+    def flush(self):
+        pass
+
+class SharedWorkerStats:
+    # Reader view of the analysis worker counters
+    def __init__(self, arrays):
+        self._arrays = arrays
+
+    @property
+    def batches(self):
+        return int(self._arrays["header"][BATCHES])
+
+    @property
+    def dropped_frames(self):
+        return int(self._arrays["header"][DROPPED_FRAMES])
+
+    def queue_depth(self):
+        return int(self._arrays["header"][QUEUE_DEPTH])
+
+    def stats(self):
+        header = self._arrays["header"]
+        return {"queue_depth": int(header[QUEUE_DEPTH]), "dropped_frames": int(header[DROPPED_FRAMES]),
+                "processed_frames": int(header[PROCESSED_FRAMES]), "batches": int(header[BATCHES])}
+
+class SharedStreamReader:
+    # A published stream attached from another process, with the attributes of capture.CaptureStream
+    # that the dashboard reads. Recording and speech recognition stay in the capture process.
+    def __init__(self, name):
+        self.segment = attach_segment(name)
+        self.name = name
+        self._users = 1  # The dashboard's own reference, dropped by stop()
+        self._users_lock = threading.Lock()
+        self.meta = json.loads(bytes(self.segment.buf[:META_BYTES]).rstrip(b"\0").decode())
+        self._arrays, _ = map_arrays(self.segment.buf, self.meta)
+        self.key = self.meta["key"]
+        self.label = self.meta["label"]
+        self.stream_id = self.meta["stream_id"]
+        self.config = config_from_dict(self.meta["config"])
+        self.rate = self.config.sample_rate
+        self.channels = self.config.channels
+        self.frame_size = self.config.frame_size
+        self.ring_buffer = SharedRing(self._arrays)
+        self.level_stats = [SharedLevels(self._arrays, channel) for channel in range(self.channels)]
+        self.spectrogram = SharedSpectrogram(self._arrays, self.config)
+        self.level_history = SharedLevelHistory(self._arrays, self.meta)
+        self.worker = SharedWorkerStats(self._arrays)
+
+    def channel_label(self, channel):
+        return self.label if self.channels == 1 else f"{self.label} (ch {channel + 1})"
+
+    def wait_for_batch(self, seen, timeout):
+        # Poll the batch counter (there is no cross-process condition to wait on); returns the new count
+        deadline = time.monotonic() + timeout
+        while self.worker.batches == seen and time.monotonic() < deadline:
+            time.sleep(0.002)
+        return self.worker.batches
+
+    def record_snapshot(self, timestamp):
+        pass
+
+    def stop_recording(self):
+        pass
+
+    def acquire(self):
+        # Keep the mapping open while a request reads from it; False once it has been closed
+        with self._users_lock:
+            if self._users == 0:
+                return False
+            self._users += 1
+            return True
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+        self._close()
+
+    def stop(self):
+        # Detach; the mapping stays open until the last request reading it releases it.
+        # The segment itself belongs to the capture process.
+        self.release()
+
+    def _close(self):
+        self._arrays.clear()
+        self.ring_buffer = self.level_stats = self.spectrogram = self.level_history = self.worker = None
+        try:
+            self.segment.close()
+        except BufferError:  # A reader still holds a view; the mapping goes when it is collected
+            pass
+
+class SharedRegistry:
+    # The published streams as JSON ({"streams": [{"key", "label", "segment", "stream_id"}]}) in a
+    # segment of its own, guarded by the same seqlock scheme. The writer sets the closed flag when
+    # it exits or a new capture process replaces its registry, and the segment of a capture process
+    # that was killed is unlinked by its resource tracker; either way readers attach again by name.
+    def __init__(self, name=DEFAULT_REGISTRY, create=False):
+        if create:
+            try:  # A registry left behind by a capture process that did not exit cleanly
+                stale = attach_segment(name)
+                if stale.size >= REGISTRY_HEADER * 8:
+                    np.ndarray((REGISTRY_HEADER,), dtype=np.int64, buffer=stale.buf)[CLOSED] = 1
+                stale.close()
+                unlink_segment(name)
+            except FileNotFoundError:
+                pass
+            self.segment = create_segment(REGISTRY_BYTES, name)
+        else:
+            self.segment = attach_segment(name)
+        self.name = name
+        self.created = create
+        self._inode = segment_inode(name)
+        self._header = np.ndarray((REGISTRY_HEADER,), dtype=np.int64, buffer=self.segment.buf)
+        self._cache = (None, [])
+
+    @property
+    def stale(self):
+        # The name no longer refers to this registry
+        return bool(self._header[CLOSED]) or segment_inode(self.name) != self._inode
+
+    def publish(self, streams):
+        data = json.dumps({"streams": streams}).encode()
+        if len(data) > REGISTRY_BYTES - REGISTRY_HEADER * 8:
+            raise ValueError("too many streams for the registry")
+        self._header[SEQ] += 1
+        self.segment.buf[REGISTRY_HEADER * 8:REGISTRY_HEADER * 8 + len(data)] = data
+        self._header[LENGTH] = len(data)
+        self._header[SEQ] += 1
+
+    def streams(self):
+        # Parsed once per registry change
+        sequence = int(self._header[SEQ])
+        if self._cache[0] != sequence:
+            data = seqlock_read(self._header, lambda: bytes(
+                self.segment.buf[REGISTRY_HEADER * 8:REGISTRY_HEADER * 8 + int(self._header[LENGTH])]))
+            self._cache = (sequence, json.loads(data.decode())["streams"] if data else [])
+        return self._cache[1]
+
+    def find(self, key):
+        return next((entry for entry in self.streams() if str(entry["key"]) == str(key)), None)
+
+    def close(self):
+        # The name is only unlinked while it still refers to this registry: after a new capture
+        # process took it over, it belongs to that process. This process's resource tracker entry
+        # for the name is dropped too, unless a newer registry created here holds it now.
+        replaced = segment_inode(self.name) != self._inode
+        if self.created:
+            self._header[CLOSED] = 1
+        self._header = None
+        self.segment.close()
+        if not self.created:
+            return
+        if not replaced:
+            self.segment.unlink()
+            created_segments.pop(self.name, None)
+        elif created_segments.get(self.name) == self._inode:
+            resource_tracker.unregister(self.segment._name, "shared_memory")
+            created_segments.pop(self.name, None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture and analyse audio for dashboard processes "
+                                                 "(run them with CAPTURE_REGISTRY set to --registry).")
+    parser.add_argument("--device", action="append", default=[],
+                        help="device index or audio_sources spec (tone:440, noise, wav:take.wav); repeatable")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(LATENCY_PROFILES))
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY)
+    parser.add_argument("--sample-rate", type=int, default=44100, help="rate of synthetic sources")
+    parser.add_argument("--record", help="save one row per second per device into this directory")
+    args = parser.parse_args()
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+
+    registry = SharedRegistry(args.registry, create=True)
+    streams, publishers = [], []
+    try:
+        for value in args.device or ["noise"]:
+            stream = open_capture_stream(int(value) if value.isdigit() else value, args.profile,
+                                         source_sample_rate=args.sample_rate, recording_directory=args.record)
+            publishers.append(SharedStreamPublisher(stream))
+            stream.start()
+            streams.append(stream)
+        registry.publish([{"key": p.stream.key, "label": p.stream.label, "segment": p.name,
+                           "stream_id": p.stream.stream_id} for p in publishers])
+        print(f"Publishing {len(streams)} stream(s) in registry '{args.registry}'; Ctrl+C to stop")
+        while not stopping.wait(1):
+            if args.record:
+                timestamp = time.time()
+                for stream in streams:
+                    stream.record_snapshot(timestamp)
+    finally:
+        registry.publish([])
+        for stream in streams:
+            stream.stop()
+        for publisher in publishers:
+            publisher.close()
+        registry.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+
+class SnapshotCache:
+    # Values derived from live data (dashboard snapshots, encoded figures), shared by every caller.
+    # Each key carries a data version; a value is rebuilt only when the version changed AND the
+    # cached value is at least `min_interval` seconds old, so any number of clients polling the
+    # same stream cost one build per tick. Builds run under a lock per key, so concurrent requests
+    # for a stale key wait for the one build instead of repeating it, while other keys (e.g. other
+    # streams) are served and built meanwhile; the cache-wide lock only guards the dicts.
+    def __init__(self, min_interval=0.1, max_entries=256):
+        self.min_interval = min_interval
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (built_at, version, value), least recently used first
+        self._build_locks = {}  # key -> lock held while that key is built
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key, version, build, min_interval=None):
+        # `min_interval=0` serves only exact versions (e.g. a figure that must match client state)
+        min_interval = self.min_interval if min_interval is None else min_interval
+        entry = self._lookup(key, version, min_interval)
+        if entry is not None:
+            return entry[2]
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            # Another request may have built it while this one waited
+            entry = self._lookup(key, version, min_interval)
+            if entry is not None:
+                return entry[2]
+            now = time.monotonic()
+            value = build()
+            with self._lock:
+                self._entries[key] = (now, version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._build_locks.pop(self._entries.popitem(last=False)[0], None)
+                self.builds += 1
+            return value
+
+    def _lookup(self, key, version, min_interval):
+        # The cached entry if it can be served, counted as a hit; None if it needs building
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] == version or time.monotonic() - entry[0] < min_interval):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            return None
+
+    def discard(self, predicate):
+        # Drop every entry whose key matches, e.g. everything built for a stream that was closed
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+                self._build_locks.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._build_locks.clear()
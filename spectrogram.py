@@ -0,0 +1,137 @@
+import numpy as np
+
+_window_cache = {}
+_freq_cache = {}
+
+def get_window(name, size):
+    # Window functions are cached per (name, size) and shared between engines
+    key = (name, size)
+    if key not in _window_cache:
+        if name == "hann":
+            window = np.hanning(size)
+        elif name == "hamming":
+            window = np.hamming(size)
+        elif name == "blackman":
+            window = np.blackman(size)
+        elif name == "rect":
+            window = np.ones(size)
+        else:
+            raise ValueError(f"Unknown window: {name}")
+        window = window.astype(np.float32)
+        window.flags.writeable = False
+        _window_cache[key] = window
+    return _window_cache[key]
+
+def get_frequency_axis(fft_size, sample_rate):
+    key = (fft_size, sample_rate)
+    if key not in _freq_cache:
+        freqs = np.fft.rfftfreq(fft_size, d=1 / sample_rate)
+        freqs.flags.writeable = False
+        _freq_cache[key] = freqs
+    return _freq_cache[key]
+
+class STFTSpectrogram:
+    # Streaming short-time Fourier transform with a fixed-size history.
+    # Columns (one per hop) are appended to a preallocated (history_columns x channels x bins)
+    # float32 array used as a ring, so the memory footprint never grows while streaming.
+    # All channels are framed and transformed together in one FFT call.
+    def __init__(self, sample_rate=44100, fft_size=1024, hop_size=None, overlap=0.5,
+                 window="hann", history_seconds=4.0, floor_db=-120.0, channels=1):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.hop_size = hop_size if hop_size is not None else max(1, int(fft_size * (1 - overlap)))
+        self.window = get_window(window, fft_size)
+        self.freq_axis = get_frequency_axis(fft_size, sample_rate)
+        self.n_bins = fft_size // 2 + 1
+        self.channels = channels
+        self.floor_db = floor_db
+        # Scale so a full-scale sine reads close to 0 dB regardless of window and size
+        self.scale = 2.0 / float(self.window.sum())
+
+        self.history_columns = max(1, int(round(history_seconds * sample_rate / self.hop_size)))
+        self.history = np.full((self.history_columns, channels, self.n_bins), floor_db, dtype=np.float32)
+        self.total_columns = 0  # Absolute index of the next column to be written
+        self.write_end = 0  # End of the append in progress (== total_columns between appends)
+
+        # Samples carried over between calls so frames can straddle buffer boundaries
+        self._pending = np.zeros((channels, fft_size + 64 * self.hop_size), dtype=np.float32)
+        self._pending_len = 0
+
+    def reset(self):
+        # Forget carried-over samples, e.g. after a gap in the input
+        self._pending_len = 0
+
+    def column_duration(self):
+        return self.hop_size / self.sample_rate
+
+    def process(self, samples):
+        # Feed new samples, (n,) or (channels x n); returns the new columns
+        # (n_new x channels x bins, dB) as a fresh array
+        samples = np.asarray(samples, dtype=np.float32).reshape(self.channels, -1)
+        needed = self._pending_len + samples.shape[1]
+        if needed > self._pending.shape[1]:
+            grown = np.zeros((self.channels, needed), dtype=np.float32)
+            grown[:, :self._pending_len] = self._pending[:, :self._pending_len]
+            self._pending = grown
+        self._pending[:, self._pending_len:needed] = samples
+        self._pending_len = needed
+
+        if needed < self.fft_size:
+            return np.empty((0, self.channels, self.n_bins), dtype=np.float32)
+
+        n_frames = 1 + (needed - self.fft_size) // self.hop_size
+        frames = np.lib.stride_tricks.sliding_window_view(
+            self._pending[:, :needed], self.fft_size, axis=1)[:, ::self.hop_size][:, :n_frames]
+        spectrum = np.abs(np.fft.rfft(frames * self.window, axis=2))
+        spectrum *= self.scale
+        np.maximum(spectrum, 1e-12, out=spectrum)
+        columns = (20 * np.log10(spectrum)).astype(np.float32).transpose(1, 0, 2)
+        np.maximum(columns, self.floor_db, out=columns)
+
+        self._append_columns(columns)
+
+        # Keep the samples that the next frame still needs
+        consumed = n_frames * self.hop_size
+        remaining = needed - consumed
+        self._pending[:, :remaining] = self._pending[:, consumed:needed]
+        self._pending_len = remaining
+        return columns
+
+    def _append_columns(self, columns):
+        n = len(columns)
+        end = self.total_columns + n
+        # Announce the overwrite before the copy, so a reader overlapping it sees the lap
+        self.write_end = end
+        if n > self.history_columns:
+            columns = columns[-self.history_columns:]
+            n = self.history_columns
+        start = (end - n) % self.history_columns
+        first = min(n, self.history_columns - start)
+        self.history[start:start + first] = columns[:first]
+        if first < n:
+            self.history[:n - first] = columns[first:]
+        self.total_columns = end
+
+    def oldest_column(self):
+        return max(0, self.total_columns - self.history_columns)
+
+    def columns_since(self, start, channel=None):
+        # Returns (start, end, columns) for absolute column range [start, end) in time order,
+        # columns being (n x channels x bins), or (n x bins) for a single `channel`.
+        # If `start` already fell out of the history, the range is clipped to what remains.
+        end = self.total_columns
+        start = max(start, self.oldest_column())
+        n = end - start
+        history = self.history if channel is None else self.history[:, channel]
+        if n <= 0:
+            return end, end, np.empty((0,) + history.shape[1:], dtype=np.float32)
+        offset = start % self.history_columns
+        index = (offset + np.arange(n)) % self.history_columns
+        columns = history[index]  # Fancy indexing copies, so the writer can keep going
+        if self.write_end - start > self.history_columns:  # Lapped (or being lapped) during the copy
+            return self.columns_since(self.write_end - self.history_columns, channel)
+        return start, end, columns
+
+    def column_times(self, start, end):
+        # Time in seconds (from stream start) of the centre of each column
+        return (np.arange(start, end) * self.hop_size + self.fft_size / 2) / self.sample_rate
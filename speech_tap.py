@@ -0,0 +1,67 @@
+import numpy as np
+from ring_buffer import AudioRingBuffer
+
+class Resampler:
+    # Streaming sample-rate converter: windowed-sinc low-pass (anti-aliasing) followed by linear
+    # interpolation. Filter history and the fractional read position carry over between calls,
+    # so consecutive blocks resample exactly like one long signal.
+    def __init__(self, in_rate, out_rate, num_taps=63):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.step = in_rate / out_rate  # Input samples per output sample
+        cutoff = min(1.0, out_rate / in_rate) * 0.9  # Fraction of the input Nyquist frequency
+        n = np.arange(num_taps) - (num_taps - 1) / 2
+        taps = cutoff * np.sinc(cutoff * n) * np.hamming(num_taps)
+        self.taps = (taps / taps.sum()).astype(np.float32)
+        self._history = np.zeros(num_taps - 1, dtype=np.float32)
+        self._position = 0.0  # Next output position, in filtered-sample units of the current block
+        self._last = np.float32(0)  # Last filtered sample of the previous block (for interpolation)
+
+    def process(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) == 0:
+            return samples
+        if self.in_rate == self.out_rate:
+            return samples.copy()
+        filtered = np.convolve(np.concatenate([self._history, samples]), self.taps, mode="valid")
+        self._history = np.concatenate([self._history, samples])[-(len(self.taps) - 1):]
+
+        # Index -1 refers to the previous block's last sample
+        extended = np.concatenate([[self._last], filtered])
+        positions = np.arange(self._position, len(filtered) - 1 + 1e-9, self.step)
+        out = np.interp(positions + 1, np.arange(len(extended)), extended).astype(np.float32)
+        self._position = (positions[-1] + self.step - len(filtered)) if len(positions) else self._position - len(filtered)
+        self._last = filtered[-1]
+        return out
+
+class SpeechTap:
+    # Taps the shared capture stream for speech recognition: blocks from the analysis worker are
+    # resampled to the recognizer's rate and kept in their own ring, so recognition can lag behind
+    # capture (e.g. while a phrase is being recognized) without losing audio. An optional
+    # voice-activity detector sees the resampled stream and cuts utterances out of that ring.
+    # Multi-channel blocks are reduced to one signal first: `channel` picks one row, None
+    # averages all channels (a simple delay-free beam for closely spaced mic arrays).
+    def __init__(self, in_rate=44100, out_rate=16000, seconds=30, channel=None):
+        self.in_rate = in_rate
+        self.channel = channel
+        self.out_rate = out_rate
+        self.resampler = Resampler(in_rate, out_rate)
+        self.ring_buffer = AudioRingBuffer(capacity=out_rate * seconds)
+        self.vad = None
+
+    def set_detector(self, vad):
+        self.vad = vad
+
+    def feed(self, samples):
+        if samples.ndim > 1:
+            samples = samples.mean(axis=0) if self.channel is None else samples[self.channel]
+        resampled = self.resampler.process(samples)
+        self.ring_buffer.write(resampled)
+        if self.vad is not None:
+            self.vad.process(resampled, self.ring_buffer.total_written)
+
+    def reset(self):
+        # Called after a gap in the input so the filter does not smear across it
+        self.resampler = Resampler(self.in_rate, self.out_rate)
+        if self.vad is not None:
+            self.vad.reset()
@@ -0,0 +1,77 @@
+import os
+
+# Named latency profiles: frames per PortAudio buffer, analysis frame (one dB level each),
+# STFT size and hop, how many analysis frames the worker handles per pass and how often it polls.
+# Smaller buffers cut capture-to-display latency at the cost of more callbacks and passes per second.
+LATENCY_PROFILES = {
+    "low-latency": {"frames_per_buffer": 128, "frame_size": 256, "fft_size": 512, "hop_size": 256,
+                    "max_batch": 4, "poll_interval": 0.002},
+    "balanced": {"frames_per_buffer": 1024, "frame_size": 1024, "fft_size": 1024, "hop_size": 512,
+                 "max_batch": 16, "poll_interval": 0.01},
+    "high-throughput": {"frames_per_buffer": 4096, "frame_size": 4096, "fft_size": 4096, "hop_size": 2048,
+                        "max_batch": 8, "poll_interval": 0.02},
+}
+DEFAULT_PROFILE = "balanced"
+
+class StreamConfig:
+    # Everything that depends on the sample rate or buffer sizes, decided once per stream and
+    # passed to the capture, analysis, recorder and dashboard code instead of repeating constants.
+    # Durations are kept in seconds and converted here, so they hold for any device rate.
+    def __init__(self, sample_rate=44100, channels=1, profile=DEFAULT_PROFILE, ring_seconds=4.0,
+                 history_seconds=4.0, waveform_seconds=2.0, level_window_seconds=1.2):
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Unknown latency profile: {profile}")
+        self.sample_rate = int(sample_rate)
+        self.channels = channels
+        self.profile = profile
+        settings = LATENCY_PROFILES[profile]
+        self.frames_per_buffer = settings["frames_per_buffer"]
+        self.frame_size = settings["frame_size"]
+        self.fft_size = settings["fft_size"]
+        self.hop_size = settings["hop_size"]
+        self.max_batch = settings["max_batch"]
+        self.poll_interval = settings["poll_interval"]
+        self.ring_seconds = ring_seconds
+        self.history_seconds = history_seconds
+        self.waveform_seconds = waveform_seconds
+        self.level_window_seconds = level_window_seconds
+
+    def ring_capacity(self):
+        return int(self.ring_seconds * self.sample_rate)
+
+    def waveform_samples(self):
+        return int(self.waveform_seconds * self.sample_rate)
+
+    def level_window(self):
+        # Analysis frames covering level_window_seconds
+        return max(1, int(round(self.level_window_seconds * self.sample_rate / self.frame_size)))
+
+    def buffer_latency(self):
+        # Seconds of audio in one PortAudio buffer
+        return self.frames_per_buffer / self.sample_rate
+
+    def as_dict(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "profile": self.profile,
+            "frames_per_buffer": self.frames_per_buffer,
+            "frame_size": self.frame_size,
+            "fft_size": self.fft_size,
+            "hop_size": self.hop_size,
+            "ring_seconds": self.ring_seconds,
+            "history_seconds": self.history_seconds,
+            "waveform_seconds": self.waveform_seconds,
+            "level_window_seconds": self.level_window_seconds,
+        }
+
+def config_from_dict(values):
+    # The StreamConfig an as_dict() result describes (e.g. read back from a recording or shared segment)
+    return StreamConfig(values["sample_rate"], values["channels"], values["profile"],
+                        ring_seconds=values["ring_seconds"], history_seconds=values["history_seconds"],
+                        waveform_seconds=values["waveform_seconds"],
+                        level_window_seconds=values["level_window_seconds"])
+
+def profile_from_environment():
+    # LATENCY_PROFILE selects the default profile per deployment
+    return os.environ.get("LATENCY_PROFILE", DEFAULT_PROFILE)
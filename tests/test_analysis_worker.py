@@ -0,0 +1,64 @@
+import time
+import numpy as np
+from analysis_worker import AnalysisWorker
+from db_calculator import DBCalculator
+from ring_buffer import AudioRingBuffer
+
+def make_worker(capacity=8192, channels=1, frame_size=256, max_batch=4):
+    ring = AudioRingBuffer(capacity=capacity, channels=channels)
+    results = []
+    worker = AnalysisWorker(ring, DBCalculator(), lambda levels, spectra: results.append((levels, spectra)),
+                            frame_size=frame_size, max_batch=max_batch)
+    return ring, worker, results
+
+def test_batches_whole_frames_up_to_max_batch():
+    ring, worker, results = make_worker()
+    ring.write(np.full(256 * 6 + 100, 0.1, dtype=np.float32))
+    assert worker.queue_depth() == 6
+    assert worker.process_pending() == 4
+    assert worker.process_pending() == 2
+    assert worker.process_pending() == 0  # The partial frame waits for more samples
+    levels, spectra = results[0]
+    assert levels.shape == (4, 1)
+    assert spectra.shape == (4, 1, 128)
+    np.testing.assert_allclose(levels, 10 * np.log10(0.01) + 100, atol=1e-4)
+    assert worker.processed_frames == 6
+    assert worker.batches == 2
+
+def test_channels_are_analysed_in_one_pass():
+    ring, worker, results = make_worker(channels=2)
+    ring.write(np.stack([np.full(512, 0.1), np.full(512, 0.01)]).astype(np.float32))
+    worker.process_pending()
+    levels, _ = results[0]
+    assert levels.shape == (2, 2)
+    np.testing.assert_allclose(levels[:, 0] - levels[:, 1], 20.0, atol=1e-3)
+
+def test_lapped_reader_counts_dropped_frames_and_resets_taps():
+    ring, worker, results = make_worker(capacity=1024)
+    resets = []
+
+    class Tap:
+        def feed(self, samples):
+            pass
+
+        def reset(self):
+            resets.append(True)
+
+    worker.add_tap(Tap())
+    ring.write(np.zeros(256 * 10, dtype=np.float32))
+    assert worker.process_pending() == 4
+    assert worker.dropped_frames == 6
+    assert resets == [True]
+
+def test_thread_drains_the_ring():
+    ring, worker, results = make_worker()
+    worker.start()
+    try:
+        ring.write(np.zeros(256 * 3, dtype=np.float32))
+        deadline = time.monotonic() + 2
+        while worker.processed_frames < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+    assert worker.processed_frames == 3
+    assert worker.stats()["queue_depth"] == 0
@@ -0,0 +1,81 @@
+import time
+import wave
+import numpy as np
+import pytest
+from audio_sources import (CONTINUE, NoiseSource, RawFileSource, ToneSource, WavFileSource, create_source,
+                           pcm_to_float32, run_offline)
+from capture import analyze_offline
+
+def test_synthetic_sources_are_deterministic_and_bounded():
+    first = NoiseSource(seed=3, sample_rate=8000, duration=1.0)
+    whole = first.read(8000)
+    second = NoiseSource(seed=3, sample_rate=8000, duration=1.0)
+    pieces = np.concatenate([second.read(n) for n in (1, 999, 5000, 3000)])
+    np.testing.assert_array_equal(pieces, whole)  # Independent of read sizes
+    assert len(second.read(100)) == 0
+    assert create_source("noise:3", sample_rate=8000).total_frames is None
+
+def test_tone_source_channels_and_frequency():
+    source = ToneSource([1000.0], sample_rate=8000, channels=2, amplitude=1.0)
+    block = source.read(800)
+    assert block.shape == (800, 2) and block.dtype == np.float32
+    spectrum = np.abs(np.fft.rfft(block[:, 0]))
+    assert np.fft.rfftfreq(800, 1 / 8000)[spectrum.argmax()] == 1000
+
+def test_pcm_conversion():
+    np.testing.assert_allclose(pcm_to_float32(np.array([-32768, 0, 16384], "<i2").tobytes(), 2), [-1, 0, 0.5])
+    np.testing.assert_allclose(pcm_to_float32(bytes([0, 128, 192]), 1), [-1, 0, 0.5])
+    np.testing.assert_allclose(pcm_to_float32(bytes([0, 0, 0x80, 0xff, 0xff, 0x3f]), 3), [-1, 0.5], atol=1e-6)
+    with pytest.raises(ValueError):
+        pcm_to_float32(b"", 5)
+
+def test_file_sources(tmp_path):
+    path = str(tmp_path / "take.wav")
+    samples = (np.arange(-200, 200) * 64).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(samples.tobytes())
+    source = create_source(f"wav:{path}")
+    assert isinstance(source, WavFileSource) and (source.sample_rate, source.channels) == (8000, 2)
+    block = source.read(1000)
+    assert block.shape == (200, 2)
+    np.testing.assert_allclose(block.ravel(), samples / 32768)
+    source.close()
+
+    raw = tmp_path / "take.f32"
+    np.arange(10, dtype="<f4").tofile(raw)
+    source = RawFileSource(str(raw), channels=2, loop=True)
+    np.testing.assert_array_equal(source.read(3)[:, 1], [1, 3, 5])
+    np.testing.assert_array_equal(source.read(3)[:, 0], [6, 8])
+    np.testing.assert_array_equal(source.read(1)[:, 0], [0])  # Looped
+
+def test_offline_run_waits_for_the_consumer():
+    source = ToneSource(sample_rate=8000, duration=1.0)
+    pending = []
+
+    def callback(data, frames, time_info, status):
+        pending.append(len(data))
+        return data, CONTINUE
+
+    def ready():
+        if len(pending) >= 2:
+            pending.clear()  # The "consumer" catches up every other block
+        return len(pending) < 2
+
+    frames, seconds = run_offline(source, callback, frames_per_buffer=1000, ready=ready)
+    assert frames == 8000
+    with pytest.raises(ValueError):
+        run_offline(ToneSource(sample_rate=8000), callback)
+    frames, _ = run_offline(ToneSource(sample_rate=8000), callback, frames_per_buffer=1000, max_frames=3000)
+    assert frames == 3000
+
+def test_analyze_offline_drops_no_frames():
+    started = time.perf_counter()
+    stream = analyze_offline("noise", "balanced", seconds=5.0, source_sample_rate=44100)
+    assert time.perf_counter() - started < 5.0  # Faster than real time
+    assert stream.worker.dropped_frames == 0
+    assert stream.worker.processed_frames == -(-5 * 44100 // stream.frame_size)  # Last block padded
+    with pytest.raises(ValueError):
+        analyze_offline("noise", "balanced")
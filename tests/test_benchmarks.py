@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Smoke runs of the benchmark scripts with tiny settings, so they keep working as the pipeline changes
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+def run_benchmark(script, *args):
+    return subprocess.run([sys.executable, os.path.join(BENCHMARKS, script), *args], capture_output=True,
+                          text=True, check=True, timeout=300).stdout
+
+def recorder_leftovers():
+    return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith("bench-recorder-")}
+
+def test_pipeline_benchmark_saves_and_compares_results(tmp_path):
+    first, second = str(tmp_path / "first.json"), str(tmp_path / "second.json")
+    recorder_directories = recorder_leftovers()
+    settings = ["--buffer-sizes", "256", "--sample-rates", "16000", "--iterations", "3"]
+    run_benchmark("bench_pipeline.py", *settings, "--output", first)
+    with open(first) as f:
+        saved = json.load(f)
+    stages = {row["stage"] for row in saved["results"]}
+    assert {"callback_ring_write", "analysis_worker_batch", "stft_process", "recorder_record",
+            "shared_publish_batch", "level_history_query_8h"} <= stages
+    assert all(row["iterations"] > 0 and row["p50_us"] > 0 for row in saved["results"])
+    output = run_benchmark("bench_pipeline.py", *settings, "--output", second, "--compare", first)
+    assert "p50 vs base" in output
+    assert recorder_leftovers() == recorder_directories  # The recorder stage cleans up after itself
+
+def test_lifecycle_benchmark_leaves_nothing_open(tmp_path):
+    output = str(tmp_path / "lifecycle.json")
+    run_benchmark("bench_lifecycle.py", "--cold-starts", "1", "--switches", "6", "--dwell", "0.02",
+                  "--report-every", "3", "--output", output)
+    with open(output) as f:
+        saved = json.load(f)
+    rows = saved["switching"]
+    assert [row["switches"] for row in rows] == [0, 3, 6, "closed"]
+    assert all(row["context_users"] == 0 for row in rows)
+    assert rows[-1]["streams"] == 0 and rows[-1]["threads"] == rows[0]["threads"]
@@ -0,0 +1,60 @@
+import wave
+import numpy as np
+from capture import analyze_offline, open_capture_stream, stream_directory_name
+from metrics import PipelineMetrics
+
+def write_stereo_wav(path, seconds=2.0, rate=44100):
+    # Left: loud 1 kHz tone; right: the same tone 20 dB quieter
+    t = np.arange(int(rate * seconds)) / rate
+    left = 0.5 * np.sin(2 * np.pi * 1000 * t)
+    frames = np.stack([left, left / 10], axis=1)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((frames * 32767).astype("<i2").tobytes())
+
+def test_channels_are_analysed_separately(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    write_stereo_wav(path)
+    stream = analyze_offline(f"wav:{path}", "balanced")
+    assert stream.channels == 2 and stream.worker.dropped_frames == 0
+    left, right = (stats.snapshot() for stats in stream.level_stats)
+    assert abs(left["session_mean"] - right["session_mean"] - 20.0) < 0.5
+    assert stream.spectrum_frame.shape == (2, stream.spectrogram.n_bins)
+    peak_bins = stream.spectrum_frame.argmax(axis=1)
+    assert peak_bins[0] == peak_bins[1]
+    assert stream.channel_label(1) == f"wav:{path} (ch 2)"
+
+def test_callback_deinterleaves_blocks(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    write_stereo_wav(path, seconds=0.1)
+    stream = open_capture_stream(f"wav:{path}", "balanced")
+    interleaved = np.arange(8, dtype=np.float32)
+    stream._callback(interleaved.tobytes(), 4, None, 0)
+    np.testing.assert_array_equal(stream.ring_buffer.read(0, 4, channel=0), [0, 2, 4, 6])
+    np.testing.assert_array_equal(stream.ring_buffer.read(0, 4, channel=1), [1, 3, 5, 7])
+
+def test_gauges_are_labelled_per_stream_and_removed_on_stop(tmp_path):
+    path = str(tmp_path / 'take "1".wav')
+    write_stereo_wav(path, seconds=0.5)
+    metrics = PipelineMetrics()
+    stream = open_capture_stream(f"wav:{path}", "balanced", metrics=metrics, realtime=False)
+    stream.start()
+    label = f'wav:{tmp_path}/take \\"1\\".wav'
+    assert f'analysis_queue_depth{{stream="{label}"}}' in metrics.gauges
+    assert f'audio_pipeline_analysis_dropped_frames{{stream="{label}"}} 0' in metrics.prometheus_text()
+    stream.audio.stream.wait()
+    stream.stop()
+    assert metrics.gauges == {}
+    assert metrics.callbacks > 0
+
+def test_history_resumes_for_the_same_device_and_frame_length(tmp_path):
+    first = analyze_offline("tone:1000", "balanced", seconds=1.0, history_directory=str(tmp_path))
+    second = analyze_offline("tone:1000", "balanced", seconds=1.0, history_directory=str(tmp_path))
+    assert second.level_history.path == first.level_history.path
+    # Frames from the first run are still there, followed by the second run's
+    assert second.level_history.totals[0] >= 2 * first.worker.processed_frames
+    assert not np.isnan(second.level_history.query(0.0, 0.5)["mean"]).any()
+    assert stream_directory_name("wav:/a b/c.wav") == "wav_a_b_c.wav"
+    assert stream_directory_name("///") == "stream"
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+import pytest
+
+pytest.importorskip("dash")
+pytest.importorskip("plotly")
+import main
+
+@pytest.fixture
+def channel(monkeypatch):
+    # A synthetic device selected in the dashboard; deselected (and its stream stopped) afterwards
+    monkeypatch.setattr(main.snapshot_cache, "min_interval", 60.0)  # Keep snapshots still during a test
+    options, value = main.start_audio_stream(["tone:440"], "balanced", None)
+    stream = main.capture_streams["tone:440"]
+    deadline = time.monotonic() + 5
+    while stream.level_stats[0].snapshot() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield options, value
+    main.start_audio_stream([], "balanced", None)
+    main.snapshot_cache.clear()
+
+def test_new_clients_get_cached_plain_figures(channel):
+    options, value = channel
+    assert options == [{"label": "Synthetic: 440 Hz tone", "value": "tone:440#0"}]
+    waveform, db_levels, spectrogram, text, style, statistics, cursor = main.initialize_graphs(value, options)
+    assert all(isinstance(figure, dict) for figure in (waveform, db_levels, spectrogram))
+    assert set(spectrogram["data"][0]["z"]) == {"dtype", "bdata", "shape"}  # Typed array, not a JSON list
+    assert text.endswith(" dB") and style["color"] == "red"
+    assert cursor["stream"] == main.capture_streams["tone:440"].stream_id
+    assert cursor["column"] > 0 and cursor["db_count"] > 0
+    # A second client in the same tick is sent the very same figures
+    again = main.initialize_graphs(value, options)
+    assert again[0] is waveform and again[1] is db_levels and again[2] is spectrogram
+
+def test_many_clients_share_one_snapshot_per_tick(channel):
+    stream = main.capture_streams["tone:440"]
+    first = main.channel_snapshot(stream, 0)
+    builds = main.snapshot_cache.builds
+    assert all(main.channel_snapshot(stream, 0) is first for _ in range(50))
+    assert main.snapshot_cache.builds == builds
+    # Deselecting the device drops everything cached for its stream
+    main.start_audio_stream([], "balanced", None)
+    assert not any(key[1] == stream.stream_id for key in main.snapshot_cache._entries)
+
+def events(chunk):
+    return [line[len("event: "):] for line in chunk.splitlines() if line.startswith("event: ")]
+
+def test_live_pushes_only_what_changed_and_resets_on_restart(channel):
+    options, value = channel
+    cursor = dict(main.initialize_graphs(value, options)[6], segment=None, history=60)
+    stream = main.capture_streams["tone:440"]
+    first = main.live_chunks(cursor)
+    assert "history" in events(first)
+    seen = cursor["db_count"]
+    stream.wait_for_batch(stream.worker.batches, 2.0)
+    time.sleep(0.1)
+    later = main.live_chunks(cursor)
+    assert "history" not in events(later)  # At most every LIVE_HISTORY_INTERVAL
+    # Levels are a delta starting right after the ones the client already has
+    levels = json.loads(later.split("event: levels\ndata: ")[1].split("\n")[0])
+    assert levels["x0"] == seen and cursor["db_count"] == seen + len(levels["y"])
+    # A new latency profile restarts the stream: the page is told to start over
+    main.start_audio_stream(["tone:440"], "low-latency", value)
+    assert events(main.live_chunks(cursor)) == ["reset"] and cursor["stream"] is None
+
+def test_live_endpoint_streams_events(channel):
+    options, value = channel
+    cursor = main.initialize_graphs(value, options)[6]
+    client = main.server.test_client()
+    response = client.get("/live", query_string={"channel": value, "stream": cursor["stream"],
+                                                 "db_count": cursor["db_count"], "column": cursor["column"]})
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    first = next(response.response)
+    first = first.decode() if isinstance(first, bytes) else first
+    assert events(first) and "reset" not in events(first)
+    response.close()
+
+def test_transcription_is_built_when_first_started(monkeypatch):
+    monkeypatch.setenv("RECOGNITION_BACKEND", "stub")
+    monkeypatch.setattr(main, "transcript_store", None)
+    monkeypatch.setattr(main, "recognition_pool", None)
+    client = main.server.test_client()
+    assert client.get("/transcript").get_json() == []
+    main.start_transcription()
+    try:
+        store, pool = main.transcript_store, main.recognition_pool
+        assert pool.backend.name == "stub" and pool._running
+        main.start_transcription()  # Starting again reuses both
+        assert main.transcript_store is store and main.recognition_pool is pool
+        store.add("hello there", 10.0)
+        store.add("general kenobi", 12.0)
+        assert [s["text"] for s in client.get("/transcript?since=0").get_json()] == ["general kenobi"]
+        found = client.get("/transcript/search", query_string={"q": "hello", "end": "11"}).get_json()
+        assert [s["id"] for s in found] == [0]
+    finally:
+        main.shutdown()
+    assert not pool._running and not os.path.exists(store.spill_path)
+
+def test_metrics_endpoint(channel):
+    client = main.server.test_client()
+    snapshot = client.get("/metrics").get_json()
+    assert snapshot["callbacks"] > 0
+    assert snapshot["gauges"]['analysis_dropped_frames{stream="tone:440"}'] == 0
+    text = client.get("/metrics?format=prometheus")
+    assert text.mimetype == "text/plain"
+    assert 'audio_pipeline_analysis_queue_depth{stream="tone:440"}' in text.get_data(as_text=True)
+    assert "callbacks: " in main.format_metrics(snapshot)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from db_calculator import DBCalculator, LevelStatistics, a_weighting_db
+
+def tone(frequency, n=4800, sample_rate=48000, amplitude=0.5):
+    return amplitude * np.sin(2 * np.pi * frequency * np.arange(n) / sample_rate)
+
+def test_batch_matches_single_frames_and_clips():
+    calculator = DBCalculator(reference_level=-100, min_db=0, max_db=120)
+    frames = np.stack([tone(440), tone(440, amplitude=1e-3), np.zeros(4800), tone(440, amplitude=1e4)])
+    batch = calculator.calculate_db_batch(frames)
+    np.testing.assert_allclose(batch, [calculator.calculate_db(frame) for frame in frames])
+    assert batch[0] == pytest.approx(10 * np.log10(0.125) + 100)
+    assert batch[2] == 0
+    assert batch[3] == 120
+
+def test_a_weighting_leaves_1_khz_and_cuts_low_frequencies():
+    assert a_weighting_db([1000])[0] == pytest.approx(0, abs=0.01)
+    calculator = DBCalculator(sample_rate=48000)
+    weighted = DBCalculator(weighting="A", sample_rate=48000)
+    frames = np.stack([tone(1000), tone(100)])
+    difference = calculator.calculate_db_batch(frames) - weighted.calculate_db_batch(frames)
+    assert difference[0] == pytest.approx(0, abs=0.05)
+    assert difference[1] == pytest.approx(-a_weighting_db([100])[0], abs=0.05)
+
+def test_weighting_override_reuses_its_filter():
+    calculator = DBCalculator(sample_rate=48000)
+    frames = np.stack([tone(100)])
+    first = calculator.calculate_db_batch(frames, weighting="C")
+    second = calculator.calculate_db_batch(frames, weighting="C")
+    np.testing.assert_array_equal(first, second)
+    assert list(calculator._weighting_filters) == ["C"]
+    with pytest.raises(ValueError):
+        calculator.calculate_db_batch(frames, weighting="Z")
+
+def test_window_statistics_follow_the_sliding_window():
+    rng = np.random.default_rng(3)
+    levels = rng.uniform(30, 90, 500)
+    stats = LevelStatistics(window=50)
+    stats.update_batch(levels[:200])
+    for level in levels[200:]:
+        stats.update(level)
+    window = levels[-50:]
+    snapshot = stats.snapshot()
+    assert snapshot["current"] == levels[-1]
+    assert snapshot["mean"] == pytest.approx(window.mean())
+    assert snapshot["std"] == pytest.approx(window.std())
+    assert snapshot["peak"] == window.max()
+    assert snapshot["leq"] == pytest.approx(10 * np.log10(np.mean(10 ** (window / 10))))
+    assert snapshot["count"] == 50
+    assert snapshot["session_count"] == 500
+    assert snapshot["session_mean"] == pytest.approx(levels.mean())
+    assert snapshot["session_std"] == pytest.approx(levels.std())
+    assert snapshot["lmax"] == levels.max()
+
+def test_percentile_levels_from_the_histogram():
+    stats = LevelStatistics(window=100, resolution=0.1)
+    stats.update_batch(np.arange(40.0, 90.0, 0.5))  # 100 levels, 40.0 .. 89.5
+    snapshot = stats.snapshot()
+    assert snapshot["l10"] == pytest.approx(85.0, abs=0.6)  # Exceeded 10% of the time
+    assert snapshot["l90"] == pytest.approx(44.5, abs=0.6)  # Exceeded 90% of the time
+
+def test_levels_since_returns_only_new_window_levels():
+    stats = LevelStatistics(window=5)
+    assert stats.snapshot() is None
+    stats.update_batch([1, 2, 3])
+    count, levels = stats.levels_since(0)
+    assert (count, levels) == (3, [1, 2, 3])
+    stats.update_batch([4, 5, 6, 7])
+    assert stats.levels_since(count) == (7, [4, 5, 6, 7])
+    assert stats.levels_since(0) == (7, [3, 4, 5, 6, 7])  # Older levels left the window
+    assert stats.levels_since(7) == (7, [])
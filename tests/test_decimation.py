@@ -0,0 +1,36 @@
+import numpy as np
+from decimation import bucket_starts, envelope_trace, max_pool, min_max_envelope, pooled_axis
+
+def test_buckets_cover_the_range():
+    starts = bucket_starts(10, 3)
+    np.testing.assert_array_equal(starts, [0, 3, 6])
+    np.testing.assert_array_equal(bucket_starts(3, 10), [0, 1, 2])  # Never more buckets than samples
+
+def test_envelope_keeps_every_bucket_extreme():
+    signal = np.zeros(1000)
+    signal[123] = 5.0
+    signal[877] = -4.0
+    mins, maxs = min_max_envelope(signal, 10)
+    assert maxs.max() == 5.0 and maxs.argmax() == 1
+    assert mins.min() == -4.0 and mins.argmin() == 8
+    block = np.stack([signal, -signal])
+    mins, maxs = min_max_envelope(block, 10)
+    assert mins.shape == maxs.shape == (2, 10)
+    assert maxs[1].max() == 4.0
+
+def test_envelope_trace_respects_the_point_budget():
+    signal = np.sin(np.linspace(0, 50, 10000))
+    signal[4321] = 3.0
+    x, y = envelope_trace(signal, 200)
+    assert len(x) == len(y) == 200
+    assert y.max() == 3.0
+    assert np.all(np.diff(x) >= 0)
+    x, y = envelope_trace(signal[:100], 200)  # Short signals pass through
+    np.testing.assert_array_equal(y, signal[:100])
+
+def test_max_pool_and_its_axis():
+    spectrum = np.arange(20.0).reshape(2, 10)
+    pooled = max_pool(spectrum, 5, axis=1)
+    np.testing.assert_array_equal(pooled, [[1, 3, 5, 7, 9], [11, 13, 15, 17, 19]])
+    np.testing.assert_array_equal(pooled_axis(np.arange(10) * 100, 5), [0, 200, 400, 600, 800])
+    assert max_pool(spectrum, 20, axis=1) is spectrum
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import pytest
+from audio_input import AudioInput
+from audio_sources import ToneSource
+from device_manager import AudioContext, DeviceManager
+
+class FakePyAudio:
+    # Two devices, of which only the first records; open() fails for unknown devices
+    def __init__(self):
+        self.terminated = False
+        self.streams = []
+
+    def get_device_count(self):
+        return 2
+
+    def get_device_info_by_index(self, index):
+        return [{"name": "USB mic", "maxInputChannels": 2, "defaultSampleRate": 48000.0},
+                {"name": "Speakers", "maxInputChannels": 0, "defaultSampleRate": 44100.0}][index]
+
+    def terminate(self):
+        self.terminated = True
+
+    def open(self, input_device_index, **kwargs):
+        if input_device_index != 0:
+            raise OSError("Invalid device")
+        stream = FakeStream()
+        self.streams.append(stream)
+        return stream
+
+class FakeStream:
+    def __init__(self):
+        self.state = "open"
+
+    def start_stream(self):
+        self.state = "started"
+
+    def stop_stream(self):
+        self.state = "stopped"
+
+    def close(self):
+        self.state = "closed"
+
+def fake_context():
+    context = AudioContext()
+    context._pyaudio = FakePyAudio()
+    return context
+
+def test_devices_are_enumerated_once_until_refresh():
+    context = fake_context()
+    assert DeviceManager(context).list_devices() == [{"index": 0, "name": "USB mic", "channels": 2,
+                                                      "sample_rate": 48000}]
+    assert context.devices() is context.devices()
+    assert context.device(1) is None
+    pa = context._pyaudio
+    assert context.refresh()
+    assert pa.terminated and context._pyaudio is None
+
+def test_refresh_keeps_portaudio_while_a_stream_is_open():
+    context = fake_context()
+    pa = context.acquire()
+    assert context.users() == 1
+    assert not context.refresh()
+    assert not pa.terminated and context._devices is None
+    context.release()
+    context.release()
+    assert context.users() == 0
+    context.terminate()
+    assert pa.terminated
+
+def test_device_input_holds_the_context_only_while_open():
+    context = fake_context()
+    audio = AudioInput(0, context=context)
+    assert context.users() == 0
+    audio.start_stream(lambda *args: None)
+    stream = audio.stream
+    assert context.users() == 1 and stream.state == "started"
+    audio.stop_stream()
+    audio.stop_stream()
+    assert context.users() == 0 and stream.state == "closed"
+
+def test_failed_open_releases_the_context():
+    context = fake_context()
+    audio = AudioInput(1, context=context)
+    with pytest.raises(OSError):
+        audio.start_stream(lambda *args: None)
+    assert context.users() == 0 and audio.p is None
+
+def test_sources_need_no_portaudio():
+    context = AudioContext()
+    audio = AudioInput(source=ToneSource(sample_rate=8000, channels=2, duration=0.1), context=context)
+    assert (audio.rate, audio.channels) == (8000, 2)
+    audio.start_stream(lambda data, *args: (data, 0))
+    audio.stream.wait()
+    audio.stop_stream()
+    assert context._pyaudio is None and context.users() == 0
+
+def test_missing_portaudio_lists_no_devices(monkeypatch):
+    def unavailable(self):
+        raise ImportError("No module named 'pyaudio'")
+    monkeypatch.setattr(AudioContext, "_open", unavailable)
+    context = AudioContext()
+    assert context.devices() == [] and "pyaudio" in context.error
+
+def test_importing_the_pipeline_does_not_load_portaudio():
+    code = "import sys, capture, audio_input, device_manager; print('pyaudio' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,86 @@
+import json
+import time
+import numpy as np
+import pytest
+from level_history import LevelHistory, reduce_buckets
+
+def test_tiers_summarise_groups_of_entries():
+    history = LevelHistory(0.1, capacity=8, factor=2, tiers=3)
+    history.append(np.arange(16, dtype=np.float32))
+    assert history.totals == [16, 8, 4]
+    tier1 = history._read(1, 0, 8)[:, 0]
+    np.testing.assert_array_equal(tier1[0], np.arange(0, 16, 2))  # min
+    np.testing.assert_array_equal(tier1[1], np.arange(1, 16, 2))  # max
+    np.testing.assert_allclose(tier1[2], np.arange(0.5, 16, 2))  # mean
+    assert tier1[3, 0] == pytest.approx(10 * np.log10((1 + 10 ** 0.1) / 2))  # Leq in the energy domain
+    np.testing.assert_allclose(history._read(2, 0, 4)[2, 0], [1.5, 5.5, 9.5, 13.5])
+    assert history.bucket_seconds(2) == pytest.approx(0.4)
+
+def test_appends_in_any_block_size_give_the_same_pyramid():
+    levels = np.random.default_rng(0).uniform(30, 90, (2, 1000)).astype(np.float32)
+    whole = LevelHistory(0.01, channels=2, capacity=64, factor=4, tiers=4)
+    whole.append(levels)
+    blocks = LevelHistory(0.01, channels=2, capacity=64, factor=4, tiers=4)
+    for start in range(0, 1000, 37):
+        blocks.append(levels[:, start:start + 37])
+    assert blocks.totals == whole.totals
+    np.testing.assert_array_equal(blocks._data, whole._data)
+
+def test_query_reads_the_finest_tier_that_covers_the_range():
+    history = LevelHistory(1.0, capacity=16, factor=4, tiers=3)
+    history.append(np.arange(64, dtype=np.float32))
+    recent = history.query(-8, None, points=8)
+    assert recent["resolution"] == 1.0
+    np.testing.assert_array_equal(recent["time"], np.arange(56, 64))
+    np.testing.assert_array_equal(recent["mean"], np.arange(56, 64))
+    # The first 48 s have left tier 0 (16 entries), so the whole range comes from tier 1
+    everything = history.query(points=4)
+    assert everything["resolution"] == 16.0
+    np.testing.assert_array_equal(everything["min"], [0, 16, 32, 48])
+    np.testing.assert_array_equal(everything["max"], [15, 31, 47, 63])
+    assert len(history.query(100, 200)["time"]) == 0
+    assert history.range(0) == (48.0, 64.0) and history.duration() == 64.0
+
+def test_resumes_a_flushed_file_after_a_gap(tmp_path):
+    path = str(tmp_path / "levels")
+    history = LevelHistory(0.5, capacity=64, factor=4, tiers=3, path=path)
+    history.append(np.full(20, 60.0, dtype=np.float32))
+    history.start_time = time.time() - 20  # 20 s since frame 0, of which 10 s were recorded
+    history.flush()
+    resumed = LevelHistory(0.5, capacity=64, factor=4, tiers=3, path=path)
+    assert resumed.totals[0] == 40
+    resumed.append(np.full(4, 70.0, dtype=np.float32))
+    result = resumed.query(points=44)
+    np.testing.assert_array_equal(result["mean"][:20], 60.0)
+    assert np.isnan(result["mean"][20:40]).all()
+    np.testing.assert_array_equal(result["mean"][40:], 70.0)
+    # The manifest is consumed: a crash before the next flush starts over
+    assert not (tmp_path / "levels.json").exists()
+    assert LevelHistory(0.5, capacity=64, factor=4, tiers=3, path=path).totals == [0, 0, 0]
+
+def test_a_different_layout_starts_fresh(tmp_path):
+    path = str(tmp_path / "levels")
+    history = LevelHistory(0.5, capacity=64, factor=4, tiers=3, path=path)
+    history.append(np.ones(10, dtype=np.float32))
+    history.flush()
+    assert json.loads((tmp_path / "levels.json").read_text())["totals"] == [10, 2, 0]
+    assert LevelHistory(0.25, capacity=64, factor=4, tiers=3, path=path).totals == [0, 0, 0]
+
+def test_skipping_matches_appending_empty_frames():
+    skipped = LevelHistory(1.0, capacity=16, factor=4, tiers=3)
+    appended = LevelHistory(1.0, capacity=16, factor=4, tiers=3)
+    for history in (skipped, appended):
+        history.append(np.arange(5, dtype=np.float32))
+    skipped._skip(1000)
+    appended.append(np.full(1000, np.nan, dtype=np.float32))
+    assert skipped.totals == appended.totals
+    np.testing.assert_array_equal(skipped._data, appended._data)
+
+def test_empty_entries_are_left_out_of_buckets():
+    values = np.array([[1, np.nan, np.nan, np.nan], [3, np.nan, np.nan, np.nan],
+                       [2, np.nan, np.nan, np.nan], [2, np.nan, np.nan, np.nan]], dtype=np.float32)[:, np.newaxis]
+    reduced = reduce_buckets(values, np.array([0, 2]))[:, 0]
+    np.testing.assert_array_equal(reduced[:, 0], [1, 3, 2, 2])
+    assert np.isnan(reduced[:, 1]).all()
+    with pytest.raises(ValueError):
+        LevelHistory(1.0, capacity=4, factor=16)
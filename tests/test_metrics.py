@@ -0,0 +1,57 @@
+import pytest
+from metrics import LatencyHistogram, PipelineMetrics, label_value
+
+def within_bucket(value):
+    # Bucket edges are log-spaced at 10 per decade, so a percentile is within one bucket of the value
+    return pytest.approx(value, rel=0.3)
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.record(0.001)
+    for _ in range(10):
+        histogram.record(0.1)
+    assert histogram.percentile(50) == within_bucket(0.001)
+    assert histogram.percentile(99) == within_bucket(0.1)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100 and snapshot["max_ms"] == within_bucket(100)
+    assert LatencyHistogram().percentile(50) == 0.0
+
+def test_callback_jitter_status_and_lateness_per_stream():
+    metrics = PipelineMetrics()
+    # Two streams interleaved: each is perfectly periodic on its own
+    for i in range(10):
+        for stream, offset in (("a", 0.0), ("b", 0.003)):
+            started = 1.0 + i * 0.01 + offset
+            metrics.record_callback(started, started + 0.0005, 441, 44100, stream=stream,
+                                    time_info={"input_buffer_adc_time": started, "current_time": started + 0.002},
+                                    status=2 if i == 5 and stream == "a" else 0)
+    assert metrics.callbacks == 20
+    jitter = metrics.histogram("callback_jitter")
+    assert jitter.count == 18 and jitter.max < 1e-6
+    assert metrics.status_counts["input_overflow"] == 1
+    assert sum(metrics.status_counts.values()) == 1
+    assert metrics.histogram("callback_lateness").count == 20
+    metrics.reset_stream("a")
+    metrics.record_callback(100.0, 100.001, 441, 44100, stream="a")
+    assert jitter.count == 18  # No huge jitter sample after a restart
+
+def test_prometheus_text_and_gauges():
+    metrics = PipelineMetrics()
+    metrics.record_callback(0.0, 0.001, 441, 44100)
+    metrics.add_gauge("queue_depth", lambda: 3)
+    metrics.add_gauge("broken", lambda: 1 / 0)
+    metrics.add_gauge(f'dropped{{stream="{label_value(chr(92) + "dev" + chr(34))}"}}', lambda: 0)
+    assert metrics.snapshot()["gauges"]["broken"] is None
+    text = metrics.prometheus_text()
+    assert "audio_pipeline_callbacks_total 1\n" in text
+    assert "audio_pipeline_queue_depth 3\n" in text
+    assert 'audio_pipeline_dropped{stream="\\\\dev\\""} 0\n' in text
+    assert 'audio_pipeline_callback_duration_seconds_bucket{le="+Inf"} 1\n' in text
+    assert "broken" not in text
+    metrics.remove_gauge("queue_depth")
+    assert "queue_depth" not in metrics.prometheus_text()
+
+def test_label_value_escaping():
+    assert label_value('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+    assert label_value(3) == "3"
@@ -0,0 +1,111 @@
+import threading
+import time
+import numpy as np
+import pytest
+from recognition import (BackendUnavailableError, NoSpeechError, RecognitionBackend, RecognitionPool, StubBackend,
+                         create_backend)
+from vad import Utterance
+
+def utterance(index, seconds=0.1):
+    samples = np.zeros(int(16000 * seconds), np.float32)
+    return Utterance(index * 16000, index * 16000 + len(samples), 16000, 0.0, seconds, samples)
+
+class ScriptedBackend(RecognitionBackend):
+    # Sleeps and answers according to the utterance's start second; `release` holds "blocked" calls
+    def __init__(self, script):
+        self.script = script
+        self.release = threading.Event()
+
+    def recognize(self, utterance):
+        action = self.script.get(utterance.start_index // 16000, 0.0)
+        if action == "blocked":
+            self.release.wait(5)
+            return "late", None
+        if action == "no_speech":
+            raise NoSpeechError()
+        if action == "unavailable":
+            raise BackendUnavailableError("offline")
+        if action == "broken":
+            raise RuntimeError("boom")
+        time.sleep(action)
+        return f"text {utterance.start_index // 16000}", 0.9
+
+def collect(pool, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(pool.results) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pool.results
+
+def start_pool(backend, **kwargs):
+    results = []
+    pool = RecognitionPool(backend, results.append, **kwargs)
+    pool.results = results
+    pool.start()
+    return pool
+
+def test_results_arrive_in_submission_order():
+    # Early segments take longest, so workers finish them last
+    pool = start_pool(ScriptedBackend({0: 0.2, 1: 0.1, 2: 0.0, 3: "no_speech", 4: "unavailable", 5: "broken"}),
+                      workers=4)
+    for i in range(6):
+        assert pool.submit(utterance(i))
+    results = collect(pool, 6)
+    pool.stop()
+    assert [r.sequence for r in results] == list(range(6))
+    assert [r.text for r in results[:3]] == ["text 0", "text 1", "text 2"]
+    assert [r.error for r in results[3:]] == ["no_speech", "unavailable", "error: boom"]
+    assert results[0].latency >= 0.2
+
+def test_drop_policies():
+    backend = ScriptedBackend({0: "blocked"})
+    pool = start_pool(backend, workers=1, max_pending=2, policy="drop_oldest")
+    pool.submit(utterance(0))
+    time.sleep(0.1)  # Segment 0 is now running and blocks the only worker
+    for i in range(1, 5):
+        assert pool.submit(utterance(i))
+    backend.release.set()
+    results = collect(pool, 5)
+    pool.stop()
+    assert [r.error for r in results] == [None, "dropped", "dropped", None, None]
+    assert pool.dropped == 2
+
+    backend = ScriptedBackend({0: "blocked"})
+    pool = start_pool(backend, workers=1, max_pending=1, policy="drop_newest")
+    pool.submit(utterance(0))
+    time.sleep(0.1)
+    assert pool.submit(utterance(1))
+    assert not pool.submit(utterance(2))
+    backend.release.set()
+    assert [r.sequence for r in collect(pool, 2)] == [0, 1]
+    pool.stop()
+    with pytest.raises(ValueError):
+        RecognitionPool(backend, print, policy="lifo")
+
+def test_timed_out_workers_stay_busy_until_the_executor_is_replaced():
+    backend = ScriptedBackend({0: "blocked", 1: "blocked"})
+    pool = start_pool(backend, workers=2, timeout=0.2)
+    for i in range(3):
+        pool.submit(utterance(i))
+    results = collect(pool, 3)
+    assert [r.error for r in results] == ["timeout", "timeout", None]
+    assert pool.timeouts == 2 and pool.executors_replaced == 1
+    assert results[2].latency >= 0.2  # Segment 2 waited for fresh workers, not a stuck one
+    backend.release.set()
+    pool.stop()
+
+def test_stop_discards_queue_and_rejects_submissions():
+    pool = start_pool(StubBackend(), workers=1)
+    pool.stop()
+    assert not pool.submit(utterance(0))
+    assert pool.queue_depth() == 0
+
+def test_mock_server_round_trip():
+    backend = create_backend("mock")
+    try:
+        assert backend.recognize(utterance(0, seconds=0.5)) == ("[mock 0.50s]", 1.0)
+    finally:
+        backend.close()
+    assert backend.server is None
+    assert create_backend("stub:0.5").delay == 0.5
+    with pytest.raises(ValueError):
+        create_backend("carrier-pigeon")
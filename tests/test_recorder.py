@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from capture import open_capture_stream
+from recorder import SessionReader, SessionRecorder
+
+COLUMNS = {"timestamp": ("<f8", ()), "level": ("<f4", (2,)), "waveform": ("<f4", (8,))}
+
+def test_rows_round_trip_through_the_writer_thread(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), COLUMNS, flush_interval=0.01, metadata={"sample_rate": 8000})
+    recorder.start()
+    for i in range(20):
+        recorder.record(timestamp=float(i), level=[i, -i], waveform=np.full(8, i) if i % 2 else None)
+    recorder.record_text(3.5, "hello", id=0)
+    recorder.stop()
+    assert recorder.rows_written == 20
+    reader = SessionReader(str(tmp_path))
+    segment = reader.read_segment(0)
+    np.testing.assert_array_equal(segment["timestamp"], np.arange(20))
+    np.testing.assert_array_equal(segment["level"][:, 1], -np.arange(20))
+    np.testing.assert_array_equal(segment["waveform"][:4, 0], [0, 1, 0, 3])  # Missing values are zeros
+    assert reader.read_text(0) == [{"timestamp": 3.5, "text": "hello", "id": 0}]
+    assert reader.metadata(0) == {"sample_rate": 8000}
+
+def test_segments_rotate_and_new_sessions_continue_numbering(tmp_path):
+    row_bytes = 8 + 2 * 4 + 8 * 4
+    recorder = SessionRecorder(str(tmp_path), COLUMNS, max_segment_bytes=3 * row_bytes)
+    for batch in range(3):
+        for i in range(3):
+            recorder.record(timestamp=float(batch * 3 + i))
+        recorder.flush()
+    recorder.stop()
+    recorder = SessionRecorder(str(tmp_path), COLUMNS)
+    recorder.record(timestamp=99.0)
+    recorder.flush()
+    recorder.stop()
+    reader = SessionReader(str(tmp_path))
+    assert len(reader.segments) == 4
+    np.testing.assert_array_equal(reader.column("timestamp"), list(range(9)) + [99])
+
+def test_full_queue_drops_rows_instead_of_blocking(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), COLUMNS, max_pending=5)
+    for i in range(8):
+        recorder.record(timestamp=float(i))
+    assert recorder.dropped_rows == 3
+    recorder.flush()
+    recorder.stop()
+    assert recorder.rows_written == 5
+
+def test_flush_is_refused_while_the_writer_runs(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), COLUMNS, flush_interval=0.01)
+    recorder.start()
+    with pytest.raises(RuntimeError):
+        recorder.flush()
+    recorder.stop()
+
+def test_stopped_capture_stream_does_not_restart_its_recorder(tmp_path):
+    stream = open_capture_stream("noise", "balanced", recording_directory=str(tmp_path))
+    stream.start()
+    stream.record_snapshot(1.0)
+    assert stream.recorder.is_running()
+    stream.stop()
+    assert not stream.recorder.is_running()
+    stream.record_snapshot(2.0)  # E.g. the data-saving thread still held the stream
+    assert not stream.recorder.is_running()
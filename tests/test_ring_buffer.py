@@ -0,0 +1,61 @@
+import numpy as np
+from ring_buffer import AudioRingBuffer
+
+def test_read_back_across_the_wrap():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(6))
+    ring.write(np.arange(6, 11))
+    assert ring.total_written == 11
+    assert ring.sequence == 2
+    assert ring.oldest_index() == 3
+    np.testing.assert_array_equal(ring.read(4, 7), np.arange(4, 11))
+    assert len(ring.views(4, 11)) == 2
+
+def test_overwritten_and_unwritten_ranges_are_rejected():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(12))
+    assert ring.read(2, 4) is None  # Lapped
+    assert ring.read(10, 4) is None  # Not written yet
+    np.testing.assert_array_equal(ring.read(4, 8), np.arange(4, 12))
+
+def test_write_larger_than_capacity_keeps_the_newest_samples():
+    ring = AudioRingBuffer(capacity=4)
+    ring.write(np.arange(10))
+    assert ring.total_written == 10
+    np.testing.assert_array_equal(ring.read_latest(8)[1], np.arange(6, 10))
+
+def test_read_latest_before_the_ring_is_full():
+    ring = AudioRingBuffer(capacity=16)
+    ring.write(np.ones(3))
+    sequence, samples = ring.read_latest(10)
+    assert sequence == 1
+    assert len(samples) == 3
+
+def test_write_in_progress_invalidates_overlapping_reads():
+    # The writer announces write_end before copying; until total_written catches up, a read of
+    # the range being overwritten must fail rather than return a mix of old and new samples
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(8))
+    ring.write_end = ring.total_written + 4
+    assert not ring.is_intact(0)
+    assert ring.read(0, 4) is None
+    assert ring.is_intact(4)
+    np.testing.assert_array_equal(ring.read(4, 4), np.arange(4, 8))
+    ring.write_end = ring.total_written
+    np.testing.assert_array_equal(ring.read(0, 8), np.arange(8))
+
+def test_multichannel_blocks_and_channel_reads():
+    ring = AudioRingBuffer(capacity=6, channels=2)
+    block = np.array([[0, 1, 2, 3, 4], [10, 11, 12, 13, 14]], dtype=np.float32)
+    ring.write(block)
+    ring.write(block[:, :3] + 100)
+    np.testing.assert_array_equal(ring.read(2, 6), [[2, 3, 4, 100, 101, 102], [12, 13, 14, 110, 111, 112]])
+    np.testing.assert_array_equal(ring.read(5, 3, channel=1), [110, 111, 112])
+    assert ring.read_latest(2, channel=0)[1].shape == (2,)
+
+def test_strided_view_is_copied_into_place():
+    # The capture callback writes interleaved frames as a transposed (channels x frames) view
+    interleaved = np.arange(12, dtype=np.float32)
+    ring = AudioRingBuffer(capacity=16, channels=3)
+    ring.write(interleaved.reshape(-1, 3).T)
+    np.testing.assert_array_equal(ring.read(0, 4, channel=2), [2, 5, 8, 11])
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import uuid
+import numpy as np
+import pytest
+from capture import open_capture_stream
+from shared_stream import SEQ, SharedRegistry, SharedStreamPublisher, SharedStreamReader, seqlock_read
+
+@pytest.fixture
+def published():
+    # A finished offline stream mirrored into a segment, and a reader attached to it
+    stream = open_capture_stream("tone:1000", "balanced", source_duration=1.0, realtime=False)
+    publisher = SharedStreamPublisher(stream)
+    stream.start()
+    stream.audio.stream.wait()
+    stream.stop()
+    reader = SharedStreamReader(publisher.name)
+    yield stream, reader
+    reader.stop()
+    publisher.close()
+
+def test_reader_sees_what_the_capture_stream_holds(published):
+    stream, reader = published
+    assert (reader.key, reader.stream_id, reader.channels) == (stream.key, stream.stream_id, 1)
+    assert reader.config.as_dict() == stream.config.as_dict()
+    sequence, samples = reader.ring_buffer.read_latest(2048)
+    np.testing.assert_array_equal(samples, stream.ring_buffer.read_latest(2048)[1])
+    assert sequence == stream.ring_buffer.sequence
+    assert reader.level_stats[0].snapshot() == pytest.approx(stream.level_stats[0].snapshot())
+    count, levels = reader.level_stats[0].levels_since(0)
+    assert count == stream.worker.processed_frames and len(levels) == min(count, reader.level_stats[0].window)
+    first, end, columns = reader.spectrogram.columns_since(0, channel=0)
+    assert end == stream.spectrogram.total_columns
+    np.testing.assert_array_equal(columns, stream.spectrogram.columns_since(0, channel=0)[2])
+    remote, local = reader.level_history.query(points=50), stream.level_history.query(points=50)
+    np.testing.assert_array_equal(remote["mean"], local["mean"])
+    assert reader.worker.stats()["processed_frames"] == stream.worker.processed_frames
+
+def test_stop_keeps_the_mapping_until_the_last_reader_releases(published):
+    _, reader = published
+    assert reader.acquire()
+    reader.stop()
+    assert reader.ring_buffer.read_latest(16)[1].shape == (16,)  # A request still reading
+    reader.release()
+    assert reader.ring_buffer is None and not reader.acquire()
+    reader.stop = lambda: None  # Already detached; keep the fixture from releasing twice
+
+def test_seqlock_read_retries_and_gives_up_on_a_stuck_writer():
+    header = np.zeros(4, dtype=np.int64)
+    reads = []
+
+    def read():
+        reads.append(len(reads))
+        if len(reads) == 1:
+            header[SEQ] += 2  # A whole write happened during the first read
+        return len(reads)
+
+    assert seqlock_read(header, read) == 2
+    header[SEQ] = 3  # Writer died mid-write
+    with pytest.raises(TimeoutError):
+        seqlock_read(header, read, retries=20)
+
+def test_registry_lists_streams_and_goes_stale_when_replaced():
+    name = f"test-registry-{uuid.uuid4().hex[:8]}"
+    writer = SharedRegistry(name, create=True)
+    writer.publish([{"key": 3, "label": "USB mic", "segment": "seg", "stream_id": 1}])
+    reader = SharedRegistry(name)
+    assert reader.find("3")["label"] == "USB mic" and reader.find(4) is None
+    assert reader.streams() is reader.streams()  # Parsed once per change
+    writer.publish([])
+    assert reader.streams() == [] and not reader.stale
+    # A new capture process takes the name over
+    replacement = SharedRegistry(name, create=True)
+    assert reader.stale and writer.stale and not replacement.stale
+    # Closing the old writer leaves the replacement's segment alone
+    writer.close()
+    check = SharedRegistry(name)
+    assert check.streams() == []
+    check.close()
+    replacement.close()
+    reader.close()
+    with pytest.raises(FileNotFoundError):
+        SharedRegistry(name)
+
+def test_stream_ids_stay_unique_across_processes():
+    code = ("import capture; print(capture.open_capture_stream('noise', 'balanced', source_duration=1.0)"
+            ".stream_id)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ids = [open_capture_stream("noise", "balanced", source_duration=1.0).stream_id]
+    for _ in range(2):
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        ids.append(int(result.stdout))
+    assert ids[0] < ids[1] < ids[2]
@@ -0,0 +1,61 @@
+import threading
+import time
+from snapshot_cache import SnapshotCache
+
+def counting_build(value, calls, delay=0.0):
+    def build():
+        calls.append(value)
+        time.sleep(delay)
+        return value
+    return build
+
+def test_rebuilds_only_on_new_versions_after_min_interval():
+    cache = SnapshotCache(min_interval=0.05)
+    calls = []
+    assert cache.get("live", 1, counting_build("a", calls)) == "a"
+    assert cache.get("live", 1, counting_build("b", calls)) == "a"
+    assert cache.get("live", 2, counting_build("c", calls)) == "a"  # Newer data, but still fresh
+    assert cache.get("live", 2, counting_build("d", calls), min_interval=0) == "d"
+    time.sleep(0.06)
+    assert cache.get("live", 3, counting_build("e", calls)) == "e"
+    assert calls == ["a", "d", "e"]
+    assert (cache.builds, cache.hits) == (3, 2)
+
+def test_concurrent_requests_share_one_build_per_key():
+    cache = SnapshotCache()
+    calls = []
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("slow", 1, counting_build("x", calls, 0.2))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    # Another key is built and served while "slow" is still being built
+    started = time.monotonic()
+    assert cache.get("fast", 1, counting_build("y", calls)) == "y"
+    assert time.monotonic() - started < 0.1
+    for thread in threads:
+        thread.join()
+    assert results == ["x"] * 8 and calls.count("x") == 1
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SnapshotCache(max_entries=2)
+    calls = []
+    cache.get("a", 1, counting_build("a", calls))
+    cache.get("b", 1, counting_build("b", calls))
+    cache.get("a", 1, counting_build("a2", calls))
+    cache.get("c", 1, counting_build("c", calls))
+    assert cache.get("b", 1, counting_build("b2", calls)) == "b2"
+    assert cache.get("c", 1, counting_build("c2", calls)) == "c"
+    assert set(cache._build_locks) <= set(cache._entries)
+
+def test_discard_and_clear():
+    cache = SnapshotCache()
+    calls = []
+    for key in [("s1", "levels"), ("s1", "spectrum"), ("s2", "levels")]:
+        cache.get(key, 1, counting_build(key, calls))
+    cache.discard(lambda key: key[0] == "s1")
+    assert list(cache._entries) == [("s2", "levels")]
+    assert cache.get(("s1", "levels"), 1, counting_build("new", calls)) == "new"
+    cache.clear()
+    assert not cache._entries and not cache._build_locks
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from spectrogram import STFTSpectrogram, get_window
+
+def sine(frequency, n, sample_rate=8000, amplitude=1.0):
+    return (amplitude * np.sin(2 * np.pi * frequency * np.arange(n) / sample_rate)).astype(np.float32)
+
+def test_full_scale_sine_peaks_near_0_db_in_its_bin():
+    stft = STFTSpectrogram(sample_rate=8000, fft_size=256, history_seconds=1.0)
+    columns = stft.process(sine(1000, 2048))
+    assert columns.shape == (1 + (2048 - 256) // 128, 1, 129)
+    peak = columns[:, 0].argmax(axis=1)
+    assert np.all(stft.freq_axis[peak] == 1000)
+    assert np.all(np.abs(columns[:, 0].max(axis=1)) < 1.0)
+
+def test_streaming_in_small_blocks_matches_one_call():
+    samples = np.random.default_rng(1).standard_normal(5000).astype(np.float32)
+    whole = STFTSpectrogram(sample_rate=8000, fft_size=256, hop_size=100, history_seconds=1.0)
+    expected = whole.process(samples)
+    streamed = STFTSpectrogram(sample_rate=8000, fft_size=256, hop_size=100, history_seconds=1.0)
+    columns = np.concatenate([streamed.process(samples[i:i + 77]) for i in range(0, len(samples), 77)])
+    np.testing.assert_allclose(columns, expected, atol=1e-4)
+    assert streamed.total_columns == whole.total_columns
+
+def test_history_is_a_fixed_size_ring():
+    stft = STFTSpectrogram(sample_rate=8000, fft_size=256, history_seconds=0.1)  # 6 columns of 128 samples
+    assert stft.history_columns == 6
+    stft.process(sine(500, 256 + 127 * 20))
+    assert stft.total_columns == 20
+    assert stft.oldest_column() == 14
+    start, end, columns = stft.columns_since(0)
+    assert (start, end) == (14, 20)
+    assert columns.shape == (6, 1, 129)
+    start, end, columns = stft.columns_since(18, channel=0)
+    assert (start, end, columns.shape) == (18, 20, (2, 129))
+    assert stft.columns_since(20)[2].shape[0] == 0
+
+def test_columns_since_skips_a_lapping_append():
+    # write_end is announced before an append copies; a read overlapping it restarts past the lap
+    stft = STFTSpectrogram(sample_rate=8000, fft_size=256, history_seconds=0.1)
+    stft.process(sine(500, 256 + 128 * 9))
+    stft.write_end = stft.total_columns + 3
+    start, end, _ = stft.columns_since(0)
+    assert start == stft.write_end - stft.history_columns
+    assert end == stft.total_columns
+
+def test_channels_are_transformed_together():
+    stft = STFTSpectrogram(sample_rate=8000, fft_size=256, history_seconds=1.0, channels=2)
+    columns = stft.process(np.stack([sine(500, 1024), sine(2000, 1024, amplitude=0.1)]))
+    assert columns.shape[1:] == (2, 129)
+    assert stft.freq_axis[columns[0, 0].argmax()] == 500
+    assert stft.freq_axis[columns[0, 1].argmax()] == 2000
+    assert columns[0, 0].max() - columns[0, 1].max() == pytest.approx(20, abs=0.5)
+
+def test_windows_are_cached_and_read_only():
+    window = get_window("hann", 512)
+    assert get_window("hann", 512) is window
+    assert not window.flags.writeable
+    with pytest.raises(ValueError):
+        get_window("triangle", 512)
@@ -0,0 +1,57 @@
+import numpy as np
+from speech_tap import Resampler, SpeechTap
+
+def tone(frequency, rate, seconds):
+    return np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate).astype(np.float32)
+
+def test_resampler_blocks_match_one_long_signal():
+    signal = tone(440, 44100, 1.0)
+    whole = Resampler(44100, 16000).process(signal)
+    resampler = Resampler(44100, 16000)
+    blocks = np.concatenate([resampler.process(block) for block in np.array_split(signal, 37)])
+    np.testing.assert_allclose(blocks, whole, atol=1e-5)
+    assert abs(len(whole) - 16000) <= 1
+
+def test_resampler_keeps_speech_band_and_removes_aliases():
+    out = Resampler(44100, 16000).process(tone(1000, 44100, 1.0) + tone(12000, 44100, 1.0))[1000:]
+    spectrum = np.abs(np.fft.rfft(out * np.hanning(len(out))))
+    freqs = np.fft.rfftfreq(len(out), 1 / 16000)
+    assert abs(freqs[spectrum.argmax()] - 1000) < 5
+    # 12 kHz would fold to 4 kHz without the anti-aliasing filter
+    alias = spectrum[np.abs(freqs - 4000) < 20].max()
+    assert alias < 0.01 * spectrum.max()
+
+def test_same_rate_passes_samples_through():
+    samples = np.arange(5, dtype=np.float32)
+    out = Resampler(16000, 16000).process(samples)
+    np.testing.assert_array_equal(out, samples)
+    assert out is not samples
+
+def test_tap_reduces_channels_and_fills_its_ring():
+    block = np.stack([np.full(1600, 0.2, np.float32), np.full(1600, 0.6, np.float32)])
+    averaged = SpeechTap(in_rate=16000, out_rate=16000, seconds=1)
+    averaged.feed(block)
+    picked = SpeechTap(in_rate=16000, out_rate=16000, seconds=1, channel=1)
+    picked.feed(block)
+    assert averaged.ring_buffer.total_written == 1600
+    np.testing.assert_allclose(averaged.ring_buffer.read_latest(100)[1], 0.4)
+    np.testing.assert_allclose(picked.ring_buffer.read_latest(100)[1], 0.6)
+
+def test_tap_forwards_resampled_audio_to_the_detector():
+    calls = []
+
+    class Detector:
+        def process(self, samples, end_index):
+            calls.append((len(samples), end_index))
+
+        def reset(self):
+            calls.append("reset")
+
+    tap = SpeechTap(in_rate=48000, out_rate=16000)
+    tap.set_detector(Detector())
+    for _ in range(3):
+        tap.feed(np.zeros(4800, np.float32))
+    tap.reset()
+    assert calls[-1] == "reset"
+    assert calls[2][1] == tap.ring_buffer.total_written
+    assert sum(n for n, _ in calls[:3]) == tap.ring_buffer.total_written
@@ -0,0 +1,36 @@
+import pytest
+from capture import open_capture_stream
+from stream_config import LATENCY_PROFILES, StreamConfig, config_from_dict, profile_from_environment
+
+def test_durations_scale_with_the_sample_rate():
+    config = StreamConfig(48000, 2, "low-latency", ring_seconds=2.0, level_window_seconds=0.5)
+    assert config.ring_capacity() == 96000
+    assert config.waveform_samples() == 96000
+    assert config.level_window() == round(0.5 * 48000 / 256)
+    assert config.buffer_latency() == 128 / 48000
+    assert StreamConfig(8000, profile="high-throughput", level_window_seconds=0.01).level_window() == 1
+    with pytest.raises(ValueError):
+        StreamConfig(profile="fastest")
+
+def test_dict_round_trip():
+    config = StreamConfig(22050.0, 4, "high-throughput", history_seconds=10.0)
+    restored = config_from_dict(config.as_dict())
+    assert restored.as_dict() == config.as_dict()
+    assert restored.sample_rate == 22050 and isinstance(restored.sample_rate, int)
+
+def test_profile_from_environment(monkeypatch):
+    monkeypatch.delenv("LATENCY_PROFILE", raising=False)
+    assert profile_from_environment() == "balanced"
+    monkeypatch.setenv("LATENCY_PROFILE", "low-latency")
+    assert profile_from_environment() == "low-latency"
+
+@pytest.mark.parametrize("profile", list(LATENCY_PROFILES))
+def test_profile_reaches_every_stage(profile):
+    stream = open_capture_stream("tone:440", profile, source_sample_rate=32000, source_duration=1.0)
+    config = stream.config
+    assert config.sample_rate == stream.rate == 32000
+    assert stream.audio.frames_per_buffer == config.frames_per_buffer
+    assert stream.frame_size == stream.worker.frame_size == config.frame_size
+    assert stream.spectrogram.fft_size == config.fft_size and stream.spectrogram.hop_size == config.hop_size
+    assert stream.ring_buffer.capacity == config.ring_capacity()
+    assert stream.level_history.frame_seconds == config.frame_size / 32000
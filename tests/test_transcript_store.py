@@ -0,0 +1,43 @@
+import os
+from transcript_store import TranscriptStore
+
+def fill(store, count):
+    for i in range(count):
+        store.add(f"segment {i} {'alpha' if i % 2 else 'beta'} {'gamma' if i % 3 == 0 else ''}", start_time=float(i))
+
+def test_spilled_segments_read_back_like_recent_ones(tmp_path):
+    spill_path = str(tmp_path / "spill.jsonl")
+    store = TranscriptStore(max_in_memory=3, spill_path=spill_path)
+    fill(store, 10)
+    assert len(store) == 10 and store.last_id() == 9
+    assert len(store._recent) == 3
+    assert [s["id"] for s in store.get([0, 6, 7, 9])] == [0, 6, 7, 9]
+    assert store.get([4])[0]["text"].startswith("segment 4 beta")
+    assert [s["id"] for s in store.since(-1)] == list(range(10))
+    assert [s["id"] for s in store.since(5)] == [6, 7, 8, 9]
+    assert [s["id"] for s in store.since(-1, limit=2)] == [8, 9]
+    store.close()
+    assert os.path.exists(spill_path)  # Only a temporary spill file is deleted
+
+def test_search_by_keywords_and_time():
+    store = TranscriptStore(max_in_memory=4)
+    fill(store, 12)
+    assert [s["id"] for s in store.search("alpha gamma")] == [9, 3]
+    assert [s["id"] for s in store.search(["beta"], start_time=3.5, end_time=8.0)] == [8, 6, 4]
+    assert [s["id"] for s in store.search(start_time=2.0, end_time=5.0)] == [5, 4, 3, 2]
+    assert [s["id"] for s in store.search(limit=2)] == [11, 10]
+    assert store.search("ALPHA", limit=1)[0]["id"] == 11
+    assert store.search("delta") == []
+    spill_path = store.spill_path
+    store.close()
+    store.close()
+    assert not os.path.exists(spill_path)
+
+def test_out_of_order_start_times_are_clamped():
+    store = TranscriptStore()
+    store.add("first", 10.0, 11.0, confidence=0.5)
+    store.add("second", 9.0)
+    second = store.get([1])[0]
+    assert second["start_time"] == 10.0 and second["end_time"] == 9.0
+    assert [s["id"] for s in store.search(start_time=10.0, end_time=10.0)] == [1, 0]
+    store.close()
@@ -0,0 +1,57 @@
+import numpy as np
+from db_calculator import DBCalculator
+from ring_buffer import AudioRingBuffer
+from vad import VoiceActivityDetector
+
+RATE = 16000
+
+def voiced(seconds, amplitude=0.3):
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (amplitude * sum(np.sin(2 * np.pi * 250 * k * t) / k for k in range(2, 8))).astype(np.float32)
+
+def noise(seconds, amplitude=0.001, seed=0):
+    return (amplitude * np.random.default_rng(seed).standard_normal(int(RATE * seconds))).astype(np.float32)
+
+def run(signal, block=480, **kwargs):
+    ring = AudioRingBuffer(capacity=RATE * 30)
+    utterances = []
+    vad = VoiceActivityDetector(DBCalculator(reference_level=-100, min_db=0, max_db=120), ring,
+                                utterances.append, sample_rate=RATE, **kwargs)
+    for start in range(0, len(signal), block):
+        ring.write(signal[start:start + block])
+        vad.process(signal[start:start + block], ring.total_written)
+    return vad, utterances
+
+def test_segments_speech_between_silences():
+    signal = np.concatenate([noise(1.0), voiced(1.0) + noise(1.0, seed=1), noise(1.0, seed=2)])
+    vad, utterances = run(signal, block=333)  # Blocks not aligned with the 30 ms frames
+    assert vad.utterances == 1 and not vad.in_speech
+    utterance = utterances[0]
+    # Starts one pre-roll before the onset, ends one hangover after the offset
+    assert abs(utterance.start_index - int(0.7 * RATE)) <= vad.frame_size * 3
+    assert abs(utterance.end_index - int(2.3 * RATE)) <= vad.frame_size * 3
+    np.testing.assert_array_equal(utterance.samples, signal[utterance.start_index:utterance.end_index])
+    assert utterance.duration() == (utterance.end_index - utterance.start_index) / RATE
+    assert len(utterance.pcm16()) == 2 * len(utterance.samples)
+
+def test_loud_steady_noise_is_not_speech():
+    vad, utterances = run(np.concatenate([noise(1.0), noise(2.0, amplitude=0.3, seed=1)]))
+    assert utterances == [] and not vad.in_speech
+
+def test_short_bursts_are_ignored_and_long_speech_is_split():
+    vad, utterances = run(np.concatenate([noise(1.0), voiced(0.05), noise(1.0, seed=1)]), preroll_seconds=0.0,
+                          hangover_seconds=0.06)
+    assert utterances == []
+    vad, utterances = run(np.concatenate([noise(1.0), voiced(5.0)]), max_utterance_seconds=2.0)
+    assert len(utterances) == 2
+    assert all(u.end_index - u.start_index < 2.0 * RATE + vad.frame_size for u in utterances)
+
+def test_overwritten_audio_is_dropped():
+    ring = AudioRingBuffer(capacity=RATE // 2)
+    utterances = []
+    vad = VoiceActivityDetector(DBCalculator(), ring, utterances.append, sample_rate=RATE)
+    signal = np.concatenate([noise(1.0), voiced(1.0), noise(1.0, seed=1)])
+    for start in range(0, len(signal), 480):
+        ring.write(signal[start:start + 480])
+        vad.process(signal[start:start + 480], ring.total_written)
+    assert utterances == [] and vad.dropped_utterances == 1
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip("pygame")
+from recorder import SessionRecorder
+from visualizer import Visualizer, export_frames, session_frames, signal_frames
+
+def test_waveform_points_zig_zag_through_each_column():
+    visualizer = Visualizer(width=8, height=100, headless=True)
+    envelope = np.array([[10, 60, 40, 0], [30, 90, 50, 20]], dtype=float)
+    points = visualizer.waveform_points(envelope)
+    # Columns are spread over the width; spans always reach the centre line (y = 50)
+    np.testing.assert_array_equal(points[:, 0], [0, 0, 2, 2, 4, 4, 6, 6])
+    np.testing.assert_array_equal(points[:, 1], [10, 50, 90, 50, 40, 50, 50, 0])
+
+def test_render_draws_the_waveform_and_clears_only_what_it_drew():
+    visualizer = Visualizer(width=200, height=100, headless=True)
+    t = np.arange(4410) / 44100
+    first = visualizer.render(0.9 * np.sin(2 * np.pi * 50 * t).astype(np.float32), 60.0)
+    frame = visualizer.frame_array()
+    assert frame.shape == (100, 200, 3)
+    assert frame[:, 100:].any()  # Waveform reaches across the screen
+    assert frame[:, 100:].any(axis=(1, 2)).sum() > 80  # A loud signal spans most of the height
+    # A silent frame clears the old waveform and reports both the old and the new rects
+    second = visualizer.render(np.zeros(4410, np.float32), 0.0)
+    assert second[:2] == first
+    assert not visualizer.frame_array()[:40, 100:].any()
+
+def test_empty_audio_draws_a_flat_line():
+    visualizer = Visualizer(width=400, height=40, headless=True)
+    visualizer.render(np.zeros(0, np.float32), 0.0)
+    # The centre line (y = 20) and its shadow 5 px below, clear of the dB label on the left
+    rows = np.flatnonzero(visualizer.frame_array()[:, 200:].any(axis=(1, 2)))
+    assert 20 in rows and rows.min() >= 18 and rows.max() <= 27
+
+def test_colors_go_from_green_to_red_and_are_cached():
+    visualizer = Visualizer(width=10, height=10, headless=True)
+    red, green, _ = visualizer.get_color_for_db(0)
+    assert green == 255 and red < 128
+    red, green, _ = visualizer.get_color_for_db(120)
+    assert red == 255 and green < 128
+    assert visualizer.get_color_for_db(60.1) is visualizer.get_color_for_db(59.9)
+    assert visualizer.get_color_for_db(500) == visualizer.get_color_for_db(120)
+
+def test_signal_frames_cover_the_signal_at_the_frame_rate():
+    signal = np.concatenate([np.zeros(8000), 0.5 * np.ones(8000)]).astype(np.float32)
+    frames = list(signal_frames(signal, 8000, frame_rate=10, chunk=4))
+    assert len(frames) == 20 and all(len(samples) == 800 for samples, _ in frames)
+    levels = [level for _, level in frames]
+    assert levels[0] < levels[-1]
+    assert list(signal_frames(signal[:100], 8000, frame_rate=10)) == []
+
+def test_session_frames_pick_a_channel(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), {"db_level": ("<f4", (2,)), "waveform": ("<f4", (2, 4))})
+    recorder.record(db_level=[40.0, np.nan], waveform=[[0.1] * 4, [0.2] * 4])
+    recorder.flush()
+    recorder.stop()
+    [(samples, level)] = session_frames(str(tmp_path), channel=1)
+    np.testing.assert_allclose(samples, 0.2)
+    assert level == 0.0  # Missing levels show as 0 dB
+
+def test_export_renders_offscreen_to_images_and_raw_frames(tmp_path):
+    visualizer = Visualizer(width=32, height=24, max_fps=0, headless=True)
+    frames = signal_frames(np.sin(np.arange(4000) / 10).astype(np.float32), 8000, frame_rate=10)
+    with open(tmp_path / "frames.rgb", "wb") as raw_file:
+        report = export_frames(visualizer, frames, output_dir=str(tmp_path / "png"), raw_file=raw_file)
+    assert report["frames"] == 5 and (report["width"], report["height"]) == (32, 24)
+    assert sorted(p.name for p in (tmp_path / "png").iterdir()) == [f"frame_{i:06d}.png" for i in range(5)]
+    raw = np.fromfile(tmp_path / "frames.rgb", dtype=np.uint8).reshape(5, 24, 32, 3)
+    np.testing.assert_array_equal(raw[-1], visualizer.frame_array())
+    image = pygame.surfarray.array3d(pygame.image.load(str(tmp_path / "png" / "frame_000004.png"))).swapaxes(0, 1)
+    np.testing.assert_array_equal(image, raw[-1])
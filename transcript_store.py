@@ -0,0 +1,112 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+class TranscriptStore:
+    # Transcript segments with monotonically increasing ids. The newest `max_in_memory` segments
+    # stay in memory; older ones are spilled to a JSON-lines file and read back by byte offset.
+    # A word index and a start-time index cover every segment, so keyword and time-range
+    # searches never scan the transcript text.
+    def __init__(self, max_in_memory=500, spill_path=None):
+        self.max_in_memory = max_in_memory
+        self._owns_spill = spill_path is None  # A temporary spill file is deleted by close()
+        if spill_path is None:
+            handle, spill_path = tempfile.mkstemp(prefix="transcript-", suffix=".jsonl")
+            os.close(handle)
+        self.spill_path = spill_path
+        self._spill = open(spill_path, "a+b")
+        self._offsets = []  # Byte offset in the spill file, per spilled segment id (ids start at 0)
+
+        self._recent = deque()  # Segments kept in memory, oldest first
+        self._start_times = []  # start_time per segment id, non-decreasing
+        self._words = {}  # lower-case word -> list of segment ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._next_id
+
+    def last_id(self):
+        return self._next_id - 1
+
+    def add(self, text, start_time, end_time=None, confidence=None):
+        with self._lock:
+            segment = {
+                "id": self._next_id,
+                "text": text,
+                "start_time": start_time,
+                "end_time": end_time if end_time is not None else start_time,
+                "confidence": confidence,
+            }
+            self._next_id += 1
+            # Out-of-order timestamps are clamped so the time index stays sorted
+            if self._start_times and segment["start_time"] < self._start_times[-1]:
+                segment["start_time"] = self._start_times[-1]
+            self._start_times.append(segment["start_time"])
+            for word in set(WORD_PATTERN.findall(text.lower())):
+                self._words.setdefault(word, []).append(segment["id"])
+
+            self._recent.append(segment)
+            while len(self._recent) > self.max_in_memory:
+                self._spill_segment(self._recent.popleft())
+            return segment["id"]
+
+    def _spill_segment(self, segment):
+        self._spill.seek(0, os.SEEK_END)
+        self._offsets.append(self._spill.tell())
+        self._spill.write(json.dumps(segment).encode() + b"\n")
+        self._spill.flush()
+
+    def _get(self, segment_id):
+        # Caller holds the lock
+        first_recent = self._recent[0]["id"] if self._recent else self._next_id
+        if segment_id >= first_recent:
+            return self._recent[segment_id - first_recent]
+        self._spill.seek(self._offsets[segment_id])
+        return json.loads(self._spill.readline())
+
+    def get(self, segment_ids):
+        with self._lock:
+            return [self._get(i) for i in segment_ids]
+
+    def since(self, segment_id, limit=None):
+        # Segments with id > segment_id (pass -1 for everything), oldest first.
+        # With `limit`, only the newest `limit` of them are returned.
+        with self._lock:
+            start = max(segment_id + 1, 0)
+            if limit is not None:
+                start = max(start, self._next_id - limit)
+            return [self._get(i) for i in range(start, self._next_id)]
+
+    def search(self, keywords=None, start_time=None, end_time=None, limit=100):
+        # Segments containing all `keywords` and starting within [start_time, end_time]; newest first
+        with self._lock:
+            lo = 0 if start_time is None else bisect_left(self._start_times, start_time)
+            hi = self._next_id if end_time is None else bisect_right(self._start_times, end_time)
+            words = []
+            if keywords:
+                words = WORD_PATTERN.findall(keywords.lower()) if isinstance(keywords, str) else keywords
+            if words:
+                postings = sorted((self._words.get(word, []) for word in words), key=len)
+                candidates = [i for i in postings[0] if lo <= i < hi]
+                for other in postings[1:]:
+                    other_set = set(other)
+                    candidates = [i for i in candidates if i in other_set]
+                ids = candidates[::-1][:limit]
+            else:
+                ids = list(range(hi - 1, max(lo, hi - limit) - 1, -1))
+            return [self._get(i) for i in ids]
+
+    def close(self):
+        with self._lock:
+            if self._spill.closed:
+                return
+            self._spill.close()
+            if self._owns_spill:
+                os.remove(self.spill_path)
@@ -0,0 +1,134 @@
+import time
+import numpy as np
+
+class Utterance:
+    def __init__(self, start_index, end_index, sample_rate, start_time, end_time, samples):
+        self.start_index = start_index  # Absolute sample indices in the speech stream
+        self.end_index = end_index
+        self.sample_rate = sample_rate
+        self.start_time = start_time  # Wall-clock seconds (time.time())
+        self.end_time = end_time
+        self.samples = samples  # float32 mono at sample_rate, including pre-roll and hangover
+
+    def duration(self):
+        return (self.end_index - self.start_index) / self.sample_rate
+
+    def pcm16(self):
+        return (np.clip(self.samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+class VoiceActivityDetector:
+    # Streaming energy + spectral voice-activity detector.
+    # Per-frame levels come from DBCalculator.calculate_db_batch; spectral flatness and the share
+    # of energy in the speech band reject steady noise and hum. The noise floor adapts while no
+    # speech is present; separate start/stop margins plus a hangover give hysteresis, and
+    # segments start `preroll_seconds` early so word onsets are not clipped.
+    # Segment audio is read back from `ring_buffer`, which must be fed the same samples.
+    def __init__(self, db_calculator, ring_buffer, on_utterance, sample_rate=16000, frame_seconds=0.03,
+                 start_margin_db=9.0, stop_margin_db=5.0, start_frames=3, hangover_seconds=0.3,
+                 preroll_seconds=0.3, min_utterance_seconds=0.25, max_utterance_seconds=20.0,
+                 speech_band=(300.0, 3400.0), min_band_ratio=0.5, max_flatness=0.6):
+        self.db_calculator = db_calculator
+        self.ring_buffer = ring_buffer
+        self.on_utterance = on_utterance
+        self.sample_rate = sample_rate
+        self.frame_size = int(frame_seconds * sample_rate)
+        self.start_margin_db = start_margin_db
+        self.stop_margin_db = stop_margin_db
+        self.start_frames = start_frames
+        self.hangover_frames = max(1, int(round(hangover_seconds / frame_seconds)))
+        self.preroll_samples = int(preroll_seconds * sample_rate)
+        self.min_utterance_samples = int(min_utterance_seconds * sample_rate)
+        self.max_utterance_samples = int(max_utterance_seconds * sample_rate)
+        self.min_band_ratio = min_band_ratio
+        self.max_flatness = max_flatness
+
+        freqs = np.fft.rfftfreq(self.frame_size, d=1 / sample_rate)
+        self._band = (freqs >= speech_band[0]) & (freqs <= speech_band[1])
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+
+        self.noise_floor = None
+        self.in_speech = False
+        self.utterances = 0
+        self.dropped_utterances = 0  # Segments whose audio was overwritten before they ended
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._next_frame_index = 0  # Absolute sample index of the next frame to analyse
+        self._run = 0  # Consecutive speech-like frames (before start) or quiet frames (during speech)
+        self._start_index = 0
+
+    def reset(self):
+        # Drop partial state after a gap in the input; the noise floor is kept
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.in_speech = False
+        self._run = 0
+
+    def process(self, samples, end_index):
+        # `samples` are the newest samples of the stream, ending at absolute index `end_index`
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(self._pending) == 0:
+            self._next_frame_index = end_index - len(samples)
+        self._pending = np.concatenate([self._pending, samples])
+        n_frames = len(self._pending) // self.frame_size
+        if n_frames == 0:
+            return
+        frames = self._pending[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        self._pending = self._pending[n_frames * self.frame_size:].copy()
+
+        levels, speech_like = self.classify(frames)
+        for i in range(n_frames):
+            frame_start = self._next_frame_index + i * self.frame_size
+            self._update(levels[i], speech_like[i], frame_start)
+        self._next_frame_index += n_frames * self.frame_size
+
+    def classify(self, frames):
+        # Vectorized per-frame features: (levels in dB, spectrally speech-like flags)
+        levels = self.db_calculator.calculate_db_batch(frames)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        band_ratio = power[:, self._band].sum(axis=1) / power.sum(axis=1)
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return levels, (band_ratio >= self.min_band_ratio) & (flatness <= self.max_flatness)
+
+    def _update(self, level, speech_like, frame_start):
+        if self.noise_floor is None:
+            self.noise_floor = level
+
+        if not self.in_speech:
+            # Track the floor quickly downwards and slowly upwards, only outside speech
+            rate = 0.2 if level < self.noise_floor else 0.01
+            self.noise_floor += rate * (level - self.noise_floor)
+            if speech_like and level >= self.noise_floor + self.start_margin_db:
+                self._run += 1
+                if self._run >= self.start_frames:
+                    self.in_speech = True
+                    onset = frame_start - (self.start_frames - 1) * self.frame_size
+                    self._start_index = max(0, onset - self.preroll_samples)
+                    self._run = 0
+            else:
+                self._run = 0
+            return
+
+        frame_end = frame_start + self.frame_size
+        if level < self.noise_floor + self.stop_margin_db:
+            self._run += 1
+            if self._run >= self.hangover_frames:
+                self._finish(frame_end)
+        else:
+            self._run = 0
+        if self.in_speech and frame_end - self._start_index >= self.max_utterance_samples:
+            self._finish(frame_end)
+
+    def _finish(self, end_index):
+        self.in_speech = False
+        self._run = 0
+        start_index = self._start_index
+        if end_index - start_index < self.min_utterance_samples:
+            return
+        samples = self.ring_buffer.read(start_index, end_index - start_index)
+        if samples is None:
+            self.dropped_utterances += 1
+            return
+        now = time.time()
+        lag = (self.ring_buffer.total_written - end_index) / self.sample_rate
+        end_time = now - lag
+        start_time = end_time - (end_index - start_index) / self.sample_rate
+        self.utterances += 1
+        self.on_utterance(Utterance(start_index, end_index, self.sample_rate, start_time, end_time, samples))
@@ -1,62 +1,234 @@
+import argparse
+import os
+import time
 import pygame
 import numpy as np
 import colorsys
+from decimation import min_max_envelope
+from db_calculator import DBCalculator
+from recorder import SessionReader
+from audio_sources import create_source, WavFileSource, RawFileSource
 
 class Visualizer:
-    def __init__(self, width=800, height=600):
-        pygame.init()
+    # Renders one frame per update() call.
+    # The waveform is reduced to one (min, max) pair per screen column with NumPy and drawn as a
+    # single zig-zag polyline per layer, instead of one draw call per column. Only the regions
+    # drawn in the previous and current frame are cleared and pushed to the display, and
+    # `max_fps` caps the frame rate (0 means unlimited).
+    # With headless=True frames are rendered into an offscreen Surface and no display (or X server)
+    # is needed; read them back with frame_array() or frame_bytes().
+    def __init__(self, width=800, height=600, max_fps=60, headless=False):
         self.width = width
         self.height = height
-        self.screen = pygame.display.set_mode((width, height))
-        pygame.display.set_caption("Audio Waveform Visualizer")
+        self.headless = headless
+        if headless:
+            pygame.font.init()
+            self.screen = pygame.Surface((width, height))
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((width, height))
+            pygame.display.set_caption("Audio Waveform Visualizer")
         self.font = pygame.font.Font(None, 36)
+        self.background = (0, 0, 0)
+        self.shadow_color = (50, 50, 50)  # A dark shadow color
+        self.max_fps = max_fps
+        self.clock = pygame.time.Clock()
+
+        self._glyphs = {}  # Character -> rendered surface, for the dB label
+        self._colors = {}  # Quantized dB -> waveform color
+        self._dirty = []  # Rects drawn in the previous frame, cleared before the next one
+        self._columns = {}  # Envelope length -> x coordinates of the polyline points
+
+        self.screen.fill(self.background)
+        if not headless:
+            pygame.display.flip()
 
     def update(self, audio_data, db_level):
-        self.screen.fill((0, 0, 0))  # Clear the screen with black
+        # Render one frame and show it, at most max_fps times per second
+        rects = self.render(audio_data, db_level)
+        if not self.headless:
+            pygame.display.update(rects)
+        self.clock.tick(self.max_fps)
 
-        # Normalize audio data for visualization
-        audio_data = np.interp(audio_data, [-1, 1], [0, self.height])  # Map the audio data to screen height
+    def render(self, audio_data, db_level):
+        # Draw one frame into self.screen; returns the rects that changed since the previous frame
+        # Clear only what the previous frame drew
+        for rect in self._dirty:
+            self.screen.fill(self.background, rect)
+
+        # Reduce to one (min, max) pair per screen column, then map only those to screen height;
+        # no samples (e.g. a source that has not produced any yet) draw a flat line
+        if len(audio_data) == 0:
+            audio_data = np.zeros(self.width, dtype=np.float32)
+        mins, maxs = min_max_envelope(audio_data, self.width)
+        scale = self.height / 2
+        envelope = (np.stack([mins, maxs]) + 1.0) * scale
 
         # Generate dynamic color based on dB level
         color = self.get_color_for_db(db_level)
 
-        # Draw the waveform with the dynamic color
-        self.draw_waveform(audio_data, color)
+        # Draw the waveform with the dynamic color, then the dB level as text
+        rects = [self.draw_waveform(envelope, color), self.draw_text(f"{db_level:.2f} dB", (10, 10))]
+
+        changed = self._dirty + rects
+        self._dirty = rects
+        return changed
 
-        # Display dB level as text
-        text = self.font.render(f"{db_level:.2f} dB", True, (255, 255, 255))
-        self.screen.blit(text, (10, 10))
+    def frame_array(self):
+        # The current frame as a (height, width, 3) uint8 RGB array (a copy)
+        return pygame.surfarray.array3d(self.screen).swapaxes(0, 1)
 
-        pygame.display.flip()
+    def frame_bytes(self):
+        # The current frame as packed RGB24 bytes, e.g. for `ffmpeg -f rawvideo -pix_fmt rgb24`
+        return pygame.image.tobytes(self.screen, "RGB")
+
+    def fps(self):
+        # Frame rate averaged over the last few update() calls
+        return self.clock.get_fps()
 
     def get_color_for_db(self, db):
-        # Create a hue-shifted color based on dB level (normalized to range [0, 1])
-        normalized_db = max(0, min(db, 120)) / 120.0  # Assuming max dB is 120
-        hue = (1.0 - normalized_db) * 0.33  # From red (high dB) to green (low dB)
-        rgb = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
-        return tuple(int(255 * x) for x in rgb)  # Convert to 255 scale
+        # Create a hue-shifted color based on dB level (normalized to range [0, 1]); cached per 0.5 dB
+        key = int(round(max(0, min(db, 120)) * 2))
+        if key not in self._colors:
+            normalized_db = key / 240.0  # Assuming max dB is 120
+            hue = (1.0 - normalized_db) * 0.33  # From red (high dB) to green (low dB)
+            rgb = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
+            self._colors[key] = tuple(int(255 * x) for x in rgb)  # Convert to 255 scale
+        return self._colors[key]
 
-    def draw_waveform(self, audio_data, color):
+    def waveform_points(self, envelope):
+        # Zig-zag through every column's span: (x0, low0), (x0, high0), (x1, high1), (x1, low1), ...
+        # so one polyline covers each column from the centre line to its extremes
         center_y = self.height // 2
+        y_low = np.minimum(envelope[0], center_y).astype(int)
+        y_high = np.maximum(envelope[1], center_y).astype(int)
+        n = len(y_low)
+        if n not in self._columns:
+            # Spread the columns across the full width, even for buffers shorter than the screen
+            self._columns[n] = np.repeat((np.arange(n) * self.width) // n, 2)
+        flip = (np.arange(n) % 2).astype(bool)
+        points = np.empty((2 * n, 2), dtype=int)
+        points[:, 0] = self._columns[n]
+        points[0::2, 1] = np.where(flip, y_high, y_low)
+        points[1::2, 1] = np.where(flip, y_low, y_high)
+        return points
 
-        # Calculate step to skip audio data to fit the screen width
-        step_size = max(1, len(audio_data) // self.width)
-
-        # Create a glow/shadow effect for the waveform
-        shadow_color = (50, 50, 50)  # A dark shadow color
+    def draw_waveform(self, envelope, color):
+        # `envelope` is a (2, columns) array of per-column min/max screen positions; returns the drawn rect
+        points = self.waveform_points(envelope)
+        if len(points) < 2:
+            return pygame.Rect(0, 0, 0, 0)
 
-        # Draw the shadow first (slightly offset)
-        for x in range(0, self.width):
-            y_value = int(audio_data[x * step_size])
-            pygame.draw.line(self.screen, shadow_color, (x, center_y + 5), (x, y_value + 5), 3)
+        # Create a glow/shadow effect: the shadow first, slightly offset, then the waveform itself
+        shadow = points + (0, 5)
+        rect = pygame.draw.lines(self.screen, self.shadow_color, False, shadow.tolist(), 3)
+        return rect.union(pygame.draw.lines(self.screen, color, False, points.tolist(), 2))
 
-        # Draw the waveform itself with dynamic color
-        for x in range(0, self.width):
-            y_value = int(audio_data[x * step_size])
-            pygame.draw.line(self.screen, color, (x, center_y), (x, y_value), 2)
+    def draw_text(self, text, position):
+        # Blit cached per-character surfaces; a label only ever needs digits, '.', '-', ' ' and "dB"
+        x, y = position
+        rect = pygame.Rect(x, y, 0, 0)
+        for char in text:
+            glyph = self._glyphs.get(char)
+            if glyph is None:
+                glyph = self._glyphs[char] = self.font.render(char, True, (255, 255, 255))
+            rect.union_ip(self.screen.blit(glyph, (x, y)))
+            x += glyph.get_width()
+        return rect
 
     def check_events(self):
+        if self.headless:
+            return True
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
         return True
+
+def signal_frames(signal, sample_rate, frame_rate=30, window=None, db_calculator=None, chunk=256):
+    # (samples, dB level) per video frame of a 1-D signal: each frame shows the `window` samples
+    # ending at its timestamp (default: the audio since the previous frame)
+    db_calculator = db_calculator or DBCalculator(sample_rate=sample_rate)
+    window = window or int(sample_rate // frame_rate)
+    if len(signal) < window:
+        return
+    n_frames = int((len(signal) - window) * frame_rate // sample_rate) + 1
+    starts = (np.arange(n_frames) * sample_rate // frame_rate).astype(int)
+    windows = np.lib.stride_tricks.sliding_window_view(signal, window)
+    for i in range(0, n_frames, chunk):
+        # Levels for a chunk of frames in one vectorized pass
+        frames = windows[starts[i:i + chunk]]
+        for samples, level in zip(frames, db_calculator.calculate_db_batch(frames)):
+            yield samples, level
+
+def session_frames(directory, channel=0):
+    # (samples, dB level) per row of a recorded session (one row per saved second)
+    reader = SessionReader(directory)
+    for index in range(len(reader.segments)):
+        segment = reader.read_segment(index)
+        waveforms, levels = segment["waveform"], segment["db_level"]
+        for waveform, level in zip(waveforms, levels):
+            if waveform.ndim > 1:  # Multi-channel rows are (channels x samples)
+                waveform, level = waveform[channel], level[channel]
+            yield np.asarray(waveform), float(level) if np.isfinite(level) else 0.0
+
+def export_frames(visualizer, frames, output_dir=None, raw_file=None, image_format="png"):
+    # Render every (samples, dB level) as fast as possible, saving numbered images to `output_dir`
+    # and/or appending RGB24 frames to the binary `raw_file`; returns the achieved throughput
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    started = time.perf_counter()
+    for samples, level in frames:
+        visualizer.render(samples, level)
+        if output_dir:
+            pygame.image.save(visualizer.screen, os.path.join(output_dir, f"frame_{count:06d}.{image_format}"))
+        if raw_file is not None:
+            raw_file.write(visualizer.frame_bytes())
+        count += 1
+    seconds = time.perf_counter() - started
+    return {"frames": count, "seconds": seconds, "fps": count / seconds if seconds > 0 else 0.0,
+            "width": visualizer.width, "height": visualizer.height}
+
+def main():
+    parser = argparse.ArgumentParser(description="Render audio to waveform frames without a display.")
+    parser.add_argument("--source", help="audio_sources spec, e.g. wav:take.wav, raw:take.f32, tone:440")
+    parser.add_argument("--session", help="recorded session directory, e.g. recordings/noise")
+    parser.add_argument("--channel", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=None, help="audio to render (required for synthetic sources)")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--frame-rate", type=float, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--output-dir", help="write numbered PNG images here")
+    parser.add_argument("--raw", help="append raw RGB24 frames to this file")
+    args = parser.parse_args()
+
+    if args.session:
+        frames = session_frames(args.session, args.channel)
+    elif args.source:
+        source = create_source(args.source, sample_rate=args.sample_rate)
+        if args.seconds is not None:
+            signal = source.read(int(args.seconds * source.sample_rate))
+        elif isinstance(source, (WavFileSource, RawFileSource)):
+            blocks = [source.read(source.sample_rate)]
+            while len(blocks[-1]):
+                blocks.append(source.read(source.sample_rate))
+            signal = np.concatenate(blocks)
+        else:
+            parser.error("--seconds is required for synthetic sources")
+        frames = signal_frames(signal[:, min(args.channel, source.channels - 1)], source.sample_rate, args.frame_rate)
+    else:
+        parser.error("pass --source or --session")
+
+    visualizer = Visualizer(args.width, args.height, max_fps=0, headless=True)
+    raw_file = open(args.raw, "wb") if args.raw else None
+    try:
+        report = export_frames(visualizer, frames, args.output_dir, raw_file)
+    finally:
+        if raw_file is not None:
+            raw_file.close()
+    print(f"{report['frames']} frames at {report['width']}x{report['height']} in {report['seconds']:.2f} s "
+          f"({report['fps']:.1f} FPS)")
+
+if __name__ == "__main__":
+    main()